@@ -5,6 +5,7 @@ from .models import Atendimento
 @admin.register(Atendimento)
 class AtendimentoAdmin(admin.ModelAdmin):
     list_display = ['paciente', 'profissional_responsavel', 'data_hora_entrada', 'status', 'atualizado_em']
+    list_select_related = ['paciente', 'profissional_responsavel__user']
     list_filter = ['status', 'data_hora_entrada', 'profissional_responsavel']
     search_fields = ['paciente__nome', 'paciente__cpf', 'queixa']
     readonly_fields = ['data_hora_entrada', 'atualizado_em']
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0001_initial'),
+        ('prontuario', '0007_alertas_sinal_vital'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='atendimento',
+            name='ultimo_sinal_vital',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='prontuario.sinalvital', verbose_name='Último Sinal Vital'),
+        ),
+    ]
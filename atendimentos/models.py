@@ -3,6 +3,14 @@ from pacientes.models import Paciente
 from usuarios.models import Profissional
 
 
+class AtendimentoQuerySet(models.QuerySet):
+    """QuerySet com filtros de uso comum para atendimentos"""
+
+    def ativos(self):
+        """Atendimentos ainda em aberto (paciente sem alta)"""
+        return self.exclude(status__in=Atendimento.STATUS_ENCERRADOS)
+
+
 class Atendimento(models.Model):
     """Model para registrar atendimentos no pronto-socorro"""
 
@@ -16,6 +24,8 @@ class Atendimento(models.Model):
         ('INTERNACAO', 'Internação'),
     ]
 
+    STATUS_ENCERRADOS = ['ALTA']
+
     paciente = models.ForeignKey(
         Paciente,
         on_delete=models.PROTECT,
@@ -43,6 +53,21 @@ class Atendimento(models.Model):
     )
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    # Ponteiro para o registro de sinais vitais mais recente (mantido por SinalVital.save
+    # e, quando o registro apontado é removido, pelos signals de prontuario)
+    ultimo_sinal_vital = models.ForeignKey(
+        'prontuario.SinalVital',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False,
+        db_constraint=False,  # SinalVital é particionada; PK composta (id, data_hora) no banco
+        verbose_name='Último Sinal Vital'
+    )
+
+    objects = AtendimentoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Atendimento'
         verbose_name_plural = 'Atendimentos'
@@ -6,6 +6,7 @@ from django.urls import reverse_lazy
 from pacientes.models import Paciente
 from pacientes.forms import PacienteForm
 from usuarios.models import Profissional
+from prontuario.medicacoes import contar_medicacoes_ativas
 from .models import Atendimento
 from .forms import AtendimentoForm
 
@@ -18,12 +19,30 @@ class DashboardView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """Retorna queryset otimizado com select_related"""
-        return Atendimento.objects.select_related('paciente', 'profissional_responsavel__user').all()
+        atendimentos = Atendimento.objects.select_related(
+            'paciente',
+            'profissional_responsavel__user',
+            'ultimo_sinal_vital'
+        )
+
+        # ?alertas=1 mostra apenas pacientes com sinais vitais alterados, mais graves primeiro
+        if self.request.GET.get('alertas'):
+            atendimentos = atendimentos.ativos().filter(
+                ultimo_sinal_vital__total_alertas__gt=0
+            ).order_by('-ultimo_sinal_vital__total_alertas', '-data_hora_entrada')
+
+        return atendimentos
 
     def get_context_data(self, **kwargs):
         """Adiciona total de atendimentos ao contexto"""
         context = super().get_context_data(**kwargs)
         context['total_atendimentos'] = self.get_queryset().count()
+        context['filtro_alertas'] = bool(self.request.GET.get('alertas'))
+
+        # Quantidade de medicações ativas por atendimento (cacheada, uma consulta para os ausentes)
+        totais_medicacoes = contar_medicacoes_ativas([atendimento.pk for atendimento in context['atendimentos']])
+        for atendimento in context['atendimentos']:
+            atendimento.total_medicacoes_ativas = totais_medicacoes[atendimento.pk]
         return context
 
 
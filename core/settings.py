@@ -123,6 +123,101 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Diretório para dados gerados em tempo de execução (cache em arquivo, artefatos, etc.)
+# Não é servido publicamente, ao contrário de MEDIA_ROOT.
+VAR_ROOT = os.environ.get('VAR_ROOT', os.path.join(BASE_DIR, 'var'))
+
+# Laudos de exames são entregues pela view autenticada prontuario:baixar_laudo.
+# LAUDOS_ENVIO_ARQUIVO delega o envio do corpo ao proxy da frente:
+#   'x-accel-redirect' (nginx): a location interna LAUDOS_X_ACCEL_PREFIXO deve
+#       apontar (alias) para MEDIA_ROOT;
+#   'x-sendfile' (Apache mod_xsendfile, lighttpd);
+#   '' (padrão): o próprio Django envia o arquivo em blocos.
+LAUDOS_ENVIO_ARQUIVO = os.environ.get('LAUDOS_ENVIO_ARQUIVO', '')
+LAUDOS_X_ACCEL_PREFIXO = os.environ.get('LAUDOS_X_ACCEL_PREFIXO', '/protegido/')
+
+# Tamanho máximo (bytes) de um laudo enviado em partes (prontuario.uploads).
+# O envio direto pelo formulário continua limitado a 10MB.
+LAUDOS_UPLOAD_TAMANHO_MAXIMO = int(os.environ.get('LAUDOS_UPLOAD_TAMANHO_MAXIMO', str(500 * 1024 * 1024)))
+
+# Compressão zstd dos laudos gravados (prontuario.armazenamento). Só PDFs e
+# imagens sem compressão; JPEG e PNG são gravados como vieram. O nível vale
+# para novas gravações; a leitura de arquivos antigos não depende dele.
+LAUDOS_COMPRIMIR = os.environ.get('LAUDOS_COMPRIMIR', 'True').lower() in ('true', '1', 'yes', 'on')
+LAUDOS_ZSTD_NIVEL = int(os.environ.get('LAUDOS_ZSTD_NIVEL', '6'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# O alias 'fragmentos' guarda os cards renderizados da timeline. As chaves são
+# versionadas (modelo, id e data de atualização), então as entradas não expiram
+# por tempo: ao atingir FRAGMENT_CACHE_MAX_ENTRIES, 1/CULL_FREQUENCY delas é
+# descartado. No LocMemCache saem as menos usadas recentemente (LRU); no
+# FileBasedCache, arquivos escolhidos ao acaso.
+# FRAGMENT_CACHE_BACKEND: 'locmem' (memória do processo) ou 'file' (compartilhado entre workers)
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragmentos': {
+        'BACKEND': FRAGMENT_CACHE_BACKENDS[FRAGMENT_CACHE_BACKEND],
+        'LOCATION': (
+            os.path.join(VAR_ROOT, 'cache', 'fragmentos')
+            if FRAGMENT_CACHE_BACKEND == 'file' else 'fragmentos'
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', '20000')),
+            'CULL_FREQUENCY': 10,  # Remove 10% das entradas ao atingir o limite (LRU só no locmem)
+        },
+    },
+    # Prontuários serializados das tools de IA (ia.services.record_cache), com
+    # versão por paciente trocada pelos signals de ia.signals. Em LocMemCache
+    # cada processo tem o seu cache: o TIMEOUT limita a defasagem entre eles.
+    'prontuarios_ia': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'prontuarios_ia',
+        'TIMEOUT': int(os.environ.get('IA_PRONTUARIO_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('IA_PRONTUARIO_CACHE_MAX_ENTRIES', '2000')),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Sinais vitais
+# Sobrescreve os limites de alerta de prontuario.alertas.LIMITES_PADRAO, ex:
+# {'FEBRE': 37.8, 'SATURACAO_BAIXA': 92}. Após alterar, recalcule os registros
+# existentes com: python manage.py recalcular_alertas_sinais_vitais
+SINAIS_VITAIS_LIMITES_ALERTA = {}
+
+# Alergias
+# Acrescenta/sobrescreve termos de prontuario.alergias.SINONIMOS_ALERGIA, ex:
+# {'anticonvulsivante': ['fenitoina', 'carbamazepina', 'fenobarbital']}
+ALERGIAS_SINONIMOS = {}
+
+# Tarefas em segundo plano (prontuario.tarefas), ex: exportação de prontuários longos.
+# TAREFAS_PROCESSOS: processos para trabalho pesado de CPU (ex: prévias de laudos)
+TAREFAS_WORKERS = int(os.environ.get('TAREFAS_WORKERS', '2'))
+TAREFAS_PROCESSOS = int(os.environ.get('TAREFAS_PROCESSOS', '2'))
+
+# Resumo de prontuários por IA (ia.services.summarizer)
+# IA_RESUMO_PROVEDOR: 'local' (resumo determinístico, sem rede) ou 'openai'
+# (langchain-openai, requer OPENAI_API_KEY). IA_RESUMO_MODELO: modelo do provedor
+IA_RESUMO_PROVEDOR = os.environ.get('IA_RESUMO_PROVEDOR', 'local')
+IA_RESUMO_MODELO = os.environ.get('IA_RESUMO_MODELO', 'gpt-4o-mini')
+
+# Contexto do prontuário para os modelos (ia.services.context_builder)
+# IA_CONTEXTO_MAX_TOKENS: orçamento padrão; IA_CONTEXTO_ENCODING: encoding do tiktoken
+IA_CONTEXTO_MAX_TOKENS = int(os.environ.get('IA_CONTEXTO_MAX_TOKENS', '4000'))
+IA_CONTEXTO_ENCODING = os.environ.get('IA_CONTEXTO_ENCODING', 'o200k_base')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import ResumoProntuario
 
-# Register your models here.
+
+@admin.register(ResumoProntuario)
+class ResumoProntuarioAdmin(admin.ModelAdmin):
+    list_display = ['paciente', 'provedor', 'modelo', 'versao_prompt', 'criado_em']
+    list_select_related = ['paciente']
+    list_filter = ['provedor', 'versao_prompt', 'criado_em']
+    search_fields = ['paciente__nome', 'paciente__cpf']
+    readonly_fields = ['hash_conteudo', 'criado_em']
+    raw_id_fields = ['paciente']
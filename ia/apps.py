@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ia'
+
+    def ready(self):
+        """Registra os signals do app"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('pacientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoProntuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_conteudo', models.CharField(max_length=64, unique=True, verbose_name='Hash do conteúdo')),
+                ('versao_prompt', models.CharField(max_length=50, verbose_name='Versão do prompt')),
+                ('provedor', models.CharField(max_length=30, verbose_name='Provedor')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('resumo', models.TextField(verbose_name='Resumo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Gerado em')),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_ia', to='pacientes.paciente', verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Prontuário',
+                'verbose_name_plural': 'Resumos de Prontuários',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['paciente', '-criado_em'], name='resumo_ia_paciente_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,36 @@
 from django.db import models
 
-# Create your models here.
+from pacientes.models import Paciente
+
+
+class ResumoProntuario(models.Model):
+    """
+    Resumo do prontuário gerado por IA (ia.services.summarizer).
+
+    hash_conteudo identifica o prontuário serializado, a versão do prompt e o
+    provedor/modelo: o mesmo prontuário não é resumido duas vezes.
+    """
+
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name='resumos_ia',
+        verbose_name='Paciente'
+    )
+    hash_conteudo = models.CharField(max_length=64, unique=True, verbose_name='Hash do conteúdo')
+    versao_prompt = models.CharField(max_length=50, verbose_name='Versão do prompt')
+    provedor = models.CharField(max_length=30, verbose_name='Provedor')
+    modelo = models.CharField(max_length=100, verbose_name='Modelo')
+    resumo = models.TextField(verbose_name='Resumo')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Gerado em')
+
+    class Meta:
+        verbose_name = 'Resumo de Prontuário'
+        verbose_name_plural = 'Resumos de Prontuários'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['paciente', '-criado_em'], name='resumo_ia_paciente_idx'),
+        ]
+
+    def __str__(self):
+        return f"Resumo de {self.paciente} ({self.provedor}/{self.modelo})"
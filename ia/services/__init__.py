@@ -1,13 +1,15 @@
 """
-Servios de IA para o Hospital Status Tracker
+Serviços de IA para o Hospital Status Tracker
 
-Este mdulo contm ferramentas LangChain para consulta de pronturios
-e integrao com agentes de IA.
+Este módulo contém ferramentas LangChain para consulta de prontuários
+e integração com agentes de IA.
 """
 
 from .tools import (
     get_patient_record_by_id,
     get_patient_record_by_cpf,
+    get_patient_records_by_ids,
+    get_patient_context,
     search_patients,
     get_evolutions_for_attendance,
 )
@@ -15,6 +17,8 @@ from .tools import (
 __all__ = [
     'get_patient_record_by_id',
     'get_patient_record_by_cpf',
+    'get_patient_records_by_ids',
+    'get_patient_context',
     'search_patients',
     'get_evolutions_for_attendance',
 ]
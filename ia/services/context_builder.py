@@ -0,0 +1,214 @@
+"""
+Contexto do prontuário para os modelos, limitado por um orçamento de tokens.
+
+O prontuário completo (patient_records) traz todo o histórico de atendimentos
+e evoluções; em pacientes antigos isso passa do contexto do modelo. Aqui o
+contexto é montado por prioridade até esgotar o orçamento:
+
+    1. paciente: identificação, alergias e dados clínicos (sempre incluído);
+    2. atendimento atual (o mais recente), com as evoluções mais recentes que
+       couberem (a primeira que não couber entra truncada);
+    3. sinais vitais recentes do atendimento atual;
+    4. medicações ativas do atendimento atual (prontuario.medicacoes);
+    5. atendimentos anteriores, resumidos em uma linha cada, dos mais recentes.
+
+Os tokens são contados com tiktoken (settings.IA_CONTEXTO_ENCODING) por
+fragmento: cada seção ou item serializado com orjson. A contagem de cada
+fragmento fica em cache (lru_cache) pelo texto, então um prontuário já
+consultado é medido de novo só nas partes que mudaram. A soma dos fragmentos
+aproxima a contagem do JSON final (sem as chaves que os agrupam).
+"""
+from functools import lru_cache
+
+import orjson
+import tiktoken
+from django.conf import settings
+
+from prontuario.alertas import descrever_alertas
+from prontuario.medicacoes import medicacoes_ativas
+from prontuario.models import SinalVital
+
+from .record_cache import cached_patient_record
+
+# Sinais vitais do atendimento atual considerados
+MAX_SINAIS_VITAIS = 10
+
+# Tokens da última evolução no resumo de cada atendimento anterior
+TOKENS_RESUMO_EVOLUCAO = 60
+
+# Abaixo disso não vale incluir um trecho truncado de evolução
+MINIMO_TOKENS_TRECHO = 30
+
+MARCADOR_TRUNCADO = ' [...]'
+
+CAMPOS_PACIENTE = ('id', 'nome', 'cpf', 'data_nascimento', 'sexo', 'dados_clinicos')
+
+
+@lru_cache(maxsize=None)
+def _encoding(nome):
+    return tiktoken.get_encoding(nome)
+
+
+@lru_cache(maxsize=8192)
+def _contar_tokens(nome_encoding, texto):
+    return len(_encoding(nome_encoding).encode(texto))
+
+
+def count_tokens(texto):
+    """Quantidade de tokens do texto no encoding configurado"""
+    return _contar_tokens(settings.IA_CONTEXTO_ENCODING, texto)
+
+
+def truncate_to_tokens(texto, max_tokens):
+    """Texto limitado a max_tokens (com o marcador de truncado, se cortado)"""
+    if count_tokens(texto) <= max_tokens:
+        return texto
+    encoding = _encoding(settings.IA_CONTEXTO_ENCODING)
+    limite = max(max_tokens - count_tokens(MARCADOR_TRUNCADO), 0)
+    return encoding.decode(encoding.encode(texto)[:limite]).rstrip() + MARCADOR_TRUNCADO
+
+
+def _tokens(dados):
+    return count_tokens(orjson.dumps(dados).decode())
+
+
+class _Orcamento:
+    """Tokens disponíveis para o contexto"""
+
+    def __init__(self, total):
+        self.total = total
+        self.usado = 0
+
+    @property
+    def restante(self):
+        return self.total - self.usado
+
+    def adicionar(self, dados, obrigatorio=False):
+        """Reserva os tokens do fragmento; False (sem reservar) se não couber"""
+        tokens = _tokens(dados)
+        if tokens > self.restante and not obrigatorio:
+            return False
+        self.usado += tokens
+        return True
+
+
+def _adicionar_em_ordem(orcamento, itens):
+    """Itens que cabem no orçamento, na ordem dada, parando no primeiro que não cabe"""
+    incluidos = []
+    for item in itens:
+        if not orcamento.adicionar(item):
+            break
+        incluidos.append(item)
+    return incluidos
+
+
+def _serializar_sinal_vital(sinal):
+    return {
+        'data_hora': sinal.data_hora.strftime('%d/%m/%Y %H:%M'),
+        'pressao_arterial': sinal.get_pressao_arterial(),
+        'frequencia_cardiaca': sinal.frequencia_cardiaca,
+        'frequencia_respiratoria': sinal.frequencia_respiratoria,
+        'temperatura': float(sinal.temperatura) if sinal.temperatura is not None else None,
+        'saturacao_o2': sinal.saturacao_o2,
+        'glicemia': sinal.glicemia,
+        'alertas': descrever_alertas(sinal.alertas),
+    }
+
+
+def _sinais_vitais_recentes(atendimento_id):
+    sinais = SinalVital.objects.filter(atendimento_id=atendimento_id).only(
+        'data_hora', 'pressao_arterial_sistolica', 'pressao_arterial_diastolica', 'frequencia_cardiaca',
+        'frequencia_respiratoria', 'temperatura', 'saturacao_o2', 'glicemia', 'alertas',
+    ).order_by('-data_hora')[:MAX_SINAIS_VITAIS]
+    return [_serializar_sinal_vital(sinal) for sinal in sinais]
+
+
+def _serializar_medicacao(medicacao):
+    return {
+        'medicamento': medicacao['medicamento'],
+        'dose': medicacao['dose'],
+        'via': medicacao['via'],
+        'frequencia': medicacao['frequencia'],
+        'termino': medicacao['termino'].strftime('%d/%m/%Y'),
+        'observacoes': medicacao['observacoes'],
+    }
+
+
+def _evolucoes_no_orcamento(orcamento, evolucoes):
+    """Evoluções da mais recente para a mais antiga; a primeira que não couber entra truncada"""
+    incluidas = []
+    for evolucao in reversed(evolucoes):
+        if orcamento.adicionar(evolucao):
+            incluidas.append(evolucao)
+            continue
+        sem_descricao = dict(evolucao, descricao='')
+        disponivel = orcamento.restante - _tokens(sem_descricao)
+        if disponivel >= MINIMO_TOKENS_TRECHO:
+            trecho = dict(evolucao, descricao=truncate_to_tokens(evolucao['descricao'], disponivel))
+            if orcamento.adicionar(trecho):
+                incluidas.append(trecho)
+        break
+    return incluidas
+
+
+def _resumir_atendimento(atendimento):
+    """Atendimento anterior em uma linha: dados principais e o início da última evolução"""
+    resumo = {
+        'data_hora_entrada': atendimento['data_hora_entrada'],
+        'queixa': atendimento['queixa'],
+        'status': atendimento['status'],
+        'total_evolucoes': len(atendimento['evolucoes']),
+    }
+    if atendimento['evolucoes']:
+        ultima = atendimento['evolucoes'][-1]
+        resumo['ultima_evolucao'] = truncate_to_tokens(
+            f"{ultima['tipo']}: {ultima['descricao']}", TOKENS_RESUMO_EVOLUCAO
+        )
+    return resumo
+
+
+def build_patient_context(paciente_id, max_tokens=None) -> dict:
+    """
+    Contexto do prontuário do paciente dentro de max_tokens.
+
+    Args:
+        paciente_id (int): ID do paciente.
+        max_tokens (int): Orçamento de tokens (padrão: settings.IA_CONTEXTO_MAX_TOKENS).
+
+    Returns:
+        dict: Seções incluídas por prioridade, as quantidades omitidas e, em
+              'tokens', os tokens usados e o orçamento. Se o paciente não for
+              encontrado, dicionário com 'error'.
+    """
+    prontuario = cached_patient_record(paciente_id, include_attendance_history=True)
+    if 'error' in prontuario:
+        return prontuario
+
+    orcamento = _Orcamento(max_tokens or settings.IA_CONTEXTO_MAX_TOKENS)
+    paciente = {campo: prontuario[campo] for campo in CAMPOS_PACIENTE}
+    orcamento.adicionar(paciente, obrigatorio=True)
+    contexto = {'paciente': paciente}
+
+    historico = prontuario['historico_atendimentos']
+    if historico:
+        atual = dict(historico[0])
+        evolucoes = atual.pop('evolucoes')
+        if orcamento.adicionar(atual):
+            atual['evolucoes'] = _evolucoes_no_orcamento(orcamento, evolucoes)
+            atual['evolucoes_omitidas'] = len(evolucoes) - len(atual['evolucoes'])
+            contexto['atendimento_atual'] = atual
+
+            sinais = _sinais_vitais_recentes(atual['id'])
+            contexto['sinais_vitais_recentes'] = _adicionar_em_ordem(orcamento, sinais)
+
+            medicacoes = [_serializar_medicacao(medicacao) for medicacao in medicacoes_ativas(atual['id'])]
+            contexto['medicacoes_ativas'] = _adicionar_em_ordem(orcamento, medicacoes)
+            contexto['medicacoes_omitidas'] = len(medicacoes) - len(contexto['medicacoes_ativas'])
+
+        anteriores = [_resumir_atendimento(atendimento) for atendimento in historico[1:]]
+        contexto['atendimentos_anteriores'] = _adicionar_em_ordem(orcamento, anteriores)
+        contexto['atendimentos_anteriores_omitidos'] = len(anteriores) - len(contexto['atendimentos_anteriores'])
+
+    contexto['total_atendimentos'] = prontuario['total_atendimentos']
+    contexto['tokens'] = {'usados': orcamento.usado, 'orcamento': orcamento.total}
+    return contexto
@@ -0,0 +1,161 @@
+"""
+Montagem dos prontuários usados pelas tools de IA.
+
+O histórico completo de um ou vários pacientes é carregado com um número
+fixo de consultas, independente da quantidade de atendimentos e evoluções:
+
+    1. pacientes;
+    2. atendimentos (com o profissional responsável e o usuário);
+    3. evoluções (com o profissional e o usuário).
+
+Os atendimentos e evoluções vêm por Prefetch, e only() limita as colunas
+às usadas no prontuário (str() de Profissional usa o nome do usuário e o
+perfil).
+"""
+from django.db.models import Prefetch
+
+from atendimentos.models import Atendimento
+from pacientes.models import Paciente
+from prontuario.models import Evolucao
+
+CAMPOS_PACIENTE = (
+    'id', 'nome', 'cpf', 'data_nascimento', 'sexo', 'nome_mae', 'telefone', 'email',
+    'rg', 'cartao_sus',
+    'cep', 'rua', 'numero', 'bairro', 'cidade', 'uf',
+    'tipo_sanguineo', 'alergias', 'observacoes_clinicas',
+    'criado_em', 'atualizado_em',
+)
+
+# Campos de Profissional usados por str(profissional), a partir da relação
+CAMPOS_PROFISSIONAL = ('perfil', 'user__first_name', 'user__last_name', 'user__username')
+
+
+def _campos_profissional(relacao):
+    return (relacao, f'{relacao}__user') + tuple(f'{relacao}__{campo}' for campo in CAMPOS_PROFISSIONAL)
+
+
+def evolucoes_queryset():
+    """Evoluções com o profissional já carregado, em ordem cronológica"""
+    return Evolucao.objects.select_related('profissional__user').only(
+        'id', 'atendimento', 'tipo', 'descricao', 'data_hora', *_campos_profissional('profissional')
+    ).order_by('data_hora')
+
+
+def pacientes_queryset(include_attendance_history=False):
+    """Pacientes com as colunas do prontuário e, se pedido, o histórico pré-carregado"""
+    queryset = Paciente.objects.only(*CAMPOS_PACIENTE)
+    if not include_attendance_history:
+        return queryset
+
+    atendimentos = Atendimento.objects.select_related('profissional_responsavel__user').only(
+        'id', 'paciente', 'data_hora_entrada', 'queixa', 'status',
+        *_campos_profissional('profissional_responsavel')
+    ).order_by('-data_hora_entrada')
+    return queryset.prefetch_related(
+        Prefetch('atendimentos', queryset=atendimentos),
+        Prefetch('atendimentos__evolucoes', queryset=evolucoes_queryset()),
+    )
+
+
+def serializar_evolucao(evolucao, formato_data='%d/%m/%Y %H:%M:%S'):
+    return {
+        'id': evolucao.id,
+        'tipo': evolucao.get_tipo_display(),
+        'descricao': evolucao.descricao,
+        'profissional': str(evolucao.profissional),
+        'data_hora': evolucao.data_hora.strftime(formato_data)
+    }
+
+
+def serializar_atendimento(atendimento):
+    """Atendimento com as evoluções (pré-carregadas em atendimento.evolucoes)"""
+    return {
+        'id': atendimento.id,
+        'data_hora_entrada': atendimento.data_hora_entrada.strftime('%d/%m/%Y %H:%M:%S'),
+        'queixa': atendimento.queixa,
+        'status': atendimento.get_status_display(),
+        'profissional_responsavel': (
+            str(atendimento.profissional_responsavel)
+            if atendimento.profissional_responsavel
+            else 'Não atribuído'
+        ),
+        'evolucoes': [serializar_evolucao(evolucao) for evolucao in atendimento.evolucoes.all()]
+    }
+
+
+def serializar_paciente(paciente, include_attendance_history=False):
+    """Prontuário do paciente (o histórico deve vir de pacientes_queryset)"""
+    prontuario = {
+        'id': paciente.id,
+        'nome': paciente.nome,
+        'cpf': paciente.cpf,
+        'data_nascimento': paciente.data_nascimento.strftime('%d/%m/%Y'),
+        'sexo': paciente.get_sexo_display() if paciente.sexo else None,
+        'nome_mae': paciente.nome_mae,
+        'telefone': paciente.telefone,
+        'email': paciente.email,
+
+        # Documentos
+        'documentos': {
+            'rg': paciente.rg,
+            'cartao_sus': paciente.cartao_sus,
+        },
+
+        # Endereço
+        'endereco': {
+            'cep': paciente.cep,
+            'rua': paciente.rua,
+            'numero': paciente.numero,
+            'bairro': paciente.bairro,
+            'cidade': paciente.cidade,
+            'uf': paciente.uf,
+            'endereco_completo': paciente.get_endereco_completo(),
+        },
+
+        # Dados clínicos
+        'dados_clinicos': {
+            'tipo_sanguineo': paciente.tipo_sanguineo,
+            'alergias': paciente.alergias,
+            'observacoes_clinicas': paciente.observacoes_clinicas,
+        },
+
+        # Metadados
+        'criado_em': paciente.criado_em.strftime('%d/%m/%Y %H:%M:%S'),
+        'atualizado_em': paciente.atualizado_em.strftime('%d/%m/%Y %H:%M:%S'),
+    }
+
+    if include_attendance_history:
+        historico = [serializar_atendimento(atendimento) for atendimento in paciente.atendimentos.all()]
+        prontuario['historico_atendimentos'] = historico
+        prontuario['total_atendimentos'] = len(historico)
+
+    return prontuario
+
+
+def get_patient_records(paciente_ids, include_attendance_history=False) -> dict:
+    """
+    Monta os prontuários de vários pacientes com um número fixo de consultas.
+
+    Args:
+        paciente_ids (iterable[int]): IDs dos pacientes.
+        include_attendance_history (bool): Se True, inclui atendimentos e evoluções.
+
+    Returns:
+        dict: Prontuários por ID, na ordem dos IDs informados. IDs sem paciente
+              recebem um dicionário com 'error'.
+    """
+    paciente_ids = list(dict.fromkeys(paciente_ids))
+    pacientes = pacientes_queryset(include_attendance_history).in_bulk(paciente_ids)
+    return {
+        paciente_id: (
+            serializar_paciente(pacientes[paciente_id], include_attendance_history)
+            if paciente_id in pacientes
+            else {'error': f'Paciente com ID {paciente_id} não encontrado'}
+        )
+        for paciente_id in paciente_ids
+    }
+
+
+def get_patient_record(paciente_id, include_attendance_history=False) -> dict:
+    """Prontuário de um paciente (ver get_patient_records)"""
+    return get_patient_records([paciente_id], include_attendance_history)[paciente_id]
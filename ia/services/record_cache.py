@@ -0,0 +1,111 @@
+"""
+Cache dos prontuários serializados usados pelas tools de IA.
+
+Agentes consultam o mesmo paciente várias vezes na mesma conversa. O
+prontuário montado por patient_records é guardado já codificado com orjson
+no cache 'prontuarios_ia' (LocMemCache: descarte LRU ao atingir
+MAX_ENTRIES), junto da versão do paciente em que foi montado.
+
+A versão de cada paciente fica no mesmo cache e é trocada pelos signals de
+ia.signals quando o paciente ou qualquer registro do prontuário muda. Uma
+consulta busca versão e entrada juntas (get_many); a entrada só vale se
+tiver a versão atual. Uma versão descartada pelo LRU é recriada com um
+valor novo (time_ns), então entradas antigas nunca voltam a valer.
+
+Com vários processos, cada um tem o seu LocMemCache e não vê as trocas de
+versão dos outros: o TIMEOUT do alias limita essa defasagem.
+"""
+import time
+
+import orjson
+from django.core.cache import caches
+
+from .patient_records import get_patient_records
+
+CACHE_PRONTUARIOS = 'prontuarios_ia'
+
+
+def _cache():
+    return caches[CACHE_PRONTUARIOS]
+
+
+def _chave_versao(paciente_id):
+    return f'prontuario_ia:versao:{paciente_id}'
+
+
+def _chave_prontuario(paciente_id, include_attendance_history):
+    return f'prontuario_ia:{paciente_id}:{int(include_attendance_history)}'
+
+
+def _chave_cpf(cpf):
+    return f'prontuario_ia:cpf:{cpf}'
+
+
+def bump_patient_record_version(paciente_id):
+    """Invalida os prontuários em cache do paciente"""
+    cache = _cache()
+    try:
+        cache.incr(_chave_versao(paciente_id))
+    except ValueError:
+        cache.set(_chave_versao(paciente_id), time.time_ns(), timeout=None)
+
+
+def cached_patient_records(paciente_ids, include_attendance_history=False) -> dict:
+    """
+    Prontuários por ID (como patient_records.get_patient_records), do cache.
+
+    Os pacientes sem entrada válida são montados juntos e gravados no cache;
+    IDs não encontrados não são guardados.
+    """
+    cache = _cache()
+    paciente_ids = list(dict.fromkeys(paciente_ids))
+    chaves = {
+        paciente_id: (_chave_versao(paciente_id), _chave_prontuario(paciente_id, include_attendance_history))
+        for paciente_id in paciente_ids
+    }
+    em_cache = cache.get_many([chave for par in chaves.values() for chave in par])
+
+    prontuarios = {}
+    versoes = {}
+    for paciente_id, (chave_versao, chave_prontuario) in chaves.items():
+        versao = em_cache.get(chave_versao)
+        entrada = em_cache.get(chave_prontuario)
+        if versao is not None and entrada is not None and entrada[0] == versao:
+            prontuarios[paciente_id] = orjson.loads(entrada[1])
+        else:
+            versoes[paciente_id] = versao
+
+    if versoes:
+        # Versão ausente (nunca criada ou descartada): começa uma nova
+        novas = {paciente_id: time.time_ns() for paciente_id, versao in versoes.items() if versao is None}
+        cache.set_many({_chave_versao(paciente_id): versao for paciente_id, versao in novas.items()}, timeout=None)
+        versoes.update(novas)
+
+        montados = get_patient_records(list(versoes), include_attendance_history)
+        cache.set_many({
+            _chave_prontuario(paciente_id, include_attendance_history): (versoes[paciente_id], orjson.dumps(prontuario))
+            for paciente_id, prontuario in montados.items()
+            if 'error' not in prontuario
+        })
+        prontuarios.update(montados)
+
+    return {paciente_id: prontuarios[paciente_id] for paciente_id in paciente_ids}
+
+
+def cached_patient_record(paciente_id, include_attendance_history=False) -> dict:
+    """Prontuário de um paciente, do cache (ver cached_patient_records)"""
+    return cached_patient_records([paciente_id], include_attendance_history)[paciente_id]
+
+
+def cached_patient_id_for_cpf(cpf):
+    """
+    ID do paciente com o CPF (apenas dígitos) guardado pelo último acesso.
+
+    Quem usa deve conferir o CPF do prontuário retornado: o CPF do paciente
+    pode ter mudado desde então.
+    """
+    return _cache().get(_chave_cpf(cpf))
+
+
+def remember_patient_cpf(cpf, paciente_id):
+    _cache().set(_chave_cpf(cpf), paciente_id)
@@ -0,0 +1,150 @@
+"""
+Resumo de prontuários por IA.
+
+O texto é gerado pelo provedor configurado em settings.IA_RESUMO_PROVEDOR:
+
+    'local'  - resumo determinístico montado com os próprios dados do
+               prontuário, sem rede (desenvolvimento e testes);
+    'openai' - ChatOpenAI (langchain-openai) com o modelo IA_RESUMO_MODELO.
+
+Cada resumo é gravado em ResumoProntuario com o hash SHA-256 do prontuário
+serializado (orjson, chaves ordenadas), da versão do prompt e do
+provedor/modelo. Um prontuário sem alterações reaproveita o resumo gravado,
+sem nova chamada ao provedor.
+"""
+import hashlib
+
+import orjson
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+
+from ia.models import ResumoProntuario
+
+from .prompts import PROMPT_RESUMO_PRONTUARIO, PROMPT_VERSAO_RESUMO
+
+# Caracteres da evolução mais recente citados no resumo local
+TAMANHO_TRECHO_EVOLUCAO = 300
+
+
+class SummaryProvider:
+    """
+    Interface dos provedores de resumo.
+
+    summarize recebe o prontuário (dict) e o mesmo prontuário serializado em
+    JSON, que é o conteúdo enviado ao modelo.
+    """
+
+    nome = ''
+    modelo = ''
+
+    def summarize(self, prontuario, conteudo):
+        raise NotImplementedError
+
+
+class LocalSummaryProvider(SummaryProvider):
+    """Resumo determinístico, sem rede: o mesmo prontuário gera sempre o mesmo texto"""
+
+    nome = 'local'
+    modelo = 'deterministico'
+
+    def summarize(self, prontuario, conteudo):
+        clinicos = prontuario.get('dados_clinicos', {})
+        linhas = [
+            f"Paciente: {prontuario['nome']}, nascimento em {prontuario['data_nascimento']}.",
+            f"Alergias: {clinicos.get('alergias') or 'não registradas'}. "
+            f"Tipo sanguíneo: {clinicos.get('tipo_sanguineo') or 'não registrado'}.",
+        ]
+
+        historico = prontuario.get('historico_atendimentos') or []
+        linhas.append(f"Atendimentos registrados: {len(historico)}.")
+        if historico:
+            # O histórico vem do mais recente para o mais antigo
+            atual = historico[0]
+            linhas.append(
+                f"Atendimento mais recente ({atual['data_hora_entrada']}): {atual['queixa']} "
+                f"- {atual['status']}."
+            )
+            if atual['evolucoes']:
+                evolucao = atual['evolucoes'][-1]
+                linhas.append(
+                    f"Última evolução ({evolucao['tipo']}, {evolucao['data_hora']}): "
+                    f"{evolucao['descricao'][:TAMANHO_TRECHO_EVOLUCAO]}"
+                )
+        return '\n'.join(linhas)
+
+
+class OpenAISummaryProvider(SummaryProvider):
+    """Resumo pela API da OpenAI (langchain-openai)"""
+
+    nome = 'openai'
+
+    def __init__(self, modelo=None):
+        self.modelo = modelo or settings.IA_RESUMO_MODELO
+
+    def summarize(self, prontuario, conteudo):
+        from langchain_core.messages import HumanMessage, SystemMessage
+        from langchain_openai import ChatOpenAI
+
+        llm = ChatOpenAI(model=self.modelo, temperature=0)
+        resposta = llm.invoke([
+            SystemMessage(content=PROMPT_RESUMO_PRONTUARIO),
+            HumanMessage(content=conteudo),
+        ])
+        return resposta.content.strip()
+
+
+PROVEDORES = {
+    LocalSummaryProvider.nome: LocalSummaryProvider,
+    OpenAISummaryProvider.nome: OpenAISummaryProvider,
+}
+
+
+def get_summary_provider(nome=None) -> SummaryProvider:
+    """Provedor de resumo pelo nome (padrão: settings.IA_RESUMO_PROVEDOR)"""
+    nome = nome or settings.IA_RESUMO_PROVEDOR
+    try:
+        return PROVEDORES[nome]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'IA_RESUMO_PROVEDOR inválido: {nome!r}. Opções: {", ".join(PROVEDORES)}'
+        ) from None
+
+
+def summary_hash(conteudo, provider):
+    """Hash do prontuário serializado com a versão do prompt e o provedor/modelo"""
+    cabecalho = f'{PROMPT_VERSAO_RESUMO}\0{provider.nome}\0{provider.modelo}\0'.encode()
+    return hashlib.sha256(cabecalho + conteudo).hexdigest()
+
+
+def generate_summary(prontuario, provider=None):
+    """
+    Resumo do prontuário (como montado por ia.services.patient_records).
+
+    Returns:
+        tuple: (ResumoProntuario, bool) - o resumo e se foi gerado agora (False
+               quando reaproveitado de um prontuário idêntico).
+    """
+    provider = provider or get_summary_provider()
+    conteudo = orjson.dumps(prontuario, option=orjson.OPT_SORT_KEYS)
+    hash_conteudo = summary_hash(conteudo, provider)
+
+    resumo = ResumoProntuario.objects.filter(hash_conteudo=hash_conteudo).first()
+    if resumo:
+        return resumo, False
+
+    texto = provider.summarize(prontuario, conteudo.decode())
+    try:
+        with transaction.atomic():
+            resumo = ResumoProntuario.objects.create(
+                paciente_id=prontuario['id'],
+                hash_conteudo=hash_conteudo,
+                versao_prompt=PROMPT_VERSAO_RESUMO,
+                provedor=provider.nome,
+                modelo=provider.modelo,
+                resumo=texto,
+            )
+    except IntegrityError:
+        # Outra requisição resumiu o mesmo prontuário ao mesmo tempo
+        return ResumoProntuario.objects.get(hash_conteudo=hash_conteudo), False
+    return resumo, True
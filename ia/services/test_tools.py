@@ -4,17 +4,23 @@ Testes para as tools LangChain
 Execute com: python manage.py test ia.services.test_tools
 """
 
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from datetime import date
 
 from pacientes.models import Paciente
 from usuarios.models import Profissional
 from atendimentos.models import Atendimento
-from prontuario.models import Evolucao
+from prontuario.models import Evolucao, Prescricao, ItemPrescricao
+from ia.services import context_builder
 from ia.services.tools import (
+    get_patient_context,
     get_patient_record_by_id,
     get_patient_record_by_cpf,
+    get_patient_records_by_ids,
     search_patients,
     get_evolutions_for_attendance,
 )
@@ -25,6 +31,7 @@ class PatientToolsTestCase(TestCase):
 
     def setUp(self):
         """Configurar dados de teste"""
+        caches['prontuarios_ia'].clear()
         # Criar usuário e profissional
         self.user = User.objects.create_user(
             username='testuser',
@@ -183,6 +190,56 @@ class PatientToolsTestCase(TestCase):
 
         self.assertEqual(resultado['total_atendimentos'], 4)  # 1 original + 3 novos
 
+    def test_history_query_count_is_constant(self):
+        """Testar que o histórico é carregado com número fixo de consultas"""
+        outro_user = User.objects.create_user(username='enfermeira', first_name='Ana', password='x')
+        outro = Profissional.objects.create(user=outro_user, perfil='ENFERMEIRO')
+        for i in range(5):
+            atendimento = Atendimento.objects.create(
+                paciente=self.paciente,
+                profissional_responsavel=outro if i % 2 else None,
+                queixa=f'Queixa {i}',
+                status='TRIAGEM'
+            )
+            for profissional in (self.profissional, outro):
+                Evolucao.objects.create(
+                    atendimento=atendimento,
+                    profissional=profissional,
+                    tipo='EVOLUCAO_MEDICA',
+                    descricao=f'Evolução {i}'
+                )
+
+        # Pacientes, atendimentos e evoluções
+        with self.assertNumQueries(3):
+            resultado = get_patient_record_by_id.invoke({
+                'paciente_id': self.paciente.id,
+                'include_attendance_history': True
+            })
+
+        self.assertEqual(resultado['total_atendimentos'], 6)
+        evolucoes = [e for a in resultado['historico_atendimentos'] for e in a['evolucoes']]
+        self.assertEqual(len(evolucoes), 11)
+        self.assertIn('Ana - ', {e['profissional'][:6] for e in evolucoes})
+        self.assertIn('Não atribuído', {a['profissional_responsavel'] for a in resultado['historico_atendimentos']})
+
+    def test_get_patient_records_by_ids(self):
+        """Testar busca de vários prontuários de uma só vez"""
+        outro = Paciente.objects.create(nome='Outro Paciente', cpf='11122233344', data_nascimento=date(1970, 2, 3))
+        Atendimento.objects.create(paciente=outro, queixa='Febre', status='TRIAGEM')
+
+        with self.assertNumQueries(3):
+            resultado = get_patient_records_by_ids.invoke({
+                'paciente_ids': [outro.id, 99999, self.paciente.id],
+                'include_attendance_history': True
+            })
+
+        self.assertEqual(resultado['total'], 3)
+        primeiro, inexistente, ultimo = resultado['prontuarios']
+        self.assertEqual(primeiro['nome'], 'Outro Paciente')
+        self.assertEqual(primeiro['historico_atendimentos'][0]['evolucoes'], [])
+        self.assertIn('error', inexistente)
+        self.assertEqual(len(ultimo['historico_atendimentos'][0]['evolucoes']), 1)
+
     def test_tool_invoke_compatibility(self):
         """Testar compatibilidade com a interface invoke do LangChain"""
         # Verificar se as tools têm o método invoke
@@ -200,6 +257,7 @@ class ToolsIntegrationTestCase(TestCase):
 
     def setUp(self):
         """Configurar dados de teste"""
+        caches['prontuarios_ia'].clear()
         self.user = User.objects.create_user(username='doctor', password='pass123')
         self.profissional = Profissional.objects.create(
             user=self.user,
@@ -237,3 +295,152 @@ class ToolsIntegrationTestCase(TestCase):
 
         self.assertEqual(prontuario['nome'], 'Maria Santos')
         self.assertEqual(prontuario['dados_clinicos']['alergias'], 'Dipirona, Látex')
+
+
+class PatientRecordCacheTestCase(TestCase):
+    """Testes para o cache de prontuários das tools"""
+
+    def setUp(self):
+        caches['prontuarios_ia'].clear()
+        self.user = User.objects.create_user(username='medico', password='pass123')
+        self.profissional = Profissional.objects.create(user=self.user, perfil='MEDICO')
+        self.paciente = Paciente.objects.create(
+            nome='Carlos Souza',
+            cpf='55566677788',
+            data_nascimento=date(1960, 3, 10)
+        )
+        self.atendimento = Atendimento.objects.create(
+            paciente=self.paciente,
+            profissional_responsavel=self.profissional,
+            queixa='Dispneia',
+            status='TRIAGEM'
+        )
+
+    def buscar(self):
+        return get_patient_record_by_id.invoke({
+            'paciente_id': self.paciente.id,
+            'include_attendance_history': True
+        })
+
+    def test_repeated_calls_hit_cache(self):
+        """Testar que chamadas repetidas não consultam o banco"""
+        primeiro = self.buscar()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buscar(), primeiro)
+
+        get_patient_record_by_cpf.invoke({'cpf': '55566677788'})
+        with self.assertNumQueries(0):
+            resultado = get_patient_record_by_cpf.invoke({'cpf': '555.666.777-88'})
+        self.assertEqual(resultado['nome'], 'Carlos Souza')
+
+    def test_changes_bump_version(self):
+        """Testar que alterações no prontuário invalidam o cache"""
+        self.buscar()
+        with self.captureOnCommitCallbacks(execute=True):
+            Evolucao.objects.create(
+                atendimento=self.atendimento,
+                profissional=self.profissional,
+                tipo='EVOLUCAO_MEDICA',
+                descricao='Melhora da dispneia'
+            )
+        self.assertEqual(len(self.buscar()['historico_atendimentos'][0]['evolucoes']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paciente.alergias = 'Sulfa'
+            self.paciente.save()
+        self.assertEqual(self.buscar()['dados_clinicos']['alergias'], 'Sulfa')
+
+        # Item de prescrição: o paciente é encontrado pela prescrição
+        prescricao = Prescricao.objects.create(
+            atendimento=self.atendimento,
+            profissional=self.profissional,
+            validade=date(2030, 1, 1)
+        )
+        self.buscar()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ItemPrescricao.objects.create(
+                prescricao=Prescricao.objects.get(pk=prescricao.pk),
+                medicamento='Dipirona',
+                dose='500mg',
+                via='VO',
+                frequencia='6/6h',
+                duracao_dias=3
+            )
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(3):
+            self.buscar()
+
+
+class EncodingFalso:
+    """Encoding de teste: um token a cada 4 caracteres"""
+
+    def encode(self, texto):
+        return [texto[i:i + 4] for i in range(0, len(texto), 4)]
+
+    def decode(self, tokens):
+        return ''.join(tokens)
+
+
+class PatientContextTestCase(TestCase):
+    """Testes para o contexto do paciente limitado por tokens"""
+
+    def setUp(self):
+        # O tiktoken baixa o encoding na primeira utilização: os testes usam um
+        # encoding determinístico (um token a cada 4 caracteres), sem rede
+        patcher = mock.patch.object(context_builder, '_encoding', lambda nome: EncodingFalso())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        context_builder._contar_tokens.cache_clear()
+        self.addCleanup(context_builder._contar_tokens.cache_clear)
+
+        caches['prontuarios_ia'].clear()
+        self.user = User.objects.create_user(username='medico', password='pass123')
+        self.profissional = Profissional.objects.create(user=self.user, perfil='MEDICO')
+        self.paciente = Paciente.objects.create(
+            nome='Helena Dias',
+            cpf='99988877766',
+            data_nascimento=date(1950, 1, 5),
+            alergias='Penicilina'
+        )
+        for i in range(5):
+            atendimento = Atendimento.objects.create(
+                paciente=self.paciente,
+                profissional_responsavel=self.profissional,
+                queixa=f'Queixa {i}',
+                status='ALTA' if i < 4 else 'EM_ATENDIMENTO'
+            )
+            for j in range(20):
+                Evolucao.objects.create(
+                    atendimento=atendimento,
+                    profissional=self.profissional,
+                    tipo='EVOLUCAO_MEDICA',
+                    descricao=f'Evolução {j} do atendimento {i}. ' + 'Paciente estável, sem queixas novas. ' * 20
+                )
+        self.atual = atendimento
+
+    def test_context_fits_budget_by_priority(self):
+        """Testar que o contexto respeita o orçamento e a prioridade"""
+        contexto = get_patient_context.invoke({'paciente_id': self.paciente.id, 'max_tokens': 1500})
+
+        self.assertLessEqual(contexto['tokens']['usados'], 1500)
+        self.assertEqual(contexto['paciente']['dados_clinicos']['alergias'], 'Penicilina')
+        self.assertEqual(contexto['atendimento_atual']['id'], self.atual.id)
+        evolucoes = contexto['atendimento_atual']['evolucoes']
+        self.assertTrue(evolucoes)
+        self.assertIn('Evolução 19 do atendimento 4', evolucoes[0]['descricao'])
+        self.assertGreater(contexto['atendimento_atual']['evolucoes_omitidas'], 0)
+        self.assertEqual(contexto['total_atendimentos'], 5)
+
+        completo = get_patient_context.invoke({'paciente_id': self.paciente.id, 'max_tokens': 32000})
+        self.assertEqual(completo['atendimento_atual']['evolucoes_omitidas'], 0)
+        self.assertEqual(len(completo['atendimentos_anteriores']), 4)
+        self.assertEqual(completo['atendimentos_anteriores'][0]['queixa'], 'Queixa 3')
+
+    def test_fragment_token_counts_are_cached(self):
+        """Testar que a contagem de tokens é reaproveitada por fragmento"""
+        get_patient_context.invoke({'paciente_id': self.paciente.id})
+        antes = context_builder._contar_tokens.cache_info()
+        get_patient_context.invoke({'paciente_id': self.paciente.id})
+        depois = context_builder._contar_tokens.cache_info()
+        self.assertEqual(depois.misses, antes.misses)
+        self.assertGreater(depois.hits, antes.hits)
@@ -1,9 +1,19 @@
 from langchain_core.tools import tool
-from prontuario.models import Evolucao
-from atendimentos.models import Atendimento
 from pacientes.models import Paciente
 from typing import Optional
 
+from .context_builder import build_patient_context
+from .patient_records import evolucoes_queryset, serializar_evolucao
+from .record_cache import (
+    cached_patient_id_for_cpf, cached_patient_record, cached_patient_records, remember_patient_cpf,
+)
+
+# Máximo de pacientes por chamada de get_patient_records_by_ids
+MAX_PATIENT_RECORDS = 50
+
+# Maior orçamento aceito por get_patient_context
+MAX_CONTEXT_TOKENS = 32000
+
 
 def get_evolutions_for_attendance(atendimento_id: int) -> list:
     """
@@ -18,21 +28,8 @@ def get_evolutions_for_attendance(atendimento_id: int) -> list:
               Retorna uma lista vazia se nenhum atendimento ou evolução for encontrado.
     """
     try:
-        atendimento = Atendimento.objects.get(id=atendimento_id)
-        evolucoes = Evolucao.objects.filter(atendimento=atendimento).order_by('data_hora')
-        
-        result = []
-        for evolucao in evolucoes:
-            result.append({
-                'id': evolucao.id,
-                'tipo': evolucao.get_tipo_display(),
-                'descricao': evolucao.descricao,
-                'profissional': str(evolucao.profissional),
-                'data_hora': evolucao.data_hora.strftime('%Y-%m-%d %H:%M:%S')
-            })
-        return result
-    except Atendimento.DoesNotExist:
-        return []
+        evolucoes = evolucoes_queryset().filter(atendimento_id=atendimento_id)
+        return [serializar_evolucao(evolucao, '%Y-%m-%d %H:%M:%S') for evolucao in evolucoes]
     except Exception as e:
         # Log the exception for debugging purposes
         print(f"Error fetching evolutions for attendance {atendimento_id}: {e}")
@@ -45,92 +42,7 @@ def _get_patient_record(paciente_id: int, include_attendance_history: bool = Fal
     Esta é uma função privada usada pelas tools públicas.
     """
     try:
-        paciente = Paciente.objects.get(id=paciente_id)
-
-        # Dados básicos e pessoais
-        prontuario = {
-            'id': paciente.id,
-            'nome': paciente.nome,
-            'cpf': paciente.cpf,
-            'data_nascimento': paciente.data_nascimento.strftime('%d/%m/%Y'),
-            'sexo': paciente.get_sexo_display() if paciente.sexo else None,
-            'nome_mae': paciente.nome_mae,
-            'telefone': paciente.telefone,
-            'email': paciente.email,
-
-            # Documentos
-            'documentos': {
-                'rg': paciente.rg,
-                'cartao_sus': paciente.cartao_sus,
-            },
-
-            # Endereço
-            'endereco': {
-                'cep': paciente.cep,
-                'rua': paciente.rua,
-                'numero': paciente.numero,
-                'bairro': paciente.bairro,
-                'cidade': paciente.cidade,
-                'uf': paciente.uf,
-                'endereco_completo': paciente.get_endereco_completo(),
-            },
-
-            # Dados clínicos
-            'dados_clinicos': {
-                'tipo_sanguineo': paciente.tipo_sanguineo,
-                'alergias': paciente.alergias,
-                'observacoes_clinicas': paciente.observacoes_clinicas,
-            },
-
-            # Metadados
-            'criado_em': paciente.criado_em.strftime('%d/%m/%Y %H:%M:%S'),
-            'atualizado_em': paciente.atualizado_em.strftime('%d/%m/%Y %H:%M:%S'),
-        }
-
-        # Incluir histórico de atendimentos se solicitado
-        if include_attendance_history:
-            atendimentos = Atendimento.objects.filter(paciente=paciente).select_related(
-                'profissional_responsavel__user'
-            ).order_by('-data_hora_entrada')
-
-            historico = []
-            for atendimento in atendimentos:
-                atendimento_data = {
-                    'id': atendimento.id,
-                    'data_hora_entrada': atendimento.data_hora_entrada.strftime('%d/%m/%Y %H:%M:%S'),
-                    'queixa': atendimento.queixa,
-                    'status': atendimento.get_status_display(),
-                    'profissional_responsavel': (
-                        str(atendimento.profissional_responsavel)
-                        if atendimento.profissional_responsavel
-                        else 'Não atribuído'
-                    ),
-                    'evolucoes': []
-                }
-
-                # Buscar evoluções do atendimento
-                evolucoes = Evolucao.objects.filter(atendimento=atendimento).select_related(
-                    'profissional__user'
-                ).order_by('data_hora')
-
-                for evolucao in evolucoes:
-                    atendimento_data['evolucoes'].append({
-                        'id': evolucao.id,
-                        'tipo': evolucao.get_tipo_display(),
-                        'descricao': evolucao.descricao,
-                        'profissional': str(evolucao.profissional),
-                        'data_hora': evolucao.data_hora.strftime('%d/%m/%Y %H:%M:%S')
-                    })
-
-                historico.append(atendimento_data)
-
-            prontuario['historico_atendimentos'] = historico
-            prontuario['total_atendimentos'] = len(historico)
-
-        return prontuario
-
-    except Paciente.DoesNotExist:
-        return {'error': f'Paciente com ID {paciente_id} não encontrado'}
+        return cached_patient_record(paciente_id, include_attendance_history)
     except Exception as e:
         print(f"Error fetching patient record for ID {paciente_id}: {e}")
         return {'error': f'Erro ao buscar prontuário: {str(e)}'}
@@ -159,6 +71,71 @@ def get_patient_record_by_id(paciente_id: int, include_attendance_history: bool
     return _get_patient_record(paciente_id, include_attendance_history)
 
 
+@tool
+def get_patient_records_by_ids(paciente_ids: list[int], include_attendance_history: bool = False) -> dict:
+    """
+    Busca e retorna os prontuários de vários pacientes de uma só vez.
+
+    Use no lugar de chamadas repetidas a get_patient_record_by_id quando
+    precisar analisar vários pacientes (ex: resultados de search_patients).
+
+    Args:
+        paciente_ids (list[int]): IDs dos pacientes (máximo: 50).
+        include_attendance_history (bool): Se True, inclui histórico completo de atendimentos e evoluções.
+                                          Default: False (retorna apenas dados cadastrais).
+
+    Returns:
+        dict: Dicionário contendo:
+              - 'total': Número de prontuários retornados
+              - 'prontuarios': Lista de prontuários, na ordem dos IDs informados
+                (IDs não encontrados aparecem com a chave 'error')
+    """
+    try:
+        if len(paciente_ids) > MAX_PATIENT_RECORDS:
+            return {'error': f'Informe no máximo {MAX_PATIENT_RECORDS} pacientes por chamada'}
+
+        prontuarios = list(cached_patient_records(paciente_ids, include_attendance_history).values())
+        return {
+            'total': len(prontuarios),
+            'prontuarios': prontuarios,
+        }
+
+    except Exception as e:
+        print(f"Error fetching patient records for IDs {paciente_ids}: {e}")
+        return {'error': f'Erro ao buscar prontuários: {str(e)}'}
+
+
+@tool
+def get_patient_context(paciente_id: int, max_tokens: Optional[int] = None) -> dict:
+    """
+    Busca o contexto clínico de um paciente, limitado a um orçamento de tokens.
+
+    Prefira esta tool a get_patient_record_by_id com histórico para analisar o
+    quadro do paciente: em históricos longos, o prontuário completo não cabe no
+    contexto. As informações entram por prioridade até esgotar o orçamento.
+
+    Args:
+        paciente_id (int): O ID do paciente.
+        max_tokens (int, optional): Orçamento de tokens (padrão: 4000, máximo: 32000).
+
+    Returns:
+        dict: Dicionário contendo:
+              - 'paciente': Identificação, alergias e dados clínicos
+              - 'atendimento_atual': Atendimento mais recente com as últimas evoluções
+              - 'sinais_vitais_recentes': Últimos sinais vitais do atendimento atual
+              - 'medicacoes_ativas': Medicações ativas do atendimento atual
+              - 'atendimentos_anteriores': Atendimentos anteriores resumidos
+              - Quantidades omitidas por falta de orçamento e 'tokens' (usados e orçamento)
+    """
+    try:
+        if max_tokens is not None:
+            max_tokens = min(max(max_tokens, 1), MAX_CONTEXT_TOKENS)
+        return build_patient_context(paciente_id, max_tokens)
+    except Exception as e:
+        print(f"Error building patient context for ID {paciente_id}: {e}")
+        return {'error': f'Erro ao montar o contexto do paciente: {str(e)}'}
+
+
 @tool
 def get_patient_record_by_cpf(cpf: str, include_attendance_history: bool = False) -> dict:
     """
@@ -186,8 +163,16 @@ def get_patient_record_by_cpf(cpf: str, include_attendance_history: bool = False
         if len(cpf_limpo) != 11:
             return {'error': 'CPF deve conter exatamente 11 dígitos numéricos'}
 
+        # CPF já consultado: vai direto ao prontuário em cache
+        paciente_id = cached_patient_id_for_cpf(cpf_limpo)
+        if paciente_id is not None:
+            prontuario = _get_patient_record(paciente_id, include_attendance_history)
+            if prontuario.get('cpf') == cpf_limpo:
+                return prontuario
+
         # Buscar paciente pelo CPF
-        paciente = Paciente.objects.get(cpf=cpf_limpo)
+        paciente = Paciente.objects.only('id').get(cpf=cpf_limpo)
+        remember_patient_cpf(cpf_limpo, paciente.id)
 
         # Reutilizar a função auxiliar
         return _get_patient_record(paciente.id, include_attendance_history)
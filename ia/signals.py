@@ -0,0 +1,69 @@
+"""
+Signals do app de IA.
+
+Trocam a versão do prontuário em cache das tools de IA
+(ia.services.record_cache) quando o paciente ou um registro do prontuário
+é criado, alterado ou removido. A troca acontece após o commit, para que um
+prontuário montado durante a transação não fique valendo com dados antigos.
+
+PontuacaoNEWS2 (recalculada a cada minuto) não entra no prontuário e não
+invalida o cache. Alterações em lote (update, bulk_create) não disparam
+signals; o TIMEOUT do cache limita a defasagem nesses casos.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from atendimentos.models import Atendimento
+from pacientes.models import Paciente
+from prontuario.models import (
+    Evolucao, ItemPrescricao, Prescricao, ResultadoExame, SinalVital, SolicitacaoExame,
+)
+
+from .services.record_cache import bump_patient_record_version
+
+# Caminho de cada registro do prontuário até o atendimento
+CAMINHOS_ATENDIMENTO = {
+    Evolucao: 'atendimento',
+    SinalVital: 'atendimento',
+    Prescricao: 'atendimento',
+    SolicitacaoExame: 'atendimento',
+    ItemPrescricao: 'prescricao__atendimento',
+    ResultadoExame: 'solicitacao__atendimento',
+}
+
+
+def _paciente_id(instance, caminho):
+    """Paciente do registro, sem consulta quando as relações já estão carregadas"""
+    relacao, _, resto = caminho.partition('__')
+    campo = instance._meta.get_field(relacao)
+    if campo.is_cached(instance):
+        relacionado = getattr(instance, relacao)
+        return _paciente_id(relacionado, resto) if resto else relacionado.paciente_id
+    return campo.related_model.objects.filter(
+        pk=getattr(instance, campo.attname)
+    ).values_list(f'{resto}__paciente_id' if resto else 'paciente_id', flat=True).first()
+
+
+def _invalidar_apos_commit(paciente_id):
+    if paciente_id:
+        transaction.on_commit(lambda: bump_patient_record_version(paciente_id))
+
+
+@receiver([post_save, post_delete], sender=Paciente)
+def paciente_alterado(sender, instance, **kwargs):
+    _invalidar_apos_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Atendimento)
+def atendimento_alterado(sender, instance, **kwargs):
+    _invalidar_apos_commit(instance.paciente_id)
+
+
+def registro_prontuario_alterado(sender, instance, **kwargs):
+    _invalidar_apos_commit(_paciente_id(instance, CAMINHOS_ATENDIMENTO[sender]))
+
+
+for modelo in CAMINHOS_ATENDIMENTO:
+    post_save.connect(registro_prontuario_alterado, sender=modelo, dispatch_uid=f'ia_prontuario_{modelo.__name__}')
+    post_delete.connect(registro_prontuario_alterado, sender=modelo, dispatch_uid=f'ia_prontuario_{modelo.__name__}')
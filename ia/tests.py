@@ -1,3 +1,83 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from atendimentos.models import Atendimento
+from pacientes.models import Paciente
+from usuarios.models import Profissional
+from .models import ResumoProntuario
+from .services.patient_records import get_patient_record
+from .services.summarizer import LocalSummaryProvider, generate_summary
+
+
+class ContadorProvider(LocalSummaryProvider):
+    """Provedor local que conta as chamadas"""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def summarize(self, prontuario, conteudo):
+        self.chamadas += 1
+        return super().summarize(prontuario, conteudo)
+
+
+class ResumoProntuarioTestCase(TestCase):
+    """Testes do resumo de prontuários com reaproveitamento por hash"""
+
+    def setUp(self):
+        caches['prontuarios_ia'].clear()
+        self.user = User.objects.create_user(username='medico', password='pass123')
+        self.profissional = Profissional.objects.create(user=self.user, perfil='MEDICO')
+        self.paciente = Paciente.objects.create(
+            nome='Ana Lima',
+            cpf='11122233344',
+            data_nascimento=date(1975, 8, 20),
+            alergias='Dipirona'
+        )
+        self.atendimento = Atendimento.objects.create(
+            paciente=self.paciente,
+            profissional_responsavel=self.profissional,
+            queixa='Cefaleia intensa',
+            status='TRIAGEM'
+        )
+
+    def test_prontuario_inalterado_nao_chama_provedor(self):
+        """Testar que o mesmo prontuário é resumido uma única vez"""
+        provider = ContadorProvider()
+        prontuario = get_patient_record(self.paciente.id, include_attendance_history=True)
+
+        resumo, gerado = generate_summary(prontuario, provider)
+        self.assertTrue(gerado)
+        self.assertIn('Dipirona', resumo.resumo)
+        self.assertIn('Cefaleia intensa', resumo.resumo)
+
+        repetido, gerado = generate_summary(dict(reversed(prontuario.items())), provider)
+        self.assertFalse(gerado)
+        self.assertEqual(repetido.pk, resumo.pk)
+        self.assertEqual(provider.chamadas, 1)
+
+        prontuario['dados_clinicos']['alergias'] = 'Dipirona, Penicilina'
+        novo, gerado = generate_summary(prontuario, provider)
+        self.assertTrue(gerado)
+        self.assertNotEqual(novo.hash_conteudo, resumo.hash_conteudo)
+        self.assertEqual(provider.chamadas, 2)
+
+    def test_view_resumo(self):
+        """Testar a view de resumo (provedor local)"""
+        self.client.login(username='medico', password='pass123')
+        url = reverse('ia:resumir_prontuario', args=[self.atendimento.id])
+
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(resposta.json()['cached'])
+        self.assertIn('Ana Lima', resposta.json()['summary'])
+
+        resposta = self.client.get(url)
+        self.assertTrue(resposta.json()['cached'])
+        self.assertEqual(ResumoProntuario.objects.filter(paciente=self.paciente).count(), 1)
 
-# Create your tests here.
+        resposta = self.client.get(reverse('ia:resumir_prontuario', args=[self.atendimento.id + 1000]))
+        self.assertEqual(resposta.status_code, 404)
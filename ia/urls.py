@@ -7,5 +7,5 @@ from . import views
 app_name = 'ia'
 
 urlpatterns = [
-    # URLs do app IA serão adicionadas aqui conforme desenvolvimento
+    path('atendimento/<int:atendimento_id>/resumo-ia/', views.resumir_prontuario_view, name='resumir_prontuario'),
 ]
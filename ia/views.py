@@ -1,45 +1,51 @@
 """
-Views para o app de Inteligncia Artificial (ia).
+Views para o app de Inteligência Artificial (ia).
 """
-# TEMPORARIAMENTE DESABILITADO - módulos ia.services foram removidos
-# from django.http import JsonResponse
-# from django.contrib.auth.decorators import login_required
-# from django.views.decorators.http import require_http_methods
-
-# from atendimentos.models import Atendimento
-# from ia.services.tools import get_patient_record_by_id
-# from ia.services.summarizer import generate_summary
-
-# @login_required
-# @require_http_methods(["GET"])
-# def resumir_prontuario_view(request, atendimento_id):
-#     """
-#     View que gera e retorna um resumo de pronturio via IA.
-#     """
-#     try:
-#         # 1. Buscar o atendimento para obter o ID do paciente
-#         atendimento = Atendimento.objects.select_related('paciente').get(id=atendimento_id)
-#         paciente_id = atendimento.paciente.id
-
-#         # 2. Obter os dados completos do pronturio usando a tool existente
-#         # Usamos include_attendance_history=True para dar o contexto completo para a IA
-#         prontuario_data = get_patient_record_by_id.invoke({
-#             'paciente_id': paciente_id,
-#             'include_attendance_history': True
-#         })
-
-#         if 'error' in prontuario_data:
-#             return JsonResponse({'error': prontuario_data['error']}, status=404)
-
-#         # 3. Gerar o resumo com o servio de IA
-#         summary = generate_summary(prontuario_data)
-
-#         # 4. Retornar o resumo como JSON
-#         return JsonResponse({'summary': summary})
-
-#     except Atendimento.DoesNotExist:
-#         return JsonResponse({'error': 'Atendimento no encontrado.'}, status=404)
-#     except Exception as e:
-#         # Log do erro seria ideal aqui
-#         print(f"Erro inesperado na view resumir_prontuario_view: {e}")
-#         return JsonResponse({'error': f'Ocorreu um erro interno: {str(e)}'}, status=500)
\ No newline at end of file
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from atendimentos.models import Atendimento
+from ia.services.record_cache import cached_patient_record
+from ia.services.summarizer import generate_summary
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@require_http_methods(["GET"])
+def resumir_prontuario_view(request, atendimento_id):
+    """
+    View que gera e retorna um resumo de prontuário via IA.
+
+    O resumo de um prontuário sem alterações é lido de ResumoProntuario, sem
+    nova chamada ao provedor ('cached': true na resposta).
+    """
+    # 1. Buscar o atendimento para obter o ID do paciente
+    paciente_id = Atendimento.objects.filter(id=atendimento_id).values_list('paciente_id', flat=True).first()
+    if paciente_id is None:
+        return JsonResponse({'error': 'Atendimento não encontrado.'}, status=404)
+
+    # 2. Obter os dados completos do prontuário (os mesmos das tools de IA)
+    # Usamos include_attendance_history=True para dar o contexto completo para a IA
+    prontuario_data = cached_patient_record(paciente_id, include_attendance_history=True)
+    if 'error' in prontuario_data:
+        return JsonResponse({'error': prontuario_data['error']}, status=404)
+
+    # 3. Gerar (ou reaproveitar) o resumo com o serviço de IA
+    try:
+        resumo, gerado = generate_summary(prontuario_data)
+    except Exception:
+        logger.exception('Falha ao gerar o resumo do prontuário do atendimento %s', atendimento_id)
+        return JsonResponse({'error': 'Não foi possível gerar o resumo do prontuário.'}, status=502)
+
+    # 4. Retornar o resumo como JSON
+    return JsonResponse({
+        'summary': resumo.resumo,
+        'cached': not gerado,
+        'gerado_em': resumo.criado_em.isoformat(),
+        'provedor': resumo.provedor,
+        'modelo': resumo.modelo,
+    })
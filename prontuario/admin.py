@@ -1,13 +1,18 @@
 from django.contrib import admin
-from .models import Evolucao, SinalVital, Prescricao, ItemPrescricao, SolicitacaoExame, ResultadoExame
+from .models import (
+    Evolucao, SinalVital, Prescricao, ItemPrescricao, SolicitacaoExame, ResultadoExame, PontuacaoNEWS2,
+    TempoExameConsolidado, ArquivoLaudo, DispositivoMonitor,
+)
+from .texto_laudos import filtrar_por_texto_laudo
 
 
 @admin.register(Evolucao)
 class EvolucaoAdmin(admin.ModelAdmin):
     list_display = ['atendimento', 'tipo', 'profissional', 'data_hora']
+    list_select_related = ['atendimento__paciente', 'profissional__user']
     list_filter = ['tipo', 'data_hora', 'profissional']
     search_fields = ['atendimento__paciente__nome', 'descricao', 'profissional__user__username']
-    readonly_fields = ['data_hora']
+    readonly_fields = ['data_hora', 'atualizado_em']
     raw_id_fields = ['atendimento', 'profissional']
 
     fieldsets = (
@@ -18,7 +23,7 @@ class EvolucaoAdmin(admin.ModelAdmin):
             'fields': ('tipo', 'profissional', 'descricao')
         }),
         ('Informações de Sistema', {
-            'fields': ('data_hora',),
+            'fields': ('data_hora', 'atualizado_em'),
             'classes': ('collapse',)
         }),
     )
@@ -33,11 +38,13 @@ class SinalVitalAdmin(admin.ModelAdmin):
         'frequencia_cardiaca',
         'temperatura',
         'saturacao_o2',
+        'total_alertas',
         'profissional'
     ]
-    list_filter = ['data_hora', 'profissional']
+    list_select_related = ['atendimento__paciente', 'profissional__user']
+    list_filter = ['data_hora', 'total_alertas', 'profissional']
     search_fields = ['atendimento__paciente__nome', 'observacoes', 'profissional__user__username']
-    readonly_fields = ['data_hora']
+    readonly_fields = ['data_hora', 'atualizado_em', 'alertas', 'total_alertas']
     raw_id_fields = ['atendimento', 'profissional']
 
     fieldsets = (
@@ -56,8 +63,11 @@ class SinalVitalAdmin(admin.ModelAdmin):
         ('Observações', {
             'fields': ('observacoes',)
         }),
+        ('Alertas', {
+            'fields': ('alertas', 'total_alertas')
+        }),
         ('Informações de Sistema', {
-            'fields': ('data_hora',),
+            'fields': ('data_hora', 'atualizado_em'),
             'classes': ('collapse',)
         }),
     )
@@ -72,15 +82,20 @@ class ItemPrescricaoInline(admin.TabularInline):
     """Inline para exibir/editar itens da prescrição"""
     model = ItemPrescricao
     extra = 1
-    fields = ['medicamento', 'dose', 'via', 'frequencia', 'duracao_dias', 'observacoes_item']
+    fields = [
+        'medicamento', 'dose', 'via', 'frequencia', 'duracao_dias', 'observacoes_item',
+        'conflito_alergia', 'alergia_confirmada_por', 'alergia_confirmada_em',
+    ]
+    readonly_fields = ['conflito_alergia', 'alergia_confirmada_por', 'alergia_confirmada_em']
 
 
 @admin.register(Prescricao)
 class PrescricaoAdmin(admin.ModelAdmin):
     list_display = ['atendimento', 'profissional', 'data_prescricao', 'validade', 'status', 'total_itens']
+    list_select_related = ['atendimento__paciente', 'profissional__user']
     list_filter = ['status', 'data_prescricao', 'profissional']
     search_fields = ['atendimento__paciente__nome', 'observacoes', 'profissional__user__username']
-    readonly_fields = ['data_prescricao']
+    readonly_fields = ['data_prescricao', 'atualizado_em']
     raw_id_fields = ['atendimento', 'profissional']
     inlines = [ItemPrescricaoInline]
 
@@ -92,20 +107,26 @@ class PrescricaoAdmin(admin.ModelAdmin):
             'fields': ('validade', 'status', 'observacoes')
         }),
         ('Informações de Sistema', {
-            'fields': ('data_prescricao',),
+            'fields': ('data_prescricao', 'atualizado_em'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_queryset(self, request):
+        """Anota o total de itens para evitar um COUNT por linha da listagem"""
+        return super().get_queryset(request).com_total_itens()
+
     def total_itens(self, obj):
         """Exibe total de medicamentos prescritos"""
         return obj.total_itens()
     total_itens.short_description = 'Total de Medicamentos'
+    total_itens.admin_order_field = 'num_itens'
 
 
 @admin.register(SolicitacaoExame)
 class SolicitacaoExameAdmin(admin.ModelAdmin):
     list_display = ['nome_exame', 'tipo', 'atendimento', 'profissional', 'status', 'data_solicitacao', 'tem_resultado_admin']
+    list_select_related = ['atendimento__paciente', 'profissional__user', 'resultado']
     list_filter = ['tipo', 'status', 'data_solicitacao', 'profissional']
     search_fields = ['nome_exame', 'atendimento__paciente__nome', 'justificativa', 'profissional__user__username']
     readonly_fields = ['data_solicitacao', 'data_atualizacao']
@@ -137,10 +158,11 @@ class SolicitacaoExameAdmin(admin.ModelAdmin):
 
 @admin.register(ResultadoExame)
 class ResultadoExameAdmin(admin.ModelAdmin):
-    list_display = ['solicitacao', 'data_resultado', 'tem_arquivo']
-    list_filter = ['data_resultado']
+    list_display = ['solicitacao', 'data_resultado', 'tem_arquivo', 'status_extracao']
+    list_select_related = ['solicitacao__atendimento__paciente']
+    list_filter = ['data_resultado', 'status_extracao']
     search_fields = ['solicitacao__nome_exame', 'resultado_texto', 'observacoes']
-    readonly_fields = ['data_resultado']
+    readonly_fields = ['data_resultado', 'status_extracao', 'extraido_em', 'texto_laudo']
     raw_id_fields = ['solicitacao']
 
     fieldsets = (
@@ -150,15 +172,96 @@ class ResultadoExameAdmin(admin.ModelAdmin):
         ('Resultado', {
             'fields': ('resultado_texto', 'arquivo_laudo', 'observacoes')
         }),
+        ('Texto do Laudo', {
+            'fields': ('status_extracao', 'extraido_em', 'texto_laudo'),
+            'classes': ('collapse',)
+        }),
         ('Informações de Sistema', {
             'fields': ('data_resultado',),
             'classes': ('collapse',)
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Inclui na busca o texto extraído dos laudos (índice de texto completo)"""
+        resultados, pode_duplicar = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            laudos = filtrar_por_texto_laudo(queryset, search_term).values('pk')
+            resultados = resultados | queryset.filter(pk__in=laudos)
+        return resultados, pode_duplicar
+
     def tem_arquivo(self, obj):
         """Exibe se o resultado possui arquivo anexo"""
         if obj.arquivo_laudo:
             return '✅ Sim'
         return '❌ Não'
     tem_arquivo.short_description = 'Possui Laudo Anexo'
+
+
+@admin.register(PontuacaoNEWS2)
+class PontuacaoNEWS2Admin(admin.ModelAdmin):
+    list_display = ['atendimento', 'total', 'risco', 'variacao', 'parametros_ausentes', 'calculado_em']
+    list_filter = ['risco', 'calculado_em']
+    search_fields = ['atendimento__paciente__nome']
+    readonly_fields = ['calculado_em']
+    raw_id_fields = ['atendimento', 'sinal_vital']
+    list_select_related = ['atendimento__paciente']
+
+    fieldsets = (
+        ('Atendimento', {
+            'fields': ('atendimento', 'sinal_vital')
+        }),
+        ('Pontuação', {
+            'fields': ('total', 'risco', 'variacao', 'parametros_ausentes')
+        }),
+        ('Subescores', {
+            'fields': ('pontos_fr', 'pontos_spo2', 'pontos_pa', 'pontos_fc', 'pontos_temperatura')
+        }),
+        ('Informações de Sistema', {
+            'fields': ('calculado_em',),
+            'classes': ('collapse',)
+        }),
+    )
+
+
+@admin.register(TempoExameConsolidado)
+class TempoExameConsolidadoAdmin(admin.ModelAdmin):
+    list_display = ['dia', 'hora', 'tipo', 'nome_exame', 'quantidade', 'p50_minutos', 'p90_minutos', 'consolidado_em']
+    list_filter = ['tipo', 'dia']
+    search_fields = ['nome_exame']
+    date_hierarchy = 'dia'
+
+    def has_add_permission(self, request):
+        # Linhas geradas pelo comando consolidar_tempos_exames
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArquivoLaudo)
+class ArquivoLaudoAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'tamanho', 'referencias', 'criado_em', 'atualizado_em']
+    list_filter = ['criado_em']
+    search_fields = ['nome']
+
+    def has_add_permission(self, request):
+        # Registros mantidos pelos signals de ResultadoExame e pelo comando coletar_laudos_orfaos
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DispositivoMonitor)
+class DispositivoMonitorAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'profissional', 'ativo', 'criado_em', 'ultimo_uso_em']
+    list_select_related = ['profissional__user']
+    list_filter = ['ativo']
+    search_fields = ['nome', 'profissional__user__username']
+    readonly_fields = ['criado_em', 'ultimo_uso_em']
+    raw_id_fields = ['profissional']
+
+    def has_add_permission(self, request):
+        # Criados pelo comando criar_token_dispositivo, que gera o token
+        return False
@@ -0,0 +1,160 @@
+"""
+Verificação de conflitos entre alergias do paciente e medicamentos prescritos.
+
+Paciente.alergias e ItemPrescricao.medicamento são texto livre. As alergias
+são divididas em termos, cada termo é expandido pelo dicionário de
+sinônimos/classes (ex: "penicilina" -> amoxicilina, ampicilina...) e todos os
+nomes resultantes são compilados em uma única expressão regular. Verificar
+um item é então uma única busca nessa expressão.
+
+O verificador compilado fica em cache (lru_cache) pelo texto de alergias:
+quando o cadastro do paciente muda, o texto muda e um novo verificador é
+compilado; pacientes com as mesmas alergias compartilham o mesmo.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+
+
+_PENICILINAS = (
+    'penicilina', 'benzilpenicilina', 'benzetacil', 'amoxicilina', 'ampicilina',
+    'oxacilina', 'piperacilina',
+)
+_CEFALOSPORINAS = (
+    'cefalexina', 'cefadroxil', 'cefazolina', 'cefuroxima', 'cefoxitina',
+    'ceftriaxona', 'cefotaxima', 'ceftazidima', 'cefepime',
+)
+_CARBAPENEMICOS = ('meropenem', 'imipenem', 'ertapenem')
+_SULFAS = ('sulfametoxazol', 'sulfadiazina', 'bactrim')
+_DIPIRONA = ('dipirona', 'metamizol', 'novalgina')
+_AAS = ('aas', 'acido acetilsalicilico', 'aspirina')
+_AINES = _AAS + (
+    'ibuprofeno', 'diclofenaco', 'cetoprofeno', 'naproxeno', 'nimesulida',
+    'piroxicam', 'meloxicam', 'cetorolaco', 'indometacina', 'celecoxibe',
+)
+_OPIOIDES = ('morfina', 'codeina', 'tramadol', 'fentanil', 'metadona', 'oxicodona', 'nalbufina')
+_QUINOLONAS = ('ciprofloxacino', 'levofloxacino', 'moxifloxacino', 'norfloxacino')
+_MACROLIDEOS = ('azitromicina', 'claritromicina', 'eritromicina')
+_IODO = ('iodopovidona', 'povidine', 'contraste iodado')
+
+# Termo de alergia (normalizado) -> medicamentos que devem ser bloqueados
+SINONIMOS_ALERGIA = {
+    'penicilina': _PENICILINAS,
+    'betalactamico': _PENICILINAS + _CEFALOSPORINAS + _CARBAPENEMICOS,
+    'cefalosporina': _CEFALOSPORINAS,
+    'carbapenemico': _CARBAPENEMICOS,
+    'sulfa': _SULFAS,
+    'sulfonamida': _SULFAS,
+    'dipirona': _DIPIRONA,
+    'metamizol': _DIPIRONA,
+    'novalgina': _DIPIRONA,
+    'aas': _AAS,
+    'aspirina': _AAS,
+    'acido acetilsalicilico': _AAS,
+    'aine': _AINES,
+    'anti-inflamatorio': _AINES,
+    'antiinflamatorio': _AINES,
+    'opioide': _OPIOIDES,
+    'opiaceo': _OPIOIDES,
+    'quinolona': _QUINOLONAS,
+    'macrolideo': _MACROLIDEOS,
+    'iodo': _IODO,
+    'contraste iodado': _IODO,
+}
+
+# Textos que indicam ausência de alergias
+NEGACOES_ALERGIA = {
+    'nega', 'nega alergia', 'nega alergias', 'nenhuma', 'nenhum', 'nao', 'nao possui',
+    'sem alergia', 'sem alergias', 'desconhece', 'nda', 'nkda',
+}
+
+SEPARADORES = re.compile(r'[,;./\n]|\be\b')
+PREFIXOS = re.compile(r'^(?:alergi(?:a|as|co|ca) (?:a|ao|aos|as)|intolerancia (?:a|ao|aos|as)) ')
+PARENTESES = re.compile(r'\([^)]*\)')
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
+    return ' '.join(texto.lower().split())
+
+
+def obter_sinonimos():
+    """Retorna o dicionário vigente (padrão + ALERGIAS_SINONIMOS do settings)"""
+    extras = {
+        normalizar(termo): tuple(normalizar(nome) for nome in nomes)
+        for termo, nomes in getattr(settings, 'ALERGIAS_SINONIMOS', {}).items()
+    }
+    return {**SINONIMOS_ALERGIA, **extras}
+
+
+def extrair_termos(alergias):
+    """
+    Divide o texto de alergias em termos normalizados.
+
+    Ex: "Alergia a Penicilina (urticária); AINEs e dipirona"
+        -> ['penicilina', 'aines', 'dipirona']
+    """
+    termos = []
+    for fragmento in SEPARADORES.split(PARENTESES.sub(' ', normalizar(alergias))):
+        termo = PREFIXOS.sub('', fragmento.strip(' .-')).strip()
+        if len(termo) < 3 or termo in termos or termo in NEGACOES_ALERGIA or termo.startswith('nega '):
+            continue
+        termos.append(termo)
+    return termos
+
+
+class VerificadorAlergias:
+    """Expressão compilada com todos os nomes bloqueados pelas alergias de um paciente"""
+
+    def __init__(self, alergias):
+        sinonimos = obter_sinonimos()
+        # Nome bloqueado -> termo de alergia que o originou
+        self.origens = {}
+        for termo in extrair_termos(alergias):
+            singular = termo[:-1] if termo.endswith('s') else termo
+            nomes = sinonimos.get(termo) or sinonimos.get(singular) or ()
+            for nome in (termo, *nomes):
+                self.origens.setdefault(nome, termo)
+
+        self.padrao = None
+        if self.origens:
+            # Nomes mais longos primeiro para que a alternância prefira o trecho mais específico
+            alternativas = '|'.join(re.escape(nome) for nome in sorted(self.origens, key=len, reverse=True))
+            self.padrao = re.compile(rf'\b(?:{alternativas})\b')
+
+    def __bool__(self):
+        return self.padrao is not None
+
+    def conflitos(self, medicamento):
+        """
+        Retorna os conflitos do medicamento com as alergias.
+
+        Returns:
+            list: dicionários {'trecho': nome encontrado, 'alergia': termo de alergia}.
+        """
+        if self.padrao is None:
+            return []
+        return [
+            {'trecho': trecho, 'alergia': self.origens[trecho]}
+            for trecho in dict.fromkeys(self.padrao.findall(normalizar(medicamento)))
+        ]
+
+
+@lru_cache(maxsize=2048)
+def compilar_verificador(alergias):
+    """Verificador compilado (e cacheado) para o texto de alergias"""
+    return VerificadorAlergias(alergias)
+
+
+def verificador_do_paciente(paciente):
+    """Verificador das alergias atuais do paciente"""
+    return compilar_verificador(paciente.alergias or '')
+
+
+def descrever_conflitos(conflitos):
+    """Texto curto para exibição, ex: 'amoxicilina (alergia: penicilina)'"""
+    return ', '.join(f"{conflito['trecho']} (alergia: {conflito['alergia']})" for conflito in conflitos)
@@ -0,0 +1,149 @@
+"""
+Regras de alerta dos sinais vitais.
+
+Cada regra ocupa um bit fixo da máscara persistida em SinalVital.alertas,
+o que permite filtrar e ordenar pacientes por alteração diretamente no banco.
+Novas regras devem ser adicionadas sempre ao final da lista para não alterar
+o significado dos bits já gravados.
+
+Valores não aferidos (ver aferido) não geram alerta; o NEWS2
+(prontuario.news2) segue a mesma regra.
+"""
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+
+# (chave, descrição, campo, operador)
+REGRAS_ALERTA = [
+    ('PA_SISTOLICA_ELEVADA', 'Pressão sistólica elevada', 'pressao_arterial_sistolica', '>'),
+    ('PA_DIASTOLICA_ELEVADA', 'Pressão diastólica elevada', 'pressao_arterial_diastolica', '>'),
+    ('BRADICARDIA', 'Bradicardia', 'frequencia_cardiaca', '<'),
+    ('TAQUICARDIA', 'Taquicardia', 'frequencia_cardiaca', '>'),
+    ('HIPOTERMIA', 'Hipotermia', 'temperatura', '<'),
+    ('FEBRE', 'Febre', 'temperatura', '>'),
+    ('SATURACAO_BAIXA', 'Saturação baixa', 'saturacao_o2', '<'),
+]
+
+# Limites padrão; podem ser sobrescritos em settings.SINAIS_VITAIS_LIMITES_ALERTA
+LIMITES_PADRAO = {
+    'PA_SISTOLICA_ELEVADA': 140,
+    'PA_DIASTOLICA_ELEVADA': 90,
+    'BRADICARDIA': 60,
+    'TAQUICARDIA': 100,
+    'HIPOTERMIA': 36.0,
+    'FEBRE': 37.5,
+    'SATURACAO_BAIXA': 95,
+}
+
+BITS_ALERTA = {chave: 1 << posicao for posicao, (chave, _, _, _) in enumerate(REGRAS_ALERTA)}
+
+ALERTA_CHOICES = [(chave, descricao) for chave, descricao, _, _ in REGRAS_ALERTA]
+
+CAMPOS_ALERTA = sorted({campo for _, _, campo, _ in REGRAS_ALERTA})
+
+
+def obter_limites():
+    """Retorna os limites vigentes (padrões + sobrescritas do settings)"""
+    return {**LIMITES_PADRAO, **getattr(settings, 'SINAIS_VITAIS_LIMITES_ALERTA', {})}
+
+
+def aferido(valor):
+    """
+    Se o valor do sinal vital foi aferido.
+
+    Ausentes (None, vazio, NaN) e zero contam como não aferidos: nenhum sinal
+    vital válido é zero (ver os validadores de SinalVital), então o zero só
+    aparece em registros antigos ou importados como "sem leitura".
+    """
+    if valor in (None, ''):
+        return False
+    valor = float(valor)
+    return valor != 0 and not math.isnan(valor)
+
+
+def mascarar_nao_aferidos(valores):
+    """Array de floats com NaN no lugar dos valores não aferidos (ver aferido)"""
+    valores = np.asarray(valores, dtype=np.float64)
+    return np.where(valores == 0, np.nan, valores)
+
+
+def calcular_alertas(sinal_vital):
+    """Calcula a máscara de alertas de um registro de sinais vitais"""
+    limites = obter_limites()
+    mascara = 0
+
+    for chave, _, campo, operador in REGRAS_ALERTA:
+        valor = getattr(sinal_vital, campo)
+        if not aferido(valor):
+            continue
+        valor = float(valor)
+        if operador == '>' and valor > limites[chave]:
+            mascara |= BITS_ALERTA[chave]
+        elif operador == '<' and valor < limites[chave]:
+            mascara |= BITS_ALERTA[chave]
+
+    return mascara
+
+
+def calcular_alertas_em_lote(colunas):
+    """
+    Versão vetorizada de calcular_alertas.
+
+    Args:
+        colunas (dict): campo -> array NumPy de floats, com NaN para valores ausentes.
+
+    Returns:
+        tuple: (máscaras, total de alertas por linha) como arrays NumPy.
+    """
+    limites = obter_limites()
+    tamanho = len(next(iter(colunas.values())))
+    mascaras = np.zeros(tamanho, dtype=np.int64)
+
+    for chave, _, campo, operador in REGRAS_ALERTA:
+        # Comparações com NaN resultam em False: não aferidos não geram alerta
+        valores = mascarar_nao_aferidos(colunas[campo])
+        with np.errstate(invalid='ignore'):
+            if operador == '>':
+                alterado = valores > limites[chave]
+            else:
+                alterado = valores < limites[chave]
+        mascaras[alterado] |= BITS_ALERTA[chave]
+
+    totais = np.zeros(tamanho, dtype=np.int64)
+    for bit in BITS_ALERTA.values():
+        totais += (mascaras & bit) > 0
+
+    return mascaras, totais
+
+
+def contar_alertas(mascara):
+    """Quantidade de alertas ativos na máscara"""
+    return bin(mascara).count('1')
+
+
+def descrever_alertas(mascara):
+    """Converte a máscara na lista de descrições dos alertas"""
+    return [
+        descricao
+        for chave, descricao, _, _ in REGRAS_ALERTA
+        if mascara & BITS_ALERTA[chave]
+    ]
+
+
+def atualizar_ultimo_sinal_vital(atendimentos):
+    """
+    Recalcula o ponteiro Atendimento.ultimo_sinal_vital em um único UPDATE.
+
+    Args:
+        atendimentos: queryset de Atendimento a atualizar.
+    """
+    from .models import SinalVital
+
+    ultimo = SinalVital.objects.filter(
+        atendimento=OuterRef('pk')
+    ).order_by('-data_hora', '-pk').values('pk')[:1]
+
+    return atendimentos.update(ultimo_sinal_vital=Subquery(ultimo))
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProntuarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prontuario'
+
+    def ready(self):
+        """Registra os signals do app"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,278 @@
+"""
+Armazenamento endereçado por conteúdo dos arquivos de laudo.
+
+Cada arquivo é gravado uma única vez em laudos/sha256/ab/cd/<sha256>.<ext>,
+com o nome derivado do SHA-256 do conteúdo. O hash é calculado enquanto o
+upload é copiado para um temporário no mesmo disco, então o arquivo é lido
+uma só vez. Um laudo reenviado (ex: o laboratório manda o mesmo PDF de novo)
+aponta para o arquivo já existente.
+
+As referências de cada arquivo ficam em ArquivoLaudo (mantidas pelos
+signals de ResultadoExame). Arquivos sem referência são removidos pelo
+comando coletar_laudos_orfaos.
+
+Com LAUDOS_COMPRIMIR, os tipos que comprimem bem (PDF, imagens sem
+compressão) são gravados em zstd como <nome>.zst, com o dicionário treinado
+nos próprios laudos (comando comprimir_laudos). O nome do laudo continua o
+original: open() descomprime em fluxo e size() devolve o tamanho original.
+JPEG e PNG já são comprimidos e nunca passam pelo zstd. Os dicionários ficam
+em laudos/zstd/<id>.dict, junto dos arquivos que dependem deles.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import zstandard
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+PREFIXO_CONTEUDO = 'laudos/sha256'
+
+EXTENSOES_COMPRIMIVEIS = ('.pdf', '.tif', '.tiff', '.bmp')
+
+SUFIXO_ZSTD = '.zst'
+
+DIRETORIO_DICIONARIOS = 'laudos/zstd'
+
+# Só grava comprimido se economizar ao menos 5% (PDFs de imagens quase não comprimem)
+RAZAO_MAXIMA_COMPRESSAO = 0.95
+
+# Maior cabeçalho possível de um frame zstd
+TAMANHO_CABECALHO_ZSTD = 18
+
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+# Dicionários já carregados, por id (são imutáveis)
+_dicionarios = {}
+
+NOME_CONTEUDO_RE = re.compile(r'^laudos/sha256/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$')
+
+
+def nome_por_conteudo(resumo, extensao=''):
+    """Caminho do arquivo com o hash `resumo` (hexadecimal)"""
+    return f'{PREFIXO_CONTEUDO}/{resumo[:2]}/{resumo[2:4]}/{resumo}{extensao}'
+
+
+def nome_derivado(nome, sufixo):
+    """Nome de um arquivo derivado (ex: prévia) gravado ao lado do original"""
+    return f'{os.path.splitext(nome)[0]}.{sufixo}'
+
+
+def hash_do_nome(nome):
+    """Hash do conteúdo de um nome endereçado por conteúdo (None para os demais)"""
+    correspondencia = NOME_CONTEUDO_RE.match(nome or '')
+    return correspondencia.group(1) if correspondencia else None
+
+
+def comprimivel(nome):
+    """Se o tipo do arquivo se beneficia da compressão (nunca JPEG/PNG)"""
+    return (nome or '').lower().endswith(EXTENSOES_COMPRIMIVEIS)
+
+
+def nome_do_laudo(nome_gravado):
+    """Nome do laudo correspondente a um arquivo gravado (sem o sufixo .zst)"""
+    return nome_gravado[:-len(SUFIXO_ZSTD)] if nome_gravado.endswith(SUFIXO_ZSTD) else nome_gravado
+
+
+@deconstructible
+class ArmazenamentoLaudos(FileSystemStorage):
+    """FileSystemStorage que grava cada conteúdo uma única vez"""
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final vem do conteúdo (_save); não procura nome livre
+        return name
+
+    def _save(self, name, content):
+        extensao = os.path.splitext(name)[1].lower()
+        diretorio = self.path(PREFIXO_CONTEUDO)
+        os.makedirs(diretorio, exist_ok=True)
+
+        resumo = hashlib.sha256()
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.upload')
+        try:
+            with os.fdopen(descritor, 'wb') as destino:
+                for bloco in content.chunks():
+                    resumo.update(bloco)
+                    destino.write(bloco)
+
+            nome = nome_por_conteudo(resumo.hexdigest(), extensao)
+            if self.exists(nome):
+                # Conteúdo duplicado: renova a data para o coletor respeitar a carência
+                os.utime(self.path(self.nome_gravado(nome)))
+                return nome
+
+            gravado = nome
+            if settings.LAUDOS_COMPRIMIR and comprimivel(nome):
+                comprimido = self._comprimir(temporario)
+                if comprimido:
+                    os.remove(temporario)
+                    temporario, gravado = comprimido, nome + SUFIXO_ZSTD
+            caminho = self.path(gravado)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            os.chmod(temporario, self.file_permissions_mode or 0o644)
+            os.replace(temporario, caminho)
+            return nome
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def salvar_derivado(self, nome, dados):
+        """Grava `dados` (bytes) exatamente em `nome`, substituindo o anterior"""
+        caminho = self.path(nome)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.upload')
+        try:
+            with os.fdopen(descritor, 'wb') as destino:
+                destino.write(dados)
+            os.chmod(temporario, self.file_permissions_mode or 0o644)
+            os.replace(temporario, caminho)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return nome
+
+    # Compressão
+
+    def comprimido(self, name):
+        """Se o arquivo está gravado comprimido (<name>.zst)"""
+        return os.path.exists(self.path(name + SUFIXO_ZSTD))
+
+    def nome_gravado(self, name):
+        """Nome do arquivo efetivamente gravado para o laudo `name`"""
+        return name + SUFIXO_ZSTD if self.comprimido(name) else name
+
+    def exists(self, name):
+        return super().exists(self.nome_gravado(name))
+
+    def delete(self, name):
+        super().delete(self.nome_gravado(name))
+
+    def get_accessed_time(self, name):
+        return super().get_accessed_time(self.nome_gravado(name))
+
+    def get_created_time(self, name):
+        return super().get_created_time(self.nome_gravado(name))
+
+    def get_modified_time(self, name):
+        return super().get_modified_time(self.nome_gravado(name))
+
+    def size(self, name):
+        if not self.comprimido(name):
+            return super().size(name)
+        return self._parametros_zstd(name).content_size
+
+    def _open(self, name, mode='rb'):
+        if not self.comprimido(name):
+            return super()._open(name, mode)
+        if mode not in ('r', 'rb'):
+            raise ValueError(f'Arquivo comprimido aberto apenas para leitura: {name}')
+        parametros = self._parametros_zstd(name)
+        descompressor = zstandard.ZstdDecompressor(
+            dict_data=self.dicionario(parametros.dict_id) if parametros.dict_id else None
+        )
+        leitor = descompressor.stream_reader(open(self.path(name + SUFIXO_ZSTD), 'rb'), closefd=True)
+        arquivo = File(leitor, name=name)
+        arquivo.size = parametros.content_size
+        return arquivo
+
+    @contextlib.contextmanager
+    def caminho_local(self, name):
+        """
+        Caminho de um arquivo com o conteúdo original do laudo.
+
+        Para quem precisa do arquivo no disco (ex: pypdfium2 no pool de
+        processos): laudos comprimidos são descomprimidos em um temporário,
+        removido ao sair do bloco.
+        """
+        if not self.comprimido(name):
+            yield self.path(name)
+            return
+        with self.open(name) as origem, tempfile.NamedTemporaryFile(suffix=os.path.splitext(name)[1]) as destino:
+            shutil.copyfileobj(origem, destino, TAMANHO_BLOCO_COPIA)
+            destino.flush()
+            yield destino.name
+
+    def comprimir_gravado(self, name):
+        """
+        Comprime um laudo já gravado sem compressão.
+
+        Returns:
+            int: bytes economizados (0 se o tipo não é comprimível, o arquivo
+            já está comprimido ou a compressão não compensa).
+        """
+        if not comprimivel(name) or self.comprimido(name):
+            return 0
+        caminho = self.path(name)
+        comprimido = self._comprimir(caminho)
+        if not comprimido:
+            return 0
+        original = os.stat(caminho)
+        economia = original.st_size - os.path.getsize(comprimido)
+        # Mantém a data original: a carência do coletor e o Last-Modified não mudam
+        os.chmod(comprimido, self.file_permissions_mode or 0o644)
+        os.utime(comprimido, ns=(original.st_atime_ns, original.st_mtime_ns))
+        # O .zst passa a valer assim que existe; só então o original é removido
+        os.replace(comprimido, caminho + SUFIXO_ZSTD)
+        os.remove(caminho)
+        return economia
+
+    def _comprimir(self, caminho):
+        """Comprime `caminho` em um temporário; None se não economizar o suficiente"""
+        tamanho = os.path.getsize(caminho)
+        compressor = zstandard.ZstdCompressor(
+            level=settings.LAUDOS_ZSTD_NIVEL,
+            dict_data=self.dicionario_atual()
+        )
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.upload')
+        try:
+            with open(caminho, 'rb') as entrada, os.fdopen(descritor, 'wb') as saida:
+                _, gravados = compressor.copy_stream(entrada, saida, size=tamanho)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        if gravados > tamanho * RAZAO_MAXIMA_COMPRESSAO:
+            os.remove(temporario)
+            return None
+        return temporario
+
+    def _parametros_zstd(self, name):
+        with open(self.path(name + SUFIXO_ZSTD), 'rb') as arquivo:
+            return zstandard.get_frame_parameters(arquivo.read(TAMANHO_CABECALHO_ZSTD))
+
+    # Dicionários
+
+    def dicionario(self, dict_id):
+        """Dicionário zstd gravado com o id `dict_id`"""
+        if dict_id not in _dicionarios:
+            with open(self.path(f'{DIRETORIO_DICIONARIOS}/{dict_id}.dict'), 'rb') as arquivo:
+                _dicionarios[dict_id] = zstandard.ZstdCompressionDict(arquivo.read())
+        return _dicionarios[dict_id]
+
+    def dicionario_atual(self):
+        """Dicionário usado nas novas compressões (None se nenhum foi treinado)"""
+        try:
+            with open(self.path(f'{DIRETORIO_DICIONARIOS}/atual'), encoding='ascii') as arquivo:
+                dict_id = int(arquivo.read())
+        except FileNotFoundError:
+            return None
+        return self.dicionario(dict_id)
+
+    def gravar_dicionario(self, dicionario):
+        """Grava o dicionário e o torna o atual (os anteriores continuam lendo os arquivos antigos)"""
+        dict_id = dicionario.dict_id()
+        self.salvar_derivado(f'{DIRETORIO_DICIONARIOS}/{dict_id}.dict', dicionario.as_bytes())
+        self.salvar_derivado(f'{DIRETORIO_DICIONARIOS}/atual', str(dict_id).encode('ascii'))
+        return dict_id
+
+
+_armazenamento = ArmazenamentoLaudos()
+
+
+def armazenamento_laudos():
+    """Storage do campo ResultadoExame.arquivo_laudo"""
+    return _armazenamento
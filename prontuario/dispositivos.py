@@ -0,0 +1,49 @@
+"""
+Autenticação dos monitores de beira-leito na API de ingestão de sinais vitais.
+
+Monitores não têm sessão nem token CSRF: enviam o cabeçalho
+`Authorization: Token <token>` com um token criado pelo comando
+criar_token_dispositivo. O token é comparado pelo SHA-256 guardado em
+DispositivoMonitor; dispositivos inativos são recusados.
+"""
+import hashlib
+import secrets
+
+from django.utils import timezone
+
+PREFIXO_AUTORIZACAO = 'Token '
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def criar_dispositivo(nome, profissional):
+    """Cadastra o dispositivo e retorna (dispositivo, token); o token não é guardado"""
+    from .models import DispositivoMonitor
+
+    token = secrets.token_urlsafe(32)
+    dispositivo = DispositivoMonitor.objects.create(nome=nome, profissional=profissional, hash_token=hash_token(token))
+    return dispositivo, token
+
+
+def token_da_requisicao(request):
+    """Token do cabeçalho Authorization, ou None se a requisição não trouxer um"""
+    autorizacao = request.headers.get('Authorization', '')
+    if not autorizacao.startswith(PREFIXO_AUTORIZACAO):
+        return None
+    return autorizacao[len(PREFIXO_AUTORIZACAO):].strip()
+
+
+def autenticar_dispositivo(token):
+    """Dispositivo ativo com o token (registrando o uso), ou None"""
+    from .models import DispositivoMonitor
+
+    dispositivo = DispositivoMonitor.objects.select_related('profissional').filter(
+        hash_token=hash_token(token), ativo=True
+    ).first()
+    if dispositivo:
+        agora = timezone.now()
+        DispositivoMonitor.objects.filter(pk=dispositivo.pk).update(ultimo_uso_em=agora)
+        dispositivo.ultimo_uso_em = agora
+    return dispositivo
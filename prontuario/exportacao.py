@@ -0,0 +1,143 @@
+"""
+Exportação do prontuário completo do atendimento para impressão.
+
+O documento é um HTML autocontido e otimizado para impressão (o navegador
+gera o PDF com "Salvar como PDF"). A timeline é lida com iterar_eventos e
+renderizada em blocos, então a memória usada não depende do tamanho do
+atendimento.
+
+Cada documento gerado é gravado em VAR_ROOT/exportacoes com a versão do
+atendimento no nome do arquivo. A versão muda sempre que o atendimento ou
+qualquer registro dele é criado, alterado ou removido, então um arquivo
+existente é sempre atual e pode ser servido diretamente. Atendimentos com
+muitos eventos são gerados em segundo plano (prontuario.tarefas).
+"""
+import hashlib
+import os
+import tempfile
+from glob import glob
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import tarefas
+from .models import Evolucao, Prescricao, SinalVital, SolicitacaoExame
+from .timeline import iterar_eventos
+
+# Acima desta quantidade de eventos o documento é gerado em segundo plano
+LIMIAR_SEGUNDO_PLANO = 2000
+
+EVENTOS_POR_BLOCO = 200
+
+TEMPLATE_DOCUMENTO = 'prontuario/exportacao_prontuario.html'
+TEMPLATE_EVENTOS = 'prontuario/partials/exportacao_eventos.html'
+
+# Marcador no template onde os eventos são inseridos
+MARCADOR_EVENTOS = '<!-- eventos-exportacao -->'
+
+
+def diretorio_exportacoes():
+    return os.path.join(settings.VAR_ROOT, 'exportacoes')
+
+
+def versao_atendimento(atendimento):
+    """
+    Calcula a versão do conteúdo exportável do atendimento.
+
+    Returns:
+        tuple: (versão em hexadecimal, total de eventos).
+    """
+    partes = [atendimento.atualizado_em, atendimento.paciente.atualizado_em]
+    total = 0
+    for modelo, campo in [
+        (Evolucao, 'atualizado_em'),
+        (SinalVital, 'atualizado_em'),
+        (Prescricao, 'atualizado_em'),
+        (SolicitacaoExame, 'data_atualizacao'),
+    ]:
+        # Quantidade captura remoções; a data mais recente captura criações e alterações
+        resumo = modelo.objects.filter(atendimento=atendimento).aggregate(
+            quantidade=Count('pk'),
+            ultima=Max(campo)
+        )
+        partes += [resumo['quantidade'], resumo['ultima']]
+        total += resumo['quantidade']
+
+    versao = hashlib.sha1(repr(partes).encode()).hexdigest()[:16]
+    return versao, total
+
+
+def caminho_exportacao(atendimento_id, versao):
+    return os.path.join(diretorio_exportacoes(), f'atendimento_{atendimento_id}_{versao}.html')
+
+
+def gerar_html(atendimento):
+    """Gera o documento em blocos de texto, do cabeçalho ao rodapé"""
+    documento = render_to_string(TEMPLATE_DOCUMENTO, {
+        'atendimento': atendimento,
+        'paciente': atendimento.paciente,
+        'gerado_em': timezone.now(),
+    })
+    inicio, fim = documento.split(MARCADOR_EVENTOS, 1)
+    yield inicio
+
+    bloco = []
+    for evento in iterar_eventos(atendimento_id=atendimento.pk):
+        bloco.append(evento)
+        if len(bloco) >= EVENTOS_POR_BLOCO:
+            yield render_to_string(TEMPLATE_EVENTOS, {'eventos': bloco})
+            bloco = []
+    if bloco:
+        yield render_to_string(TEMPLATE_EVENTOS, {'eventos': bloco})
+
+    yield fim
+
+
+def gravar_em_arquivo(atendimento, versao, blocos):
+    """
+    Repassa os blocos gerados enquanto os grava no arquivo da versão.
+
+    O arquivo só aparece (os.replace) quando o documento termina; se a
+    geração for interrompida, o temporário é descartado.
+    """
+    os.makedirs(diretorio_exportacoes(), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio_exportacoes(), suffix='.tmp')
+    concluido = False
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            for bloco in blocos:
+                arquivo.write(bloco)
+                yield bloco
+        os.replace(temporario, caminho_exportacao(atendimento.pk, versao))
+        concluido = True
+        remover_versoes_antigas(atendimento.pk, versao)
+    finally:
+        if not concluido and os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def exportar(atendimento, versao):
+    """Gera e grava o documento completo (usado pela tarefa em segundo plano)"""
+    for _ in gravar_em_arquivo(atendimento, versao, gerar_html(atendimento)):
+        pass
+
+
+def agendar_exportacao(atendimento, versao):
+    """Agenda a geração em segundo plano; ignora se já estiver em andamento"""
+    return tarefas.agendar(f'exportacao:{atendimento.pk}:{versao}', exportar, atendimento, versao)
+
+
+def exportacao_em_andamento(atendimento_id, versao):
+    return tarefas.em_andamento(f'exportacao:{atendimento_id}:{versao}')
+
+
+def remover_versoes_antigas(atendimento_id, versao_atual):
+    """Remove os documentos de versões anteriores do atendimento"""
+    for caminho in glob(os.path.join(diretorio_exportacoes(), f'atendimento_{atendimento_id}_*.html')):
+        if caminho != caminho_exportacao(atendimento_id, versao_atual):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,140 @@
+"""
+Fila de trabalho departamental de exames (laboratório, imagem etc.).
+
+Lista as solicitações em aberto (SOLICITADO/COLETADO) de todos os
+atendimentos, da mais antiga para a mais recente. A consulta usa o índice
+parcial solicitacao_abertas_idx, que contém apenas as solicitações em
+aberto, e a paginação usa cursor (data da solicitação, id) em vez de OFFSET.
+
+A atualização automática da tela consulta apenas as solicitações alteradas
+desde o último cursor (índice em data_atualizacao), em vez de recarregar a
+fila inteira.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import SolicitacaoExame
+
+
+STATUS_ABERTOS = ['SOLICITADO', 'COLETADO']
+
+# Filtro de idade: solicitações abertas há pelo menos N horas
+IDADE_CHOICES = [
+    (1, 'Há mais de 1 hora'),
+    (4, 'Há mais de 4 horas'),
+    (24, 'Há mais de 24 horas'),
+]
+
+EXAMES_POR_PAGINA = 50
+
+# Máximo de alterações devolvidas por consulta de atualização
+LIMITE_ATUALIZACOES = 500
+
+# Janela revisitada a cada atualização, para não perder alterações gravadas
+# por transações que terminaram depois de outras mais recentes
+SOBREPOSICAO_ATUALIZACOES = timedelta(seconds=5)
+
+
+def fila_exames(tipo=None, idade_horas=None):
+    """Queryset das solicitações em aberto, das mais antigas para as mais recentes"""
+    solicitacoes = SolicitacaoExame.objects.filter(
+        status__in=STATUS_ABERTOS
+    ).select_related(
+        'atendimento__paciente',
+        'profissional__user'
+    ).order_by('data_solicitacao', 'pk')
+
+    if tipo:
+        solicitacoes = solicitacoes.filter(tipo=tipo)
+    if idade_horas:
+        solicitacoes = solicitacoes.filter(data_solicitacao__lte=timezone.now() - timedelta(hours=idade_horas))
+
+    return solicitacoes
+
+
+def filtros_da_requisicao(request):
+    """Extrai os filtros (?tipo=..., ?idade=horas) ignorando valores inválidos"""
+    tipo = request.GET.get('tipo')
+    if tipo not in dict(SolicitacaoExame.TIPO_CHOICES):
+        tipo = None
+    idade = request.GET.get('idade', '')
+    idade_horas = int(idade) if idade.isdigit() and int(idade) in dict(IDADE_CHOICES) else None
+    return tipo, idade_horas
+
+
+def codificar_cursor(solicitacao):
+    """Serializa a posição de uma solicitação para uso na query string"""
+    return f'{solicitacao.data_solicitacao.isoformat()}|{solicitacao.pk}'
+
+
+def decodificar_cursor(cursor):
+    """Converte o cursor da query string em (data, id)"""
+    try:
+        data_iso, pk = cursor.split('|')
+        data = parse_datetime(data_iso)
+        if data is None:
+            raise ValueError
+        return data, int(pk)
+    except ValueError:
+        raise ValueError(f'Cursor inválido: {cursor}')
+
+
+def pagina_fila(solicitacoes, cursor=None, limite=EXAMES_POR_PAGINA):
+    """
+    Retorna (solicitações, próximo cursor) com até `limite` itens após o cursor.
+
+    Busca `limite + 1` linhas; a excedente indica se existe próxima página.
+    """
+    if cursor:
+        data, pk = decodificar_cursor(cursor)
+        solicitacoes = solicitacoes.filter(
+            Q(data_solicitacao__gt=data) | Q(data_solicitacao=data, pk__gt=pk)
+        )
+
+    itens = list(solicitacoes[:limite + 1])
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor(itens[-1])
+
+    return itens, proximo_cursor
+
+
+def atualizacoes_desde(desde, tipo=None, idade_horas=None):
+    """
+    Alterações na fila desde o instante `desde`.
+
+    Returns:
+        dict: 'abertos' (id -> status das solicitações em aberto alteradas ou
+        criadas), 'encerrados' (ids que saíram da fila) e 'desde' (cursor para
+        a próxima consulta).
+    """
+    alteradas = SolicitacaoExame.objects.filter(
+        data_atualizacao__gt=desde - SOBREPOSICAO_ATUALIZACOES
+    )
+    if tipo:
+        alteradas = alteradas.filter(tipo=tipo)
+    if idade_horas:
+        alteradas = alteradas.filter(data_solicitacao__lte=timezone.now() - timedelta(hours=idade_horas))
+
+    linhas = list(
+        alteradas.order_by('data_atualizacao').values_list('pk', 'status', 'data_atualizacao')[:LIMITE_ATUALIZACOES]
+    )
+
+    return {
+        'abertos': {pk: status for pk, status, _ in linhas if status in STATUS_ABERTOS},
+        'encerrados': [pk for pk, status, _ in linhas if status not in STATUS_ABERTOS],
+        'desde': max([desde] + [data for _, _, data in linhas]).isoformat(),
+    }
+
+
+def marcar_coletados(ids):
+    """Marca como COLETADO, em um único UPDATE, as solicitações ainda SOLICITADAS"""
+    # update() não aplica auto_now; data_atualizacao invalida os cards cacheados
+    return SolicitacaoExame.objects.filter(
+        pk__in=ids,
+        status='SOLICITADO'
+    ).update(status='COLETADO', data_atualizacao=timezone.now())
@@ -2,7 +2,10 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.forms import inlineformset_factory
 from datetime import date, timedelta
-from .models import Evolucao, SinalVital, Prescricao, ItemPrescricao, SolicitacaoExame, ResultadoExame
+from django.utils import timezone
+from .alergias import descrever_conflitos
+from .models import Evolucao, SinalVital, Prescricao, ItemPrescricao, SolicitacaoExame, ResultadoExame, UploadLaudo
+from .uploads import TAMANHO_MAXIMO_FORMULARIO, validar_conteudo, validar_extensao
 
 
 class EvolucaoForm(forms.ModelForm):
@@ -164,6 +167,13 @@ class PrescricaoForm(forms.ModelForm):
 class ItemPrescricaoForm(forms.ModelForm):
     """Formulário para itens individuais da prescrição"""
 
+    ciente_alergia = forms.BooleanField(
+        required=False,
+        label='Ciente do conflito com alergias; manter o medicamento'
+    )
+    # Conflito exibido quando a confirmação foi oferecida: ela só vale para ele
+    conflito_confirmado = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = ItemPrescricao
         fields = ['medicamento', 'dose', 'via', 'frequencia', 'duracao_dias', 'observacoes_item']
@@ -196,6 +206,49 @@ class ItemPrescricaoForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, verificador_alergias=None, profissional=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Verificador compilado das alergias do paciente (prontuario.alergias)
+        self.verificador_alergias = verificador_alergias
+        # Prescritor registrado como responsável pela confirmação de um conflito
+        self.profissional = profissional
+        self.conflitos_alergia = []
+
+    def clean(self):
+        """Bloqueia medicamentos que conflitam com as alergias, salvo confirmação do médico"""
+        cleaned_data = super().clean()
+        medicamento = cleaned_data.get('medicamento')
+
+        if self.verificador_alergias and medicamento:
+            self.conflitos_alergia = self.verificador_alergias.conflitos(medicamento)
+            conflito = descrever_conflitos(self.conflitos_alergia)
+            confirmado = cleaned_data.get('ciente_alergia') and cleaned_data.get('conflito_confirmado') == conflito
+            if self.conflitos_alergia and not confirmado:
+                self.add_error(
+                    'medicamento',
+                    f'Conflito com alergia do paciente: {conflito}. Confirme abaixo para manter o medicamento.'
+                )
+                self._exigir_confirmacao(conflito)
+
+        return cleaned_data
+
+    def _exigir_confirmacao(self, conflito):
+        """Reapresenta a confirmação desmarcada e vinculada ao conflito atual"""
+        self.data = self.data.copy()
+        self.data[self.add_prefix('conflito_confirmado')] = conflito
+        self.data.pop(self.add_prefix('ciente_alergia'), None)
+
+    def save(self, commit=True):
+        """Registra quem confirmou o conflito com alergias, e quando"""
+        item = super().save(commit=False)
+        if self.conflitos_alergia:
+            item.conflito_alergia = descrever_conflitos(self.conflitos_alergia)
+            item.alergia_confirmada_por = self.profissional
+            item.alergia_confirmada_em = timezone.now()
+        if commit:
+            item.save()
+        return item
+
 
 # FormSet para permitir múltiplos medicamentos em uma prescrição
 ItemPrescricaoFormSet = inlineformset_factory(
@@ -234,6 +287,9 @@ class SolicitacaoExameForm(forms.ModelForm):
 class ResultadoExameForm(forms.ModelForm):
     """Formulário para registro de resultado de exame"""
 
+    # Envio em partes já concluído (prontuario.uploads), usado no lugar de arquivo_laudo
+    upload_laudo = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = ResultadoExame
         fields = ['resultado_texto', 'arquivo_laudo', 'observacoes']
@@ -254,24 +310,42 @@ class ResultadoExameForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, solicitacao=None, erros_upload=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.solicitacao = solicitacao
+        # Arquivos descartados durante o envio (prontuario.uploads.ValidadorUploadLaudo)
+        self.erros_upload = erros_upload or {}
+
+    def clean_upload_laudo(self):
+        """Substitui o id do envio em partes pelo envio concluído da mesma solicitação"""
+        upload_id = self.cleaned_data.get('upload_laudo')
+        if not upload_id:
+            return None
+
+        upload = UploadLaudo.objects.filter(
+            pk=upload_id,
+            solicitacao=self.solicitacao
+        ).exclude(arquivo='').first()
+        if upload is None:
+            raise ValidationError('O envio do laudo não foi concluído; selecione o arquivo novamente.')
+        return upload
+
     def clean_arquivo_laudo(self):
-        """Valida o tipo e tamanho do arquivo enviado"""
+        """Valida o tipo, o conteúdo e o tamanho do arquivo enviado"""
+        if 'arquivo_laudo' in self.erros_upload:
+            raise ValidationError(self.erros_upload['arquivo_laudo'])
+
         arquivo = self.cleaned_data.get('arquivo_laudo')
 
         if arquivo:
-            # Valida extensão do arquivo
-            extensoes_validas = ['.pdf', '.jpg', '.jpeg', '.png']
-            nome_arquivo = arquivo.name.lower()
-            if not any(nome_arquivo.endswith(ext) for ext in extensoes_validas):
-                raise ValidationError(
-                    'Apenas arquivos PDF e imagens (JPG, PNG) são permitidos.'
-                )
+            validar_extensao(arquivo.name)
 
-            # Valida tamanho (max 10MB)
-            max_size = 10 * 1024 * 1024  # 10MB em bytes
-            if arquivo.size > max_size:
+            if arquivo.size > TAMANHO_MAXIMO_FORMULARIO:
                 raise ValidationError(
                     'O arquivo não pode exceder 10MB.'
                 )
 
+            # Confere os bytes recebidos (assinatura e, nos PDFs, o fim do arquivo)
+            validar_conteudo(arquivo.name, arquivo, arquivo.size)
+
         return arquivo
@@ -0,0 +1,243 @@
+"""
+Ingestão em lote de sinais vitais enviados por monitores de beira-leito.
+
+A validação reproduz as regras de SinalVitalForm.clean e das faixas dos
+validadores do modelo, mas aplicada a colunas NumPy: cada regra é avaliada
+uma única vez para o lote inteiro. As linhas válidas são inseridas com
+bulk_create ou, em lotes grandes no PostgreSQL, com COPY.
+"""
+import csv
+import io
+import math
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from atendimentos.models import Atendimento
+from .alertas import CAMPOS_ALERTA, atualizar_ultimo_sinal_vital, calcular_alertas_em_lote
+from .models import SinalVital
+
+
+CAMPOS_VITAIS = [
+    'pressao_arterial_sistolica',
+    'pressao_arterial_diastolica',
+    'frequencia_cardiaca',
+    'frequencia_respiratoria',
+    'temperatura',
+    'saturacao_o2',
+    'glicemia',
+]
+
+# Quantidade máxima de leituras aceitas por requisição
+MAXIMO_LEITURAS_POR_LOTE = 10000
+
+# A partir deste tamanho, o PostgreSQL recebe as linhas via COPY
+LIMIAR_COPY = 2000
+
+TAMANHO_LOTE_INSERCAO = 1000
+
+
+@lru_cache(maxsize=None)
+def limites_campos():
+    """Faixas (mínimo, máximo) de cada campo, lidas dos validadores do modelo"""
+    limites = {}
+    for campo in CAMPOS_VITAIS:
+        minimo = maximo = None
+        for validador in SinalVital._meta.get_field(campo).validators:
+            if isinstance(validador, MinValueValidator):
+                minimo = float(validador.limit_value)
+            elif isinstance(validador, MaxValueValidator):
+                maximo = float(validador.limit_value)
+        limites[campo] = (minimo, maximo)
+    return limites
+
+
+def validar_leituras(leituras):
+    """
+    Valida o lote e separa as leituras aceitas das rejeitadas.
+
+    Args:
+        leituras (list): dicionários com 'atendimento', os campos de CAMPOS_VITAIS
+            e, opcionalmente, 'data_hora' (ISO 8601) e 'observacoes'.
+
+    Returns:
+        tuple: (índices válidos, matriz de valores [linhas x CAMPOS_VITAIS] com NaN
+        para ausentes, ids dos atendimentos, datas informadas, lista de rejeições
+        {'indice', 'erros'}).
+    """
+    total = len(leituras)
+    erros = [[] for _ in range(total)]
+    atendimentos = np.zeros(total, dtype=np.int64)
+    datas = [None] * total
+    valores = np.full((total, len(CAMPOS_VITAIS)), np.nan)
+
+    # Conversão linha a linha apenas do que não é vetorizável (tipos e datas)
+    for i, leitura in enumerate(leituras):
+        if not isinstance(leitura, dict):
+            erros[i].append('Leitura deve ser um objeto JSON.')
+            continue
+        try:
+            atendimentos[i] = int(leitura.get('atendimento'))
+        except (TypeError, ValueError, OverflowError):
+            # OverflowError: id que não cabe em int64
+            erros[i].append('Atendimento inválido.')
+
+        if leitura.get('data_hora'):
+            try:
+                data = parse_datetime(str(leitura['data_hora']))
+            except ValueError:
+                # Formato ISO correto, mas data inexistente (ex.: 2026-02-30)
+                data = None
+            if data is None:
+                erros[i].append('Data/hora inválida.')
+            else:
+                datas[i] = timezone.make_aware(data) if timezone.is_naive(data) else data
+
+        for j, campo in enumerate(CAMPOS_VITAIS):
+            valor = leitura.get(campo)
+            if valor in (None, ''):
+                continue
+            try:
+                numero = float(valor)
+            except (TypeError, ValueError):
+                numero = math.nan
+            # "nan" e "inf" convertem para float, mas NaN seria lido como ausente
+            if not math.isfinite(numero):
+                erros[i].append(f'{campo}: valor numérico inválido.')
+                continue
+            valores[i, j] = numero
+
+    colunas = {campo: valores[:, j] for j, campo in enumerate(CAMPOS_VITAIS)}
+    presentes = ~np.isnan(valores)
+
+    # Linhas com erro de formato não passam pelas regras seguintes
+    malformadas = np.array([bool(mensagens) for mensagens in erros], dtype=bool)
+
+    def rejeitar(mascara, mensagem):
+        for i in np.flatnonzero(mascara & ~malformadas):
+            erros[i].append(mensagem)
+
+    # Faixas, inteiros e casas decimais (validadores do modelo)
+    with np.errstate(invalid='ignore'):
+        for campo, (minimo, maximo) in limites_campos().items():
+            coluna = colunas[campo]
+            rejeitar(
+                (coluna < minimo) | (coluna > maximo),
+                f'{campo}: valor fora da faixa permitida ({minimo:g} a {maximo:g}).'
+            )
+            casas = 10 if campo == 'temperatura' else 1
+            rejeitar(
+                np.abs(coluna * casas - np.round(coluna * casas)) > 1e-6,
+                f'{campo}: casas decimais acima do permitido.'
+            )
+
+    # Regras de SinalVitalForm.clean
+    rejeitar(~presentes.any(axis=1), 'É necessário preencher ao menos um sinal vital.')
+
+    sistolica = colunas['pressao_arterial_sistolica']
+    diastolica = colunas['pressao_arterial_diastolica']
+    rejeitar(
+        np.isnan(sistolica) != np.isnan(diastolica),
+        'Para registrar pressão arterial, preencha tanto a sistólica quanto a diastólica.'
+    )
+    with np.errstate(invalid='ignore'):
+        rejeitar(sistolica <= diastolica, 'A pressão sistólica deve ser maior que a diastólica.')
+
+    # Atendimentos existentes em uma única consulta
+    existentes = np.fromiter(
+        Atendimento.objects.filter(pk__in=set(atendimentos.tolist())).values_list('pk', flat=True),
+        dtype=np.int64
+    )
+    rejeitar(~np.isin(atendimentos, existentes), 'Atendimento não encontrado.')
+
+    validos = [i for i in range(total) if not erros[i]]
+    rejeitados = [{'indice': i, 'erros': mensagens} for i, mensagens in enumerate(erros) if mensagens]
+    return validos, valores, atendimentos, datas, rejeitados
+
+
+def ingerir_leituras(leituras, profissional):
+    """
+    Valida e grava um lote de leituras em uma única transação.
+
+    Returns:
+        dict: resumo com quantidades recebidas/inseridas e as rejeições por linha.
+    """
+    validos, valores, atendimentos, datas, rejeitados = validar_leituras(leituras)
+
+    if validos:
+        valores = valores[validos]
+        colunas_alerta = {campo: valores[:, CAMPOS_VITAIS.index(campo)] for campo in CAMPOS_ALERTA}
+        mascaras, totais = calcular_alertas_em_lote(colunas_alerta)
+
+        agora = timezone.now()
+        linhas = [
+            {
+                'atendimento_id': int(atendimentos[i]),
+                'profissional_id': profissional.pk,
+                'data_hora': datas[i] or agora,
+                'atualizado_em': agora,
+                'observacoes': str(leituras[i].get('observacoes') or ''),
+                'alertas': int(mascaras[posicao]),
+                'total_alertas': int(totais[posicao]),
+                **{
+                    campo: _converter_valor(campo, valor)
+                    for campo, valor in zip(CAMPOS_VITAIS, valores[posicao])
+                },
+            }
+            for posicao, i in enumerate(validos)
+        ]
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and len(linhas) >= LIMIAR_COPY:
+                _inserir_com_copy(linhas)
+            else:
+                SinalVital.objects.bulk_create(
+                    [SinalVital(**linha) for linha in linhas],
+                    batch_size=TAMANHO_LOTE_INSERCAO
+                )
+            atualizar_ultimo_sinal_vital(
+                Atendimento.objects.filter(pk__in={linha['atendimento_id'] for linha in linhas})
+            )
+
+    return {
+        'recebidas': len(leituras),
+        'inseridas': len(validos),
+        'rejeitadas': rejeitados,
+    }
+
+
+def _converter_valor(campo, valor):
+    """Converte o float do array para o tipo Python do campo (None se ausente)"""
+    if np.isnan(valor):
+        return None
+    if campo == 'temperatura':
+        return Decimal(f'{valor:.1f}')
+    return int(valor)
+
+
+def _inserir_com_copy(linhas):
+    """Insere as linhas com COPY ... FROM STDIN (PostgreSQL)"""
+    colunas = list(linhas[0])
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        # Campos ausentes vão como string vazia sem aspas, que o COPY CSV lê como NULL;
+        # FORCE_NOT_NULL mantém observações vazias como string vazia
+        escritor.writerow([
+            '' if valor is None else (valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+            for valor in linha.values()
+        ])
+    buffer.seek(0)
+
+    tabela = connection.ops.quote_name(SinalVital._meta.db_table)
+    nomes = ', '.join(connection.ops.quote_name(coluna) for coluna in colunas)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {tabela} ({nomes}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (observacoes))',
+            buffer
+        )
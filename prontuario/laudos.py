@@ -0,0 +1,194 @@
+"""
+Entrega dos arquivos de laudo (ResultadoExame.arquivo_laudo).
+
+Os laudos não são servidos por MEDIA_URL em produção: passam pela view
+autenticada, que trata requisições condicionais (ETag/Last-Modified) e
+intervalos (Range), para que visualizadores de PDF e imagens grandes
+possam retomar ou paginar o download.
+
+Com LAUDOS_ENVIO_ARQUIVO configurado, o corpo do arquivo é entregue pelo
+proxy da frente (nginx: X-Accel-Redirect; Apache/lighttpd: X-Sendfile),
+que também trata o Range. Sem ele, o arquivo é lido em blocos, sem
+carregar o conteúdo inteiro na memória do worker.
+
+Laudos gravados comprimidos (prontuario.armazenamento) são enviados como
+estão, com Content-Encoding: zstd, aos clientes que aceitam zstd; para os
+demais, são descomprimidos em fluxo pelo Django (sem o proxy). Cada
+codificação é uma representação à parte, com ETag própria.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from django.utils.text import slugify
+
+from .armazenamento import hash_do_nome
+
+ENVIO_X_ACCEL = 'x-accel-redirect'
+ENVIO_X_SENDFILE = 'x-sendfile'
+
+TAMANHO_BLOCO = 64 * 1024
+
+INTERVALO_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CODIFICACAO_ZSTD = 'zstd'
+
+QUALIDADE_ZERO_RE = re.compile(r'^q=0(\.0{0,3})?$')
+
+
+class IntervaloInvalido(Exception):
+    """O cabeçalho Range não pode ser atendido para o tamanho do arquivo"""
+
+
+def aceita_zstd(request):
+    """Se o cabeçalho Accept-Encoding da requisição inclui zstd (com q > 0)"""
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        codificacao, _, parametros = item.partition(';')
+        if codificacao.strip().lower() == CODIFICACAO_ZSTD:
+            return not QUALIDADE_ZERO_RE.match(parametros.replace(' ', '').lower())
+    return False
+
+
+def codificacao_laudo(request, arquivo):
+    """'zstd' se o arquivo está gravado comprimido e o cliente aceita; senão None"""
+    if aceita_zstd(request) and arquivo.storage.comprimido(arquivo.name):
+        return CODIFICACAO_ZSTD
+    return None
+
+
+def metadados_laudo(arquivo, codificacao=None):
+    """
+    Calcula os validadores HTTP do arquivo sem ler o conteúdo.
+
+    Com `codificacao`, o tamanho é o dos bytes comprimidos gravados.
+
+    Returns:
+        tuple: (tamanho em bytes, ETag, Last-Modified como timestamp).
+    """
+    armazenamento = arquivo.storage
+    nome = armazenamento.nome_gravado(arquivo.name) if codificacao else arquivo.name
+    tamanho = armazenamento.size(nome)
+    modificado = armazenamento.get_modified_time(nome).timestamp()
+    # Arquivos por conteúdo já têm um validador forte: o próprio hash
+    validador = hash_do_nome(arquivo.name) or f'{tamanho:x}-{int(modificado * 1000):x}'
+    if codificacao:
+        validador = f'{validador}-{codificacao}'
+    return tamanho, quote_etag(validador), modificado
+
+
+def intervalo_da_requisicao(cabecalho, tamanho):
+    """
+    Interpreta o cabeçalho Range (um único intervalo de bytes).
+
+    Returns:
+        tuple | None: (início, fim inclusivo), ou None para enviar o arquivo
+        inteiro (sem Range, com múltiplos intervalos ou unidade desconhecida).
+
+    Raises:
+        IntervaloInvalido: se o intervalo estiver fora do arquivo.
+    """
+    if not cabecalho:
+        return None
+    correspondencia = INTERVALO_RE.match(cabecalho.replace(' ', ''))
+    if not correspondencia:
+        return None
+
+    inicio, fim = correspondencia.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # bytes=-N: os últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0 or tamanho == 0:
+            raise IntervaloInvalido
+        return max(tamanho - sufixo, 0), tamanho - 1
+
+    inicio = int(inicio)
+    fim = int(fim) if fim else tamanho - 1
+    if inicio >= tamanho or fim < inicio:
+        raise IntervaloInvalido
+    return inicio, min(fim, tamanho - 1)
+
+
+def ler_intervalo(armazenamento, nome, inicio, fim):
+    """Lê o intervalo [inicio, fim] do arquivo em blocos"""
+    with armazenamento.open(nome, 'rb') as descritor:
+        descritor.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = descritor.read(min(TAMANHO_BLOCO, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def nome_download(resultado):
+    """Nome sugerido ao navegador (o arquivo armazenado é nomeado pelo hash)"""
+    extensao = os.path.splitext(resultado.arquivo_laudo.name)[1]
+    return f'laudo_{slugify(resultado.solicitacao.nome_exame) or resultado.solicitacao_id}{extensao}'
+
+
+def resposta_laudo(request, arquivo, etag, modificado, tamanho, nome, codificacao=None):
+    """
+    Monta a resposta com o arquivo do laudo (inteiro ou parcial).
+
+    `tamanho` e `etag` devem vir de metadados_laudo com a mesma `codificacao`.
+    """
+    tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    armazenamento = arquivo.storage
+    comprimido = armazenamento.comprimido(arquivo.name)
+    gravado = armazenamento.nome_gravado(arquivo.name)
+    # Sem codificação, o laudo comprimido precisa passar pelo Django para ser descomprimido
+    descomprimir = comprimido and not codificacao
+    envio = '' if descomprimir else settings.LAUDOS_ENVIO_ARQUIVO
+
+    if envio == ENVIO_X_ACCEL:
+        resposta = HttpResponse(content_type=tipo)
+        resposta['X-Accel-Redirect'] = quote(settings.LAUDOS_X_ACCEL_PREFIXO.rstrip('/') + '/' + gravado)
+    elif envio == ENVIO_X_SENDFILE:
+        resposta = HttpResponse(content_type=tipo)
+        resposta['X-Sendfile'] = armazenamento.path(gravado)
+    else:
+        # If-Range: só atende o intervalo se o arquivo não mudou desde a primeira parte
+        if_range = request.headers.get('If-Range')
+        cabecalho_range = request.headers.get('Range') if not if_range or if_range == etag else None
+        try:
+            intervalo = intervalo_da_requisicao(cabecalho_range, tamanho)
+        except IntervaloInvalido:
+            resposta = HttpResponse(status=416)
+            resposta['Content-Range'] = f'bytes */{tamanho}'
+            return resposta
+
+        # Com a codificação são enviados os bytes gravados; sem ela, os originais
+        enviado = gravado if codificacao else arquivo.name
+        if intervalo is None and not descomprimir:
+            resposta = FileResponse(armazenamento.open(enviado, 'rb'), content_type=tipo)
+            resposta.block_size = TAMANHO_BLOCO
+        elif intervalo is None:
+            # O Content-Length é o tamanho original, não o do arquivo no disco
+            resposta = StreamingHttpResponse(ler_intervalo(armazenamento, enviado, 0, tamanho - 1), content_type=tipo)
+            resposta['Content-Length'] = str(tamanho)
+        else:
+            inicio, fim = intervalo
+            resposta = StreamingHttpResponse(
+                ler_intervalo(armazenamento, enviado, inicio, fim), status=206, content_type=tipo
+            )
+            resposta['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+            resposta['Content-Length'] = str(fim - inicio + 1)
+
+    if codificacao:
+        resposta['Content-Encoding'] = codificacao
+    if comprimido:
+        patch_vary_headers(resposta, ['Accept-Encoding'])
+    resposta['Accept-Ranges'] = 'bytes'
+    resposta['ETag'] = etag
+    resposta['Last-Modified'] = http_date(modificado)
+    resposta['Content-Disposition'] = content_disposition_header(False, nome)
+    resposta['Cache-Control'] = 'private, no-cache'
+    return resposta
@@ -0,0 +1,59 @@
+"""
+Audita os itens de prescrições ativas contra as alergias dos pacientes.
+
+Útil após alterar ALERGIAS_SINONIMOS ou corrigir o cadastro de alergias,
+para encontrar prescrições já registradas que passaram a conflitar.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from prontuario.alergias import compilar_verificador, descrever_conflitos
+from prontuario.models import ItemPrescricao
+
+
+class Command(BaseCommand):
+    help = 'Lista os itens de prescrições ativas que conflitam com as alergias registradas do paciente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Quantidade de itens lidos do banco por vez (padrão: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        itens = ItemPrescricao.objects.filter(
+            prescricao__status='ATIVA',
+            prescricao__validade__gte=timezone.localdate(),
+        ).exclude(
+            prescricao__atendimento__paciente__alergias__isnull=True
+        ).exclude(
+            prescricao__atendimento__paciente__alergias=''
+        ).order_by('prescricao__atendimento_id', 'pk').values_list(
+            'pk',
+            'medicamento',
+            'prescricao_id',
+            'prescricao__atendimento_id',
+            'prescricao__atendimento__paciente__nome',
+            'prescricao__atendimento__paciente__alergias',
+        )
+
+        total = 0
+        conflitantes = 0
+        for item_id, medicamento, prescricao_id, atendimento_id, paciente, alergias in itens.iterator(
+            chunk_size=options['lote']
+        ):
+            total += 1
+            # Um verificador por texto de alergias, reaproveitado entre itens e pacientes
+            conflitos = compilar_verificador(alergias).conflitos(medicamento)
+            if conflitos:
+                conflitantes += 1
+                self.stdout.write(self.style.WARNING(
+                    f'Atendimento #{atendimento_id} ({paciente}) - prescrição #{prescricao_id}, '
+                    f'item #{item_id} "{medicamento}": {descrever_conflitos(conflitos)}'
+                ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {total} itens verificados, {conflitantes} com conflito de alergia.'
+        ))
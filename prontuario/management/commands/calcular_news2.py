@@ -0,0 +1,91 @@
+"""
+Calcula o NEWS2 dos atendimentos ativos.
+
+Uso típico (a cada minuto):
+    python manage.py calcular_news2 --intervalo 60
+
+Benchmark da pontuação vetorizada, sem acesso ao banco:
+    python manage.py calcular_news2 --benchmark 10000
+"""
+import time
+from bisect import bisect_left
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from prontuario.alertas import aferido
+from prontuario.news2 import CAMPOS_NEWS2, PARAMETROS_NEWS2, calcular_news2_ativos, pontuar_news2
+
+
+class Command(BaseCommand):
+    help = 'Calcula o escore NEWS2 da última leitura de sinais vitais de cada atendimento ativo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=0,
+            help='Repete o cálculo a cada N segundos (padrão: executa uma única vez)'
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='N',
+            help='Mede a pontuação de N atendimentos sintéticos (vetorizada x laço em Python)'
+        )
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            self.benchmark(options['benchmark'])
+            return
+
+        while True:
+            inicio = time.perf_counter()
+            calculadas = calcular_news2_ativos()
+            duracao = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(f'{calculadas} pontuações NEWS2 calculadas em {duracao:.1f} ms')
+
+            if not options['intervalo']:
+                break
+            time.sleep(max(0, options['intervalo'] - duracao / 1000))
+
+    def benchmark(self, quantidade):
+        """Compara a pontuação vetorizada com a equivalente objeto a objeto"""
+        gerador = np.random.default_rng(42)
+        colunas = {
+            'frequencia_respiratoria': gerador.integers(8, 40, quantidade).astype(np.float64),
+            'saturacao_o2': gerador.integers(80, 101, quantidade).astype(np.float64),
+            'pressao_arterial_sistolica': gerador.integers(70, 230, quantidade).astype(np.float64),
+            'frequencia_cardiaca': gerador.integers(35, 160, quantidade).astype(np.float64),
+            'temperatura': np.round(gerador.uniform(34.0, 40.5, quantidade), 1),
+        }
+        # 5% de leituras incompletas
+        for campo in CAMPOS_NEWS2:
+            colunas[campo][gerador.random(quantidade) < 0.05] = np.nan
+
+        inicio = time.perf_counter()
+        vetorizado = pontuar_news2(colunas)
+        tempo_vetorizado = time.perf_counter() - inicio
+
+        linhas = [{campo: colunas[campo][i] for campo in CAMPOS_NEWS2} for i in range(quantidade)]
+        inicio = time.perf_counter()
+        totais = [self._pontuar_linha(linha) for linha in linhas]
+        tempo_laco = time.perf_counter() - inicio
+
+        if not np.array_equal(vetorizado['total'], np.asarray(totais)):
+            self.stderr.write(self.style.ERROR('Divergência entre a pontuação vetorizada e o laço'))
+
+        self.stdout.write(f'Atendimentos: {quantidade}')
+        self.stdout.write(f'Vetorizado (NumPy): {tempo_vetorizado * 1000:.2f} ms')
+        self.stdout.write(f'Laço em Python:     {tempo_laco * 1000:.2f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Ganho: {tempo_laco / tempo_vetorizado:.1f}x'))
+
+    @staticmethod
+    def _pontuar_linha(linha):
+        """Referência escalar do NEWS2 para uma única leitura"""
+        total = 0
+        for _, campo, cortes, pontos in PARAMETROS_NEWS2:
+            valor = linha[campo]
+            if aferido(valor):
+                total += pontos[bisect_left(cortes, valor)]
+        return total
@@ -0,0 +1,146 @@
+"""
+Remove os arquivos de laudo que não são mais referenciados.
+
+Uso típico (agendado toda noite):
+    python manage.py coletar_laudos_orfaos
+
+Só considera arquivos do armazenamento por conteúdo (prontuario.armazenamento)
+sem referências há mais de --carencia-horas: um upload em andamento pode
+gravar o arquivo antes de o resultado ser salvo. --recontar refaz as
+referências a partir de ResultadoExame (ex: após restaurar um backup).
+Também descarta os envios em partes abandonados (prontuario.uploads).
+"""
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from prontuario.armazenamento import PREFIXO_CONTEUDO, armazenamento_laudos, hash_do_nome, nome_do_laudo
+from prontuario.models import ArquivoLaudo, ResultadoExame, UploadLaudo
+from prontuario.previas import SUFIXO_PREVIA
+from prontuario.uploads import descartar_uploads_expirados
+
+
+class Command(BaseCommand):
+    help = 'Remove arquivos de laudo sem resultados de exame que os referenciem'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--carencia-horas',
+            type=int,
+            default=24,
+            help='Idade mínima, em horas, de um arquivo sem referências para ser removido (padrão: 24)'
+        )
+        parser.add_argument(
+            '--recontar',
+            action='store_true',
+            help='Recalcula as referências a partir dos resultados de exame antes da coleta'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas lista o que seria removido'
+        )
+
+    def handle(self, *args, **options):
+        self.armazenamento = armazenamento_laudos()
+        self.simular = options['simular']
+        self.limite = timezone.now() - timedelta(hours=options['carencia_horas'])
+
+        if options['recontar']:
+            self.recontar()
+
+        if not self.simular:
+            # Antes da coleta: os arquivos de envios concluídos e abandonados também ficam órfãos
+            uploads = descartar_uploads_expirados()
+            if uploads:
+                self.stdout.write(f'{uploads} envio(s) em partes abandonado(s) descartado(s).')
+
+        registros = self.coletar_registros()
+        arquivos = self.coletar_arquivos_sem_registro()
+
+        acao = 'Seriam removidos' if self.simular else 'Removidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{acao}: {registros} arquivo(s) sem referências e {arquivos} arquivo(s) sem registro.'
+        ))
+
+    def recontar(self):
+        """Refaz ArquivoLaudo.referencias contando os resultados por arquivo"""
+        contagens = dict(
+            ResultadoExame.objects.filter(arquivo_laudo__startswith=PREFIXO_CONTEUDO + '/')
+            .values_list('arquivo_laudo')
+            .annotate(quantidade=Count('pk'))
+        )
+        agora = timezone.now()
+        for nome, quantidade in contagens.items():
+            if not self.armazenamento.exists(nome):
+                self.stderr.write(f'Arquivo referenciado não encontrado: {nome}')
+                continue
+            ArquivoLaudo.objects.update_or_create(
+                nome=nome,
+                defaults={'referencias': quantidade, 'atualizado_em': agora},
+                create_defaults={'referencias': quantidade, 'tamanho': self.armazenamento.size(nome)}
+            )
+        # A carência dos arquivos que perderam as referências começa agora
+        ArquivoLaudo.objects.exclude(nome__in=contagens).exclude(referencias=0).update(
+            referencias=0,
+            atualizado_em=agora
+        )
+
+    def coletar_registros(self):
+        """Remove os arquivos registrados sem referências além da carência"""
+        removidos = 0
+        orfaos = ArquivoLaudo.objects.filter(referencias__lte=0, atualizado_em__lt=self.limite)
+        for arquivo in orfaos.iterator():
+            if self.simular:
+                self.stdout.write(f'  {arquivo.nome}')
+                removidos += 1
+                continue
+            # Refaz o filtro na remoção: o arquivo pode ter sido referenciado de novo
+            apagados, _ = orfaos.filter(pk=arquivo.pk).delete()
+            if apagados and self.remover_arquivo(arquivo.nome):
+                removidos += 1
+        return removidos
+
+    def coletar_arquivos_sem_registro(self):
+        """Remove arquivos gravados que nunca chegaram a ser referenciados"""
+        diretorio = self.armazenamento.path(PREFIXO_CONTEUDO)
+        registrados = set(ArquivoLaudo.objects.values_list('nome', flat=True).iterator())
+        removidos = 0
+        for raiz, _, nomes in os.walk(diretorio):
+            for nome_arquivo in nomes:
+                caminho = os.path.join(raiz, nome_arquivo)
+                # Laudos comprimidos são tratados pelo nome do laudo (sem .zst)
+                nome = nome_do_laudo(os.path.relpath(caminho, self.armazenamento.location).replace(os.sep, '/'))
+                if nome in registrados:
+                    continue
+                # Prévias seguem o resultado; temporários de uploads interrompidos são removidos
+                if hash_do_nome(nome) and (
+                    ResultadoExame.objects.filter(arquivo_laudo=nome).exists()
+                    or UploadLaudo.objects.filter(arquivo=nome).exists()
+                ):
+                    continue
+                if nome.endswith(SUFIXO_PREVIA) and ResultadoExame.objects.filter(previa=nome).exists():
+                    continue
+                if self.simular:
+                    if self.antigo(nome):
+                        self.stdout.write(f'  {nome}')
+                        removidos += 1
+                elif self.remover_arquivo(nome):
+                    removidos += 1
+        return removidos
+
+    def antigo(self, nome):
+        return self.armazenamento.get_modified_time(nome) < self.limite
+
+    def remover_arquivo(self, nome):
+        """Remove o arquivo se ainda existir e não tiver sido regravado na carência"""
+        try:
+            if not self.antigo(nome):
+                return False
+        except FileNotFoundError:
+            return False
+        self.armazenamento.delete(nome)
+        return True
@@ -0,0 +1,178 @@
+"""
+Compressão zstd dos laudos já gravados (prontuario.armazenamento).
+
+Uso típico:
+    python manage.py comprimir_laudos --treinar-dicionario
+    python manage.py comprimir_laudos
+
+--treinar-dicionario treina um dicionário com o início de uma amostra dos
+laudos e o torna o atual (os anteriores continuam gravados para ler os
+arquivos comprimidos com eles). Sem opções, comprime os laudos comprimíveis
+ainda gravados sem compressão.
+
+Benchmark de espaço e latência de leitura, sem alterar os arquivos:
+    python manage.py comprimir_laudos --benchmark 200
+"""
+import os
+import statistics
+import tempfile
+import time
+
+import zstandard
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from prontuario.armazenamento import armazenamento_laudos, comprimivel
+from prontuario.models import ResultadoExame
+
+# Bytes do início de cada laudo usados no treino: é onde se repetem o
+# cabeçalho do PDF, as fontes e o timbre do laboratório
+TAMANHO_AMOSTRA = 64 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Comprime em zstd os laudos gravados e treina o dicionário de compressão'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--treinar-dicionario',
+            action='store_true',
+            help='Treina um novo dicionário com a amostra de laudos e o torna o atual'
+        )
+        parser.add_argument(
+            '--amostras',
+            type=int,
+            default=2000,
+            help='Quantidade de laudos usados no treino do dicionário (padrão: 2000)'
+        )
+        parser.add_argument(
+            '--tamanho-dicionario',
+            type=int,
+            default=112 * 1024,
+            help='Tamanho do dicionário em bytes (padrão: 112 KB)'
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='N',
+            help='Mede espaço e latência de leitura de N laudos (sem compressão, zstd e zstd com dicionário)'
+        )
+
+    def handle(self, *args, **options):
+        self.armazenamento = armazenamento_laudos()
+
+        if options['benchmark']:
+            self.benchmark(options['benchmark'])
+            return
+
+        if options['treinar_dicionario']:
+            self.treinar(options['amostras'], options['tamanho_dicionario'])
+            return
+
+        comprimidos = economia = 0
+        for nome in self.laudos():
+            if self.armazenamento.comprimido(nome) or not self.armazenamento.exists(nome):
+                continue
+            economizado = self.armazenamento.comprimir_gravado(nome)
+            if economizado:
+                comprimidos += 1
+                economia += economizado
+        self.stdout.write(self.style.SUCCESS(
+            f'{comprimidos} laudo(s) comprimido(s), {economia / 1024 / 1024:.1f} MB economizados.'
+        ))
+
+    def laudos(self, limite=None):
+        """Nomes dos laudos comprimíveis referenciados por resultados, dos mais recentes"""
+        nomes = ResultadoExame.objects.exclude(arquivo_laudo='').order_by('-pk').values_list('arquivo_laudo', flat=True)
+        # Laudos por conteúdo podem ser compartilhados entre resultados
+        vistos = set()
+        encontrados = 0
+        for nome in nomes.iterator():
+            if nome in vistos or not comprimivel(nome):
+                continue
+            vistos.add(nome)
+            yield nome
+            encontrados += 1
+            if limite and encontrados >= limite:
+                return
+
+    def ler(self, nome, tamanho=None):
+        with self.armazenamento.open(nome, 'rb') as arquivo:
+            return arquivo.read(tamanho) if tamanho else arquivo.read()
+
+    def treinar(self, amostras, tamanho_dicionario):
+        """Treina e grava um dicionário com o início dos laudos mais recentes"""
+        dados = [
+            self.ler(nome, TAMANHO_AMOSTRA)
+            for nome in self.laudos(amostras) if self.armazenamento.exists(nome)
+        ]
+        if not dados:
+            raise CommandError('Nenhum laudo comprimível encontrado para o treino.')
+        try:
+            dicionario = zstandard.train_dictionary(tamanho_dicionario, dados, level=settings.LAUDOS_ZSTD_NIVEL)
+        except zstandard.ZstdError as erro:
+            raise CommandError(f'Falha no treino do dicionário ({len(dados)} amostras): {erro}') from erro
+
+        dict_id = self.armazenamento.gravar_dicionario(dicionario)
+        self.stdout.write(self.style.SUCCESS(
+            f'Dicionário {dict_id} treinado com {len(dados)} laudo(s) e definido como atual.'
+        ))
+
+    def benchmark(self, quantidade):
+        """Compara espaço e tempo de leitura dos laudos com e sem compressão"""
+        laudos = [self.ler(nome) for nome in self.laudos(quantidade) if self.armazenamento.exists(nome)]
+        if not laudos:
+            raise CommandError('Nenhum laudo comprimível encontrado.')
+
+        nivel = settings.LAUDOS_ZSTD_NIVEL
+        dicionario = self.armazenamento.dicionario_atual()
+        # Rótulo: (compressor, descompressor)
+        variantes = {
+            'sem compressão': (None, None),
+            f'zstd {nivel}': (zstandard.ZstdCompressor(level=nivel), zstandard.ZstdDecompressor()),
+        }
+        if dicionario:
+            variantes[f'zstd {nivel} + dicionário {dicionario.dict_id()}'] = (
+                zstandard.ZstdCompressor(level=nivel, dict_data=dicionario),
+                zstandard.ZstdDecompressor(dict_data=dicionario),
+            )
+        original = sum(len(dados) for dados in laudos)
+
+        self.stdout.write(f'Laudos: {len(laudos)} ({original / 1024 / 1024:.1f} MB)')
+        if not dicionario:
+            self.stdout.write('Nenhum dicionário treinado (use --treinar-dicionario).')
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            for rotulo, (compressor, descompressor) in variantes.items():
+                caminhos = []
+                inicio = time.perf_counter()
+                for i, dados in enumerate(laudos):
+                    caminho = os.path.join(diretorio, f'{i}.bin')
+                    with open(caminho, 'wb') as arquivo:
+                        arquivo.write(compressor.compress(dados) if compressor else dados)
+                    caminhos.append(caminho)
+                tempo_gravacao = time.perf_counter() - inicio
+                gravado = sum(os.path.getsize(caminho) for caminho in caminhos)
+
+                # Leitura completa de cada arquivo (cache de páginas do SO já aquecido pela gravação)
+                latencias = []
+                for caminho in caminhos:
+                    inicio = time.perf_counter()
+                    with open(caminho, 'rb') as arquivo:
+                        if compressor:
+                            with descompressor.stream_reader(arquivo) as leitor:
+                                while leitor.read(TAMANHO_AMOSTRA):
+                                    pass
+                        else:
+                            while arquivo.read(TAMANHO_AMOSTRA):
+                                pass
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    os.remove(caminho)
+
+                p95 = statistics.quantiles(latencias, n=20)[-1] if len(latencias) > 1 else latencias[0]
+                self.stdout.write(
+                    f'{rotulo:<32} {gravado / 1024 / 1024:8.1f} MB '
+                    f'({100 * (1 - gravado / original):5.1f}% economizado) | '
+                    f'gravação {tempo_gravacao * 1000:8.1f} ms | '
+                    f'leitura mediana {statistics.median(latencias):.3f} ms, p95 {p95:.3f} ms'
+                )
@@ -0,0 +1,51 @@
+"""
+Consolida os tempos de liberação de exames (TAT) na tabela de relatórios.
+
+Uso típico (agendado toda noite):
+    python manage.py consolidar_tempos_exames
+
+Por padrão refaz apenas os dias com resultados novos desde a última
+execução. --desde e --completo forçam o reprocessamento (ex: após corrigir
+datas de resultados).
+"""
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from prontuario.tempos_exames import consolidar_dias, dias_alterados
+
+
+class Command(BaseCommand):
+    help = 'Consolida por dia/hora, tipo e exame o tempo entre a solicitação e o resultado dos exames'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Reprocessa os dias com resultados registrados a partir desta data (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Reprocessa todos os dias com resultados'
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            data = parse_date(options['desde'])
+            if data is None:
+                raise CommandError('Data inválida em --desde (use AAAA-MM-DD).')
+            desde = timezone.make_aware(datetime.combine(data, time.min))
+
+        dias = dias_alterados(desde, completo=options['completo'])
+        if not dias:
+            self.stdout.write('Nenhum dia com resultados novos.')
+            return
+
+        linhas = consolidar_dias(dias)
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {len(dias)} dia(s) reprocessado(s) '
+            f'({dias[0]:%d/%m/%Y} a {dias[-1]:%d/%m/%Y}), {linhas} linha(s) consolidada(s).'
+        ))
@@ -0,0 +1,36 @@
+"""
+Cadastra um monitor de beira-leito para a API de ingestão de sinais vitais.
+
+Uso típico:
+    python manage.py criar_token_dispositivo "Monitor UTI leito 3" --usuario enf.joana
+
+O token é exibido uma única vez; o monitor o envia no cabeçalho
+`Authorization: Token <token>` em POST /sinais-vitais/lote/. Para revogar,
+desative o dispositivo no admin.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from prontuario.dispositivos import criar_dispositivo
+from usuarios.models import Profissional
+
+
+class Command(BaseCommand):
+    help = 'Cadastra um monitor de beira-leito e exibe o token de acesso à ingestão de sinais vitais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nome', help='Identificação do dispositivo (ex: leito ou número de série)')
+        parser.add_argument(
+            '--usuario',
+            required=True,
+            help='Usuário do profissional em nome de quem as leituras são registradas'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            profissional = Profissional.objects.get(user__username=options['usuario'])
+        except Profissional.DoesNotExist:
+            raise CommandError(f"Nenhum profissional com o usuário {options['usuario']!r}.")
+
+        dispositivo, token = criar_dispositivo(options['nome'], profissional)
+        self.stdout.write(self.style.SUCCESS(f'Dispositivo #{dispositivo.pk} "{dispositivo.nome}" cadastrado.'))
+        self.stdout.write(f'Token (exibido apenas agora): {token}')
@@ -0,0 +1,127 @@
+"""
+Extrai o texto dos laudos em PDF já existentes (prontuario.texto_laudos).
+
+Uso típico:
+    python manage.py extrair_texto_laudos --processos 4
+
+Processa, em lotes e em ordem de id, os resultados com extração pendente.
+Após cada lote o último id processado é gravado em
+VAR_ROOT/checkpoints/extrair_texto_laudos.json; uma execução interrompida
+continua de onde parou (o checkpoint é removido ao final). --reiniciar
+ignora o checkpoint e --incluir-erros tenta de novo os laudos que falharam.
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prontuario.models import ResultadoExame
+from prontuario.texto_laudos import extrair_texto_pdf, registrar_extracao
+
+
+class Command(BaseCommand):
+    help = 'Extrai em lotes o texto dos laudos em PDF existentes para a busca'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=50,
+            help='Quantidade de laudos por lote (padrão: 50)'
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=settings.TAREFAS_PROCESSOS,
+            help='Processos usados na extração (padrão: TAREFAS_PROCESSOS)'
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Ignora o checkpoint e recomeça do primeiro resultado'
+        )
+        parser.add_argument(
+            '--incluir-erros',
+            action='store_true',
+            help='Tenta de novo os laudos cuja extração falhou'
+        )
+
+    def handle(self, *args, **options):
+        self.checkpoint = os.path.join(settings.VAR_ROOT, 'checkpoints', 'extrair_texto_laudos.json')
+        ultimo_pk = 0 if options['reiniciar'] else self.ler_checkpoint()
+        if ultimo_pk:
+            self.stdout.write(f'Continuando após o resultado #{ultimo_pk}.')
+
+        situacoes = ['PENDENTE', 'ERRO'] if options['incluir_erros'] else ['PENDENTE']
+        armazenamento = ResultadoExame._meta.get_field('arquivo_laudo').storage
+        totais = {'EXTRAIDO': 0, 'SEM_TEXTO': 0, 'ERRO': 0}
+
+        with ProcessPoolExecutor(
+            max_workers=options['processos'],
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            while True:
+                lote = list(
+                    ResultadoExame.objects.filter(pk__gt=ultimo_pk, status_extracao__in=situacoes)
+                    .order_by('pk')
+                    .values_list('pk', 'arquivo_laudo')[:options['lote']]
+                )
+                if not lote:
+                    break
+
+                # Os temporários dos laudos comprimidos vivem até o fim do lote
+                with ExitStack() as temporarios:
+                    futuros = []
+                    for pk, nome in lote:
+                        try:
+                            caminho = temporarios.enter_context(armazenamento.caminho_local(nome))
+                        except Exception as erro:
+                            # Laudo comprimido ausente ou corrompido: falha só este resultado
+                            self.registrar_erro(pk, nome, erro)
+                            totais['ERRO'] += 1
+                            continue
+                        futuros.append((pk, nome, executor.submit(extrair_texto_pdf, caminho)))
+
+                    for pk, nome, futuro in futuros:
+                        try:
+                            texto = futuro.result()
+                        except Exception as erro:
+                            self.registrar_erro(pk, nome, erro)
+                            totais['ERRO'] += 1
+                            continue
+                        registrar_extracao(pk, nome, texto)
+                        totais['EXTRAIDO' if texto else 'SEM_TEXTO'] += 1
+
+                ultimo_pk = lote[-1][0]
+                self.gravar_checkpoint(ultimo_pk)
+                self.stdout.write(f'  ... até o resultado #{ultimo_pk}')
+
+        # Percorreu tudo: a próxima execução recomeça do início
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído: {totais['EXTRAIDO']} com texto, {totais['SEM_TEXTO']} sem texto "
+            f"(digitalizados), {totais['ERRO']} com erro."
+        ))
+
+    def registrar_erro(self, pk, nome, erro):
+        self.stderr.write(f'Resultado #{pk} ({nome}): {erro}')
+        registrar_extracao(pk, nome, erro=True)
+
+    def ler_checkpoint(self):
+        try:
+            with open(self.checkpoint, encoding='utf-8') as arquivo:
+                return json.load(arquivo).get('ultimo_id', 0)
+        except FileNotFoundError:
+            return 0
+
+    def gravar_checkpoint(self, ultimo_pk):
+        os.makedirs(os.path.dirname(self.checkpoint), exist_ok=True)
+        temporario = f'{self.checkpoint}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'ultimo_id': ultimo_pk}, arquivo)
+        os.replace(temporario, self.checkpoint)
@@ -0,0 +1,68 @@
+"""
+Mantém as partições mensais da tabela de sinais vitais (PostgreSQL).
+
+Uso típico (agendado diariamente):
+    python manage.py gerenciar_particoes_sinais --meses-futuros 3 --reter-meses 24
+
+Partições desanexadas continuam no banco como tabelas comuns, para
+arquivamento ou remoção manual.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from prontuario.particionamento import criar_particao, desanexar_particao, inicio_do_mes, listar_particoes
+
+
+class Command(BaseCommand):
+    help = 'Cria partições mensais futuras de sinais vitais e desanexa as mais antigas que o período de retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            default=3,
+            help='Quantidade de meses à frente com partição garantida (padrão: 3)'
+        )
+        parser.add_argument(
+            '--reter-meses',
+            type=int,
+            help='Desanexa partições inteiramente anteriores aos últimos N meses (padrão: não desanexa)'
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Apenas lista as partições existentes'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O particionamento de sinais vitais requer PostgreSQL.')
+
+        agora = timezone.now()
+
+        with connection.cursor() as cursor:
+            if options['listar']:
+                for nome, inicio in listar_particoes(cursor):
+                    self.stdout.write(f'{nome}  ({inicio:%m/%Y})')
+                return
+
+            criadas = 0
+            for deslocamento in range(options['meses_futuros'] + 1):
+                inicio = inicio_do_mes(agora, deslocamento)
+                if criar_particao(cursor, inicio):
+                    criadas += 1
+                    self.stdout.write(f'Partição criada: {inicio:%m/%Y}')
+
+            desanexadas = 0
+            if options['reter_meses'] is not None:
+                limite = inicio_do_mes(agora, -options['reter_meses'])
+                for nome, inicio in listar_particoes(cursor):
+                    if inicio_do_mes(inicio, 1) <= limite:
+                        desanexar_particao(cursor, nome)
+                        desanexadas += 1
+                        self.stdout.write(f'Partição desanexada: {nome}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {criadas} partição(ões) criada(s), {desanexadas} desanexada(s).'
+        ))
@@ -0,0 +1,72 @@
+"""
+Recalcula os alertas persistidos dos sinais vitais.
+
+Deve ser executado após alterar SINAIS_VITAIS_LIMITES_ALERTA ou ao
+adicionar novas regras em prontuario.alertas.
+"""
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from atendimentos.models import Atendimento
+from prontuario.alertas import CAMPOS_ALERTA, atualizar_ultimo_sinal_vital, calcular_alertas_em_lote
+from prontuario.models import SinalVital
+
+
+class Command(BaseCommand):
+    help = 'Recalcula em lote o bitmask de alertas dos sinais vitais e o último registro de cada atendimento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Quantidade de registros processados por lote (padrão: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = options['lote']
+        ultimo_pk = 0
+        total = 0
+        alterados = 0
+
+        while True:
+            linhas = list(
+                SinalVital.objects.filter(pk__gt=ultimo_pk)
+                .order_by('pk')
+                .values_list('pk', 'alertas', 'total_alertas', *CAMPOS_ALERTA)[:tamanho_lote]
+            )
+            if not linhas:
+                break
+
+            # Colunas como float (None -> NaN) para avaliação vetorizada das regras
+            matriz = np.array(
+                [[np.nan if valor is None else float(valor) for valor in linha[3:]] for linha in linhas],
+                dtype=np.float64
+            ).reshape(len(linhas), len(CAMPOS_ALERTA))
+            colunas = {campo: matriz[:, i] for i, campo in enumerate(CAMPOS_ALERTA)}
+            mascaras, totais = calcular_alertas_em_lote(colunas)
+
+            # Atualiza somente os registros cujo resultado mudou; atualizado_em
+            # invalida os cards já cacheados desses registros
+            agora = timezone.now()
+            atualizar = [
+                SinalVital(pk=pk, alertas=int(mascara), total_alertas=int(qtd), atualizado_em=agora)
+                for (pk, alertas, total_alertas, *_), mascara, qtd in zip(linhas, mascaras, totais)
+                if alertas != mascara or total_alertas != qtd
+            ]
+            with transaction.atomic():
+                SinalVital.objects.bulk_update(atualizar, ['alertas', 'total_alertas', 'atualizado_em'])
+
+            total += len(linhas)
+            alterados += len(atualizar)
+            ultimo_pk = linhas[-1][0]
+            self.stdout.write(f'{total} registros processados ({alterados} alterados)...')
+
+        atendimentos = atualizar_ultimo_sinal_vital(Atendimento.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído: {total} registros processados, {alterados} alterados, '
+            f'{atendimentos} atendimentos atualizados.'
+        ))
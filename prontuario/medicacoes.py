@@ -0,0 +1,122 @@
+"""
+Lista de medicações ativas do atendimento.
+
+Um item de prescrição está ativo quando a prescrição está ATIVA, dentro da
+validade e o tratamento ainda não terminou (data da prescrição + duração em
+dias). As prescrições são filtradas no banco pelo índice
+(atendimento, status, validade); o término do tratamento é verificado em
+Python sobre esse conjunto já reduzido.
+
+O resultado é guardado no cache 'default' por atendimento e dia, com a
+versão das prescrições do atendimento na chave: a maior data de atualização
+(salvar ou remover um item atualiza a da prescrição) e a quantidade de
+prescrições. As versões de vários atendimentos vêm de uma única consulta
+agregada; como a chave muda a cada alteração, um worker nunca lê a lista
+anterior, mesmo com um cache por processo (LocMemCache).
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import ItemPrescricao, Prescricao
+
+
+TIMEOUT_CACHE_MEDICACOES = 300
+
+
+def _chave_cache(atendimento_id, hoje, versao):
+    return f'medicacoes_ativas:{atendimento_id}:{hoje.isoformat()}:{versao}'
+
+
+def _versoes_prescricoes(atendimento_ids):
+    """Versão das prescrições de cada atendimento, em uma única consulta"""
+    versoes = {atendimento_id: '0' for atendimento_id in atendimento_ids}
+    agregados = Prescricao.objects.filter(atendimento_id__in=atendimento_ids).values('atendimento_id').annotate(
+        atualizacao=Max('atualizado_em'), quantidade=Count('id')
+    ).order_by()
+    for linha in agregados:
+        versoes[linha['atendimento_id']] = f"{linha['atualizacao'].timestamp():.6f}-{linha['quantidade']}"
+    return versoes
+
+
+def _consultar_medicacoes_ativas(atendimento_ids, hoje):
+    """Busca os itens ativos de vários atendimentos em uma única consulta"""
+    itens = ItemPrescricao.objects.filter(
+        prescricao__atendimento_id__in=atendimento_ids,
+        prescricao__status='ATIVA',
+        prescricao__validade__gte=hoje,
+    ).select_related(
+        'prescricao__profissional__user'
+    ).order_by('medicamento', 'id')
+
+    medicacoes = {atendimento_id: [] for atendimento_id in atendimento_ids}
+    for item in itens:
+        prescricao = item.prescricao
+        inicio = timezone.localdate(prescricao.data_prescricao)
+        # Último dia de uso: fim do tratamento, limitado à validade da prescrição
+        ultimo_dia = min(inicio + timedelta(days=item.duracao_dias - 1), prescricao.validade)
+        if ultimo_dia < hoje:
+            continue
+
+        medico = prescricao.profissional.user
+        medicacoes[prescricao.atendimento_id].append({
+            'item_id': item.pk,
+            'prescricao_id': prescricao.pk,
+            'medicamento': item.medicamento,
+            'dose': item.dose,
+            'via': item.get_via_display(),
+            'frequencia': item.frequencia,
+            'observacoes': item.observacoes_item,
+            'inicio': inicio,
+            'termino': ultimo_dia,
+            'dias_restantes': (ultimo_dia - hoje).days,
+            'medico': medico.get_full_name() or medico.username,
+        })
+    return medicacoes
+
+
+def medicacoes_ativas(atendimento_id):
+    """Retorna a lista (cacheada) de medicações ativas do atendimento"""
+    return medicacoes_ativas_em_lote([atendimento_id])[atendimento_id]
+
+
+def medicacoes_ativas_em_lote(atendimento_ids):
+    """
+    Retorna {atendimento_id: [medicações ativas]} para vários atendimentos.
+
+    Os atendimentos ausentes do cache são calculados juntos, em uma consulta.
+    """
+    hoje = timezone.localdate()
+    versoes = _versoes_prescricoes(atendimento_ids)
+    chaves = {
+        _chave_cache(atendimento_id, hoje, versao): atendimento_id
+        for atendimento_id, versao in versoes.items()
+    }
+    em_cache = cache.get_many(chaves)
+
+    resultado = {chaves[chave]: valor for chave, valor in em_cache.items()}
+    faltando = [atendimento_id for chave, atendimento_id in chaves.items() if chave not in em_cache]
+
+    if faltando:
+        calculadas = _consultar_medicacoes_ativas(faltando, hoje)
+        cache.set_many(
+            {
+                _chave_cache(atendimento_id, hoje, versoes[atendimento_id]): lista
+                for atendimento_id, lista in calculadas.items()
+            },
+            TIMEOUT_CACHE_MEDICACOES
+        )
+        resultado.update(calculadas)
+
+    return resultado
+
+
+def contar_medicacoes_ativas(atendimento_ids):
+    """Retorna {atendimento_id: quantidade de medicações ativas}"""
+    return {
+        atendimento_id: len(lista)
+        for atendimento_id, lista in medicacoes_ativas_em_lote(atendimento_ids).items()
+    }
+
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0001_initial'),
+        ('prontuario', '0004_solicitacaoexame_resultadoexame'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evolucao',
+            index=models.Index(fields=['atendimento', '-data_hora'], name='evolucao_atend_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescricao',
+            index=models.Index(fields=['atendimento', '-data_prescricao'], name='prescricao_atend_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sinalvital',
+            index=models.Index(fields=['atendimento', '-data_hora'], name='sinalvital_atend_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitacaoexame',
+            index=models.Index(fields=['atendimento', '-data_solicitacao'], name='solicitacao_atend_data_idx'),
+        ),
+    ]
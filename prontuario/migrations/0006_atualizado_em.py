@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0005_indices_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evolucao',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='prescricao',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='sinalvital',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0006_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sinalvital',
+            name='alertas',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Alertas (bitmask)'),
+        ),
+        migrations.AddField(
+            model_name='sinalvital',
+            name='total_alertas',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, verbose_name='Total de Alertas'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0002_ultimo_sinal_vital'),
+        ('prontuario', '0007_alertas_sinal_vital'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PontuacaoNEWS2',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pontos_fr', models.PositiveSmallIntegerField(default=0, verbose_name='Frequência Respiratória')),
+                ('pontos_spo2', models.PositiveSmallIntegerField(default=0, verbose_name='Saturação de O₂')),
+                ('pontos_pa', models.PositiveSmallIntegerField(default=0, verbose_name='Pressão Sistólica')),
+                ('pontos_fc', models.PositiveSmallIntegerField(default=0, verbose_name='Frequência Cardíaca')),
+                ('pontos_temperatura', models.PositiveSmallIntegerField(default=0, verbose_name='Temperatura')),
+                ('total', models.PositiveSmallIntegerField(db_index=True, verbose_name='NEWS2')),
+                ('risco', models.CharField(choices=[('BAIXO', 'Baixo'), ('BAIXO_MEDIO', 'Baixo-Médio'), ('MEDIO', 'Médio'), ('ALTO', 'Alto')], max_length=20, verbose_name='Risco Clínico')),
+                ('parametros_ausentes', models.PositiveSmallIntegerField(default=0, help_text='Parâmetros não aferidos na leitura (pontuados como 0)', verbose_name='Parâmetros Ausentes')),
+                ('variacao', models.SmallIntegerField(blank=True, help_text='Diferença em relação à pontuação anterior do atendimento', null=True, verbose_name='Variação')),
+                ('calculado_em', models.DateTimeField(auto_now_add=True, verbose_name='Calculado em')),
+                ('atendimento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pontuacoes_news2', to='atendimentos.atendimento', verbose_name='Atendimento')),
+                ('sinal_vital', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pontuacao_news2', to='prontuario.sinalvital', verbose_name='Sinal Vital')),
+            ],
+            options={
+                'verbose_name': 'Pontuação NEWS2',
+                'verbose_name_plural': 'Pontuações NEWS2',
+                'ordering': ['-calculado_em'],
+                'indexes': [models.Index(fields=['atendimento', '-calculado_em'], name='news2_atend_calculo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0008_pontuacao_news2'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sinalvital',
+            name='data_hora',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data/Hora'),
+        ),
+    ]
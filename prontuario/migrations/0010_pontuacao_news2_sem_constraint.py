@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0009_data_hora_sinal_vital'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pontuacaonews2',
+            name='sinal_vital',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='pontuacao_news2', to='prontuario.sinalvital', verbose_name='Sinal Vital'),
+        ),
+    ]
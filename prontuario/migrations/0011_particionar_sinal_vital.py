@@ -0,0 +1,118 @@
+"""
+Converte prontuario_sinalvital em tabela particionada por mês em data_hora.
+
+Somente PostgreSQL; nos demais bancos a migração não faz nada. Os dados são
+copiados para a nova tabela dentro da transação da migração, então em bases
+grandes ela deve ser executada em janela de manutenção.
+
+No banco, a chave primária passa a ser (id, data_hora), exigência do
+PostgreSQL para tabelas particionadas. O id continua único (sequência própria)
+e o Django segue usando apenas id como chave. Por isso as FKs que apontam para
+SinalVital foram criadas sem constraint no banco (migrações anteriores).
+"""
+from django.db import migrations
+from django.utils import timezone
+
+from prontuario.particionamento import (
+    TABELA_SINAIS_VITAIS, criar_particao, criar_particao_padrao, inicio_do_mes,
+)
+
+
+LEGADO = f'{TABELA_SINAIS_VITAIS}_legado'
+SEQUENCIA = f'{TABELA_SINAIS_VITAIS}_id_seq'
+
+# Meses à frente criados junto com a tabela; depois mantidos pelo comando gerenciar_particoes_sinais
+PARTICOES_FUTURAS = 3
+
+
+def _recriar_tabela(cursor, particionar):
+    """Recria a tabela (particionada ou não) preservando dados, índices e FKs"""
+    tabela = TABELA_SINAIS_VITAIS
+
+    # Índices (exceto os que sustentam constraints) e FKs a recriar na nova tabela
+    cursor.execute("""
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = %s AND indexname NOT IN (
+            SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass
+        )
+    """, [tabela, tabela])
+    indices = cursor.fetchall()
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, [tabela])
+    chaves_estrangeiras = cursor.fetchall()
+
+    for nome, _ in indices:
+        cursor.execute(f'DROP INDEX "{nome}"')
+    cursor.execute(f'ALTER TABLE "{tabela}" RENAME TO "{LEGADO}"')
+    cursor.execute(f'ALTER TABLE "{LEGADO}" RENAME CONSTRAINT "{tabela}_pkey" TO "{LEGADO}_pkey"')
+
+    # Libera a sequência do id (identity ou serial) para a nova tabela
+    cursor.execute(f'ALTER TABLE "{LEGADO}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+    cursor.execute(f'ALTER TABLE "{LEGADO}" ALTER COLUMN id DROP DEFAULT')
+    # CASCADE remove também os defaults das partições antigas que usam a sequência
+    cursor.execute(f'DROP SEQUENCE IF EXISTS "{SEQUENCIA}" CASCADE')
+
+    cursor.execute(f'CREATE SEQUENCE "{SEQUENCIA}"')
+    particionamento = ' PARTITION BY RANGE (data_hora)' if particionar else ''
+    cursor.execute(
+        f'CREATE TABLE "{tabela}" (LIKE "{LEGADO}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS){particionamento}'
+    )
+    cursor.execute(f"""ALTER TABLE "{tabela}" ALTER COLUMN id SET DEFAULT nextval('"{SEQUENCIA}"')""")
+    cursor.execute(f'ALTER SEQUENCE "{SEQUENCIA}" OWNED BY "{tabela}".id')
+    chave = 'id, data_hora' if particionar else 'id'
+    cursor.execute(f'ALTER TABLE "{tabela}" ADD CONSTRAINT "{tabela}_pkey" PRIMARY KEY ({chave})')
+
+    if particionar:
+        cursor.execute(f'SELECT min(data_hora) FROM "{LEGADO}"')
+        primeira_leitura = cursor.fetchone()[0]
+        agora = timezone.now()
+        mes = inicio_do_mes(primeira_leitura or agora)
+        while mes <= inicio_do_mes(agora, PARTICOES_FUTURAS):
+            criar_particao(cursor, mes, tabela)
+            mes = inicio_do_mes(mes, 1)
+        criar_particao_padrao(cursor, tabela)
+
+    cursor.execute(f'INSERT INTO "{tabela}" SELECT * FROM "{LEGADO}"')
+    cursor.execute(f"""SELECT setval('"{SEQUENCIA}"', COALESCE((SELECT max(id) FROM "{tabela}"), 0) + 1, false)""")
+    cursor.execute(f'DROP TABLE "{LEGADO}"')
+
+    # Índices criados na tabela pai são propagados para todas as partições
+    for _, definicao in indices:
+        cursor.execute(definicao)
+    for nome, definicao in chaves_estrangeiras:
+        cursor.execute(f'ALTER TABLE "{tabela}" ADD CONSTRAINT "{nome}" {definicao}')
+
+    if particionar:
+        cursor.execute(
+            f'CREATE INDEX "sinalvital_data_brin_idx" ON "{tabela}" '
+            f'USING brin (data_hora) WITH (pages_per_range = 32)'
+        )
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _recriar_tabela(cursor, particionar=True)
+
+
+def desfazer_particionamento(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS "sinalvital_data_brin_idx"')
+        _recriar_tabela(cursor, particionar=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0003_ultimo_sinal_vital_sem_constraint'),
+        ('prontuario', '0010_pontuacao_news2_sem_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desfazer_particionamento),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0003_ultimo_sinal_vital_sem_constraint'),
+        ('prontuario', '0011_particionar_sinal_vital'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescricao',
+            index=models.Index(fields=['atendimento', 'status', 'validade'], name='prescricao_atend_status_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0003_ultimo_sinal_vital_sem_constraint'),
+        ('prontuario', '0012_indice_medicacoes_ativas'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitacaoexame',
+            index=models.Index(condition=models.Q(('status__in', ['SOLICITADO', 'COLETADO'])), fields=['data_solicitacao', 'id'], name='solicitacao_abertas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitacaoexame',
+            index=models.Index(fields=['data_atualizacao'], name='solicitacao_atualizacao_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0013_indices_fila_exames'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TempoExameConsolidado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia da Solicitação')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora da Solicitação')),
+                ('tipo', models.CharField(choices=[('LABORATORIO', 'Laboratório'), ('IMAGEM', 'Imagem'), ('CARDIOLOGIA', 'Cardiologia'), ('ANATOMIA_PATOLOGICA', 'Anatomia Patológica'), ('OUTRO', 'Outro')], max_length=30, verbose_name='Tipo de Exame')),
+                ('nome_exame', models.CharField(max_length=200, verbose_name='Nome do Exame')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('soma_minutos', models.FloatField(verbose_name='Soma dos Tempos (min)')),
+                ('p50_minutos', models.FloatField(verbose_name='Mediana (min)')),
+                ('p90_minutos', models.FloatField(verbose_name='Percentil 90 (min)')),
+                ('histograma', models.JSONField(default=list, help_text='Contagem por faixa de prontuario.tempos_exames.FAIXAS_MINUTOS', verbose_name='Histograma')),
+                ('ultimo_resultado', models.DateTimeField(help_text='Resultado mais recente incluído (marca do processamento incremental)', verbose_name='Último Resultado')),
+                ('consolidado_em', models.DateTimeField(auto_now=True, verbose_name='Consolidado em')),
+            ],
+            options={
+                'verbose_name': 'Tempo de Exame Consolidado',
+                'verbose_name_plural': 'Tempos de Exames Consolidados',
+                'ordering': ['-dia', 'hora'],
+                'indexes': [models.Index(fields=['tipo', 'dia'], name='tempo_exame_tipo_dia_idx'), models.Index(fields=['ultimo_resultado'], name='tempo_exame_ultimo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'hora', 'tipo', 'nome_exame'), name='tempo_exame_unico')],
+            },
+        ),
+    ]
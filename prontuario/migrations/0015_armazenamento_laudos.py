@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:27
+
+import django.utils.timezone
+import prontuario.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0014_tempo_exame_consolidado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resultadoexame',
+            name='arquivo_laudo',
+            field=models.FileField(blank=True, help_text='Upload do laudo em PDF ou imagem (opcional)', null=True, storage=prontuario.armazenamento.armazenamento_laudos, upload_to='laudos/%Y/%m/', verbose_name='Arquivo do Laudo'),
+        ),
+        migrations.CreateModel(
+            name='ArquivoLaudo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, unique=True, verbose_name='Arquivo')),
+                ('tamanho', models.BigIntegerField(verbose_name='Tamanho (bytes)')),
+                ('referencias', models.IntegerField(default=0, verbose_name='Referências')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Laudo',
+                'verbose_name_plural': 'Arquivos de Laudos',
+                'indexes': [models.Index(fields=['referencias', 'atualizado_em'], name='arquivo_laudo_orfao_idx')],
+            },
+        ),
+    ]
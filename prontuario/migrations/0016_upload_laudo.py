@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0015_armazenamento_laudos'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadLaudo',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('tamanho', models.BigIntegerField(verbose_name='Tamanho (bytes)')),
+                ('recebido', models.BigIntegerField(default=0, verbose_name='Bytes Recebidos')),
+                ('arquivo', models.CharField(blank=True, help_text='Preenchido ao concluir o envio', max_length=100, verbose_name='Arquivo Gravado')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('profissional', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads_laudo', to='usuarios.profissional', verbose_name='Profissional')),
+                ('solicitacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads_laudo', to='prontuario.solicitacaoexame', verbose_name='Solicitação de Exame')),
+            ],
+            options={
+                'verbose_name': 'Envio de Laudo',
+                'verbose_name_plural': 'Envios de Laudos',
+                'indexes': [models.Index(fields=['atualizado_em'], name='upload_laudo_atualizado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:33
+
+import prontuario.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0016_upload_laudo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultadoexame',
+            name='previa',
+            field=models.FileField(blank=True, editable=False, help_text='Miniatura gerada em segundo plano (prontuario.previas)', storage=prontuario.armazenamento.armazenamento_laudos, upload_to='', verbose_name='Prévia do Laudo'),
+        ),
+    ]
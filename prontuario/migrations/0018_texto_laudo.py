@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:34
+"""
+Texto extraído dos laudos (prontuario.texto_laudos).
+
+Os resultados existentes com laudo em PDF ficam pendentes para o comando
+extrair_texto_laudos. No PostgreSQL cria o índice GIN de texto completo com
+a mesma expressão de texto_laudos.vetor_busca().
+"""
+from django.db import migrations, models
+
+INDICE = 'resultado_texto_laudo_gin'
+
+
+def marcar_pendentes(apps, schema_editor):
+    ResultadoExame = apps.get_model('prontuario', 'ResultadoExame')
+    ResultadoExame.objects.filter(arquivo_laudo__iendswith='.pdf').update(status_extracao='PENDENTE')
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX {INDICE} ON prontuario_resultadoexame "
+        "USING gin (to_tsvector('portuguese'::regconfig, COALESCE(texto_laudo, '')))"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0017_previa_laudo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultadoexame',
+            name='extraido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Texto Extraído em'),
+        ),
+        migrations.AddField(
+            model_name='resultadoexame',
+            name='status_extracao',
+            field=models.CharField(choices=[('NAO_APLICAVEL', 'Não se aplica'), ('PENDENTE', 'Pendente'), ('EXTRAIDO', 'Extraído'), ('SEM_TEXTO', 'Sem texto (digitalizado)'), ('ERRO', 'Erro')], default='NAO_APLICAVEL', editable=False, max_length=20, verbose_name='Extração do Texto'),
+        ),
+        migrations.AddField(
+            model_name='resultadoexame',
+            name='texto_laudo',
+            field=models.TextField(blank=True, editable=False, verbose_name='Texto do Laudo'),
+        ),
+        migrations.RunPython(marcar_pendentes, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
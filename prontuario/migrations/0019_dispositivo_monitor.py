@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0018_texto_laudo'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispositivoMonitor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('hash_token', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Hash do Token')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('ultimo_uso_em', models.DateTimeField(blank=True, null=True, verbose_name='Último Uso')),
+                ('profissional', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='dispositivos_monitor', to='usuarios.profissional', verbose_name='Profissional Responsável')),
+            ],
+            options={
+                'verbose_name': 'Dispositivo Monitor',
+                'verbose_name_plural': 'Dispositivos Monitores',
+                'ordering': ['nome'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prontuario', '0019_dispositivo_monitor'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemprescricao',
+            name='alergia_confirmada_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Conflito Confirmado em'),
+        ),
+        migrations.AddField(
+            model_name='itemprescricao',
+            name='alergia_confirmada_por',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='alergias_confirmadas', to='usuarios.profissional', verbose_name='Conflito Confirmado por'),
+        ),
+        migrations.AddField(
+            model_name='itemprescricao',
+            name='conflito_alergia',
+            field=models.TextField(blank=True, help_text='Conflitos apontados na prescrição (prontuario.alergias)', verbose_name='Conflito com Alergia'),
+        ),
+    ]
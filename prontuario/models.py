@@ -1,8 +1,14 @@
+import uuid
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from atendimentos.models import Atendimento
 from usuarios.models import Profissional
+from .alertas import calcular_alertas, contar_alertas, descrever_alertas
+from .armazenamento import armazenamento_laudos
+from .news2 import RISCO_CHOICES
 
 
 class Evolucao(models.Model):
@@ -37,11 +43,15 @@ class Evolucao(models.Model):
         auto_now_add=True,
         verbose_name='Data/Hora'
     )
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Evolução Clínica'
         verbose_name_plural = 'Evoluções Clínicas'
         ordering = ['-data_hora']
+        indexes = [
+            models.Index(fields=['atendimento', '-data_hora'], name='evolucao_atend_data_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.atendimento.paciente.nome} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
@@ -143,15 +153,34 @@ class SinalVital(models.Model):
         help_text='Informações adicionais sobre a aferição'
     )
 
+    # Por padrão a hora do registro; a ingestão em lote informa a hora da aferição no monitor
     data_hora = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='Data/Hora'
     )
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    # Alertas pré-calculados ao salvar (ver prontuario.alertas)
+    alertas = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='Alertas (bitmask)'
+    )
+    total_alertas = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='Total de Alertas'
+    )
 
     class Meta:
         verbose_name = 'Sinal Vital'
         verbose_name_plural = 'Sinais Vitais'
         ordering = ['-data_hora']
+        indexes = [
+            models.Index(fields=['atendimento', '-data_hora'], name='sinalvital_atend_data_idx'),
+        ]
 
     def __str__(self):
         return f"Sinais Vitais - {self.atendimento.paciente.nome} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
@@ -162,35 +191,32 @@ class SinalVital(models.Model):
             return f"{self.pressao_arterial_sistolica}/{self.pressao_arterial_diastolica}"
         return "Não aferida"
 
-    def tem_sinais_alterados(self):
-        """Verifica se algum sinal vital está fora dos parâmetros normais"""
-        alertas = []
+    def save(self, *args, **kwargs):
+        """Persiste os alertas calculados e atualiza o último registro do atendimento"""
+        self.alertas = calcular_alertas(self)
+        self.total_alertas = contar_alertas(self.alertas)
+        novo = self.pk is None
 
-        # Pressão arterial
-        if self.pressao_arterial_sistolica and self.pressao_arterial_sistolica > 140:
-            alertas.append('Pressão sistólica elevada')
-        if self.pressao_arterial_diastolica and self.pressao_arterial_diastolica > 90:
-            alertas.append('Pressão diastólica elevada')
+        super().save(*args, **kwargs)
+
+        if novo:
+            Atendimento.objects.filter(pk=self.atendimento_id).filter(
+                models.Q(ultimo_sinal_vital__isnull=True) |
+                models.Q(ultimo_sinal_vital__data_hora__lte=self.data_hora)
+            ).update(ultimo_sinal_vital=self)
 
-        # Frequência cardíaca
-        if self.frequencia_cardiaca:
-            if self.frequencia_cardiaca < 60:
-                alertas.append('Bradicardia')
-            elif self.frequencia_cardiaca > 100:
-                alertas.append('Taquicardia')
+    def tem_sinais_alterados(self):
+        """Verifica se algum sinal vital está fora dos parâmetros normais"""
+        mascara = self.alertas if self.pk else calcular_alertas(self)
+        return descrever_alertas(mascara)
 
-        # Temperatura
-        if self.temperatura:
-            if self.temperatura < 36.0:
-                alertas.append('Hipotermia')
-            elif self.temperatura > 37.5:
-                alertas.append('Febre')
 
-        # Saturação O2
-        if self.saturacao_o2 and self.saturacao_o2 < 95:
-            alertas.append('Saturação baixa')
+class PrescricaoQuerySet(models.QuerySet):
+    """QuerySet de prescrições com anotações de uso comum"""
 
-        return alertas
+    def com_total_itens(self):
+        """Anota `num_itens` (quantidade de medicamentos) na própria consulta"""
+        return self.annotate(num_itens=models.Count('itens'))
 
 
 class Prescricao(models.Model):
@@ -233,11 +259,19 @@ class Prescricao(models.Model):
         verbose_name='Observações Gerais',
         help_text='Observações sobre a prescrição (opcional)'
     )
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = PrescricaoQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Prescrição Médica'
         verbose_name_plural = 'Prescrições Médicas'
         ordering = ['-data_prescricao']
+        indexes = [
+            models.Index(fields=['atendimento', '-data_prescricao'], name='prescricao_atend_data_idx'),
+            # Lista de medicações ativas (prontuario.medicacoes)
+            models.Index(fields=['atendimento', 'status', 'validade'], name='prescricao_atend_status_idx'),
+        ]
 
     def clean(self):
         """Valida que apenas médicos podem criar prescrições"""
@@ -265,7 +299,16 @@ class Prescricao(models.Model):
         return status_classes.get(self.status, 'bg-gray-100 text-gray-800 border-gray-300')
 
     def total_itens(self):
-        """Retorna o total de medicamentos prescritos"""
+        """
+        Retorna o total de medicamentos prescritos.
+
+        Usa a anotação de com_total_itens() ou os itens já carregados por
+        prefetch_related('itens'); só consulta o banco na ausência de ambos.
+        """
+        if hasattr(self, 'num_itens'):
+            return self.num_itens
+        if 'itens' in getattr(self, '_prefetched_objects_cache', {}):
+            return len(self.itens.all())
         return self.itens.count()
 
 
@@ -322,6 +365,22 @@ class ItemPrescricao(models.Model):
         help_text='Instruções específicas para este medicamento (opcional)'
     )
 
+    # Confirmação do prescritor ao manter um medicamento que conflita com as alergias
+    conflito_alergia = models.TextField(
+        blank=True,
+        verbose_name='Conflito com Alergia',
+        help_text='Conflitos apontados na prescrição (prontuario.alergias)'
+    )
+    alergia_confirmada_por = models.ForeignKey(
+        Profissional,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='alergias_confirmadas',
+        verbose_name='Conflito Confirmado por'
+    )
+    alergia_confirmada_em = models.DateTimeField(null=True, blank=True, verbose_name='Conflito Confirmado em')
+
     class Meta:
         verbose_name = 'Item da Prescrição'
         verbose_name_plural = 'Itens da Prescrição'
@@ -330,6 +389,17 @@ class ItemPrescricao(models.Model):
     def __str__(self):
         return f"{self.medicamento} - {self.dose} - {self.get_via_display()}"
 
+    def save(self, *args, **kwargs):
+        """Salva o item e atualiza a versão da prescrição (usada no cache dos cards)"""
+        super().save(*args, **kwargs)
+        Prescricao.objects.filter(pk=self.prescricao_id).update(atualizado_em=timezone.now())
+
+    def delete(self, *args, **kwargs):
+        """Remove o item e atualiza a versão da prescrição"""
+        resultado = super().delete(*args, **kwargs)
+        Prescricao.objects.filter(pk=self.prescricao_id).update(atualizado_em=timezone.now())
+        return resultado
+
 
 class SolicitacaoExame(models.Model):
     """Model para registro de solicitações de exames durante o atendimento"""
@@ -394,6 +464,16 @@ class SolicitacaoExame(models.Model):
         verbose_name = 'Solicitação de Exame'
         verbose_name_plural = 'Solicitações de Exames'
         ordering = ['-data_solicitacao']
+        indexes = [
+            models.Index(fields=['atendimento', '-data_solicitacao'], name='solicitacao_atend_data_idx'),
+            # Fila de exames (prontuario.fila_exames): apenas solicitações em aberto
+            models.Index(
+                fields=['data_solicitacao', 'id'],
+                name='solicitacao_abertas_idx',
+                condition=models.Q(status__in=['SOLICITADO', 'COLETADO'])
+            ),
+            models.Index(fields=['data_atualizacao'], name='solicitacao_atualizacao_idx'),
+        ]
 
     def clean(self):
         """Valida que apenas médicos podem solicitar exames"""
@@ -440,6 +520,14 @@ class SolicitacaoExame(models.Model):
 class ResultadoExame(models.Model):
     """Model para registro de resultados de exames"""
 
+    STATUS_EXTRACAO_CHOICES = [
+        ('NAO_APLICAVEL', 'Não se aplica'),
+        ('PENDENTE', 'Pendente'),
+        ('EXTRAIDO', 'Extraído'),
+        ('SEM_TEXTO', 'Sem texto (digitalizado)'),
+        ('ERRO', 'Erro'),
+    ]
+
     solicitacao = models.OneToOneField(
         SolicitacaoExame,
         on_delete=models.PROTECT,
@@ -452,11 +540,19 @@ class ResultadoExame(models.Model):
     )
     arquivo_laudo = models.FileField(
         upload_to='laudos/%Y/%m/',
+        storage=armazenamento_laudos,  # Grava por conteúdo (prontuario.armazenamento)
         null=True,
         blank=True,
         verbose_name='Arquivo do Laudo',
         help_text='Upload do laudo em PDF ou imagem (opcional)'
     )
+    previa = models.FileField(
+        storage=armazenamento_laudos,
+        blank=True,
+        editable=False,
+        verbose_name='Prévia do Laudo',
+        help_text='Miniatura gerada em segundo plano (prontuario.previas)'
+    )
     data_resultado = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Data do Resultado'
@@ -467,6 +563,17 @@ class ResultadoExame(models.Model):
         help_text='Observações adicionais sobre o resultado (opcional)'
     )
 
+    # Texto extraído do laudo em PDF para a busca (prontuario.texto_laudos)
+    texto_laudo = models.TextField(blank=True, editable=False, verbose_name='Texto do Laudo')
+    status_extracao = models.CharField(
+        max_length=20,
+        choices=STATUS_EXTRACAO_CHOICES,
+        default='NAO_APLICAVEL',
+        editable=False,
+        verbose_name='Extração do Texto'
+    )
+    extraido_em = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Texto Extraído em')
+
     class Meta:
         verbose_name = 'Resultado de Exame'
         verbose_name_plural = 'Resultados de Exames'
@@ -474,3 +581,240 @@ class ResultadoExame(models.Model):
 
     def __str__(self):
         return f"Resultado - {self.solicitacao.nome_exame} - {self.data_resultado.strftime('%d/%m/%Y')}"
+
+    def save(self, *args, **kwargs):
+        """Salva o resultado e atualiza a versão da solicitação (usada no cache dos cards)"""
+        super().save(*args, **kwargs)
+        SolicitacaoExame.objects.filter(pk=self.solicitacao_id).update(data_atualizacao=timezone.now())
+
+    def delete(self, *args, **kwargs):
+        """Remove o resultado e atualiza a versão da solicitação"""
+        resultado = super().delete(*args, **kwargs)
+        SolicitacaoExame.objects.filter(pk=self.solicitacao_id).update(data_atualizacao=timezone.now())
+        return resultado
+
+
+class PontuacaoNEWS2(models.Model):
+    """Histórico do escore NEWS2 calculado para cada leitura de sinais vitais"""
+
+    atendimento = models.ForeignKey(
+        Atendimento,
+        on_delete=models.CASCADE,
+        related_name='pontuacoes_news2',
+        verbose_name='Atendimento'
+    )
+    sinal_vital = models.OneToOneField(
+        SinalVital,
+        on_delete=models.CASCADE,
+        related_name='pontuacao_news2',
+        db_constraint=False,  # SinalVital é particionada; PK composta (id, data_hora) no banco
+        verbose_name='Sinal Vital'
+    )
+
+    # Subescores por parâmetro (ver prontuario.news2.PARAMETROS_NEWS2)
+    pontos_fr = models.PositiveSmallIntegerField(default=0, verbose_name='Frequência Respiratória')
+    pontos_spo2 = models.PositiveSmallIntegerField(default=0, verbose_name='Saturação de O₂')
+    pontos_pa = models.PositiveSmallIntegerField(default=0, verbose_name='Pressão Sistólica')
+    pontos_fc = models.PositiveSmallIntegerField(default=0, verbose_name='Frequência Cardíaca')
+    pontos_temperatura = models.PositiveSmallIntegerField(default=0, verbose_name='Temperatura')
+
+    total = models.PositiveSmallIntegerField(
+        db_index=True,
+        verbose_name='NEWS2'
+    )
+    risco = models.CharField(
+        max_length=20,
+        choices=RISCO_CHOICES,
+        verbose_name='Risco Clínico'
+    )
+    parametros_ausentes = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Parâmetros Ausentes',
+        help_text='Parâmetros não aferidos na leitura (pontuados como 0)'
+    )
+    variacao = models.SmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Variação',
+        help_text='Diferença em relação à pontuação anterior do atendimento'
+    )
+    calculado_em = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Calculado em'
+    )
+
+    class Meta:
+        verbose_name = 'Pontuação NEWS2'
+        verbose_name_plural = 'Pontuações NEWS2'
+        ordering = ['-calculado_em']
+        indexes = [
+            models.Index(fields=['atendimento', '-calculado_em'], name='news2_atend_calculo_idx'),
+        ]
+
+    def __str__(self):
+        return f"NEWS2 {self.total} - {self.atendimento.paciente.nome}"
+
+    def get_risco_badge_class(self):
+        """Retorna classe CSS para estilizar o risco clínico"""
+        risco_classes = {
+            'BAIXO': 'bg-green-100 text-green-800 border-green-300',
+            'BAIXO_MEDIO': 'bg-yellow-100 text-yellow-800 border-yellow-300',
+            'MEDIO': 'bg-orange-100 text-orange-800 border-orange-300',
+            'ALTO': 'bg-red-100 text-red-800 border-red-300',
+        }
+        return risco_classes.get(self.risco, 'bg-gray-100 text-gray-800 border-gray-300')
+
+
+class TempoExameConsolidado(models.Model):
+    """
+    Tempo de liberação (solicitação -> resultado) consolidado por dia e hora
+    da solicitação, tipo e nome do exame. Gerado pelo comando
+    consolidar_tempos_exames (ver prontuario.tempos_exames).
+    """
+
+    dia = models.DateField(verbose_name='Dia da Solicitação')
+    hora = models.PositiveSmallIntegerField(verbose_name='Hora da Solicitação')
+    tipo = models.CharField(
+        max_length=30,
+        choices=SolicitacaoExame.TIPO_CHOICES,
+        verbose_name='Tipo de Exame'
+    )
+    nome_exame = models.CharField(max_length=200, verbose_name='Nome do Exame')
+
+    quantidade = models.PositiveIntegerField(verbose_name='Quantidade')
+    soma_minutos = models.FloatField(verbose_name='Soma dos Tempos (min)')
+    p50_minutos = models.FloatField(verbose_name='Mediana (min)')
+    p90_minutos = models.FloatField(verbose_name='Percentil 90 (min)')
+    histograma = models.JSONField(
+        default=list,
+        verbose_name='Histograma',
+        help_text='Contagem por faixa de prontuario.tempos_exames.FAIXAS_MINUTOS'
+    )
+    ultimo_resultado = models.DateTimeField(
+        verbose_name='Último Resultado',
+        help_text='Resultado mais recente incluído (marca do processamento incremental)'
+    )
+    consolidado_em = models.DateTimeField(auto_now=True, verbose_name='Consolidado em')
+
+    class Meta:
+        verbose_name = 'Tempo de Exame Consolidado'
+        verbose_name_plural = 'Tempos de Exames Consolidados'
+        ordering = ['-dia', 'hora']
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'hora', 'tipo', 'nome_exame'], name='tempo_exame_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['tipo', 'dia'], name='tempo_exame_tipo_dia_idx'),
+            models.Index(fields=['ultimo_resultado'], name='tempo_exame_ultimo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome_exame} - {self.dia:%d/%m/%Y} {self.hora:02d}h ({self.quantidade})"
+
+    @property
+    def media_minutos(self):
+        return self.soma_minutos / self.quantidade if self.quantidade else None
+
+
+class ArquivoLaudo(models.Model):
+    """
+    Arquivo de laudo armazenado por conteúdo (prontuario.armazenamento) e a
+    quantidade de resultados que o referenciam.
+    """
+
+    nome = models.CharField(max_length=100, unique=True, verbose_name='Arquivo')
+    tamanho = models.BigIntegerField(verbose_name='Tamanho (bytes)')
+    referencias = models.IntegerField(default=0, verbose_name='Referências')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    atualizado_em = models.DateTimeField(default=timezone.now, verbose_name='Atualizado em')
+
+    class Meta:
+        verbose_name = 'Arquivo de Laudo'
+        verbose_name_plural = 'Arquivos de Laudos'
+        indexes = [
+            models.Index(fields=['referencias', 'atualizado_em'], name='arquivo_laudo_orfao_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} ({self.referencias} referência{'s' if self.referencias != 1 else ''})"
+
+
+class UploadLaudo(models.Model):
+    """
+    Envio de um laudo em partes (upload retomável, ver prontuario.uploads).
+
+    As partes são gravadas em um arquivo parcial em VAR_ROOT; ao concluir, o
+    arquivo montado vai para o armazenamento de laudos e `arquivo` recebe o
+    nome gravado, usado ao registrar o resultado.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    solicitacao = models.ForeignKey(
+        SolicitacaoExame,
+        on_delete=models.CASCADE,
+        related_name='uploads_laudo',
+        verbose_name='Solicitação de Exame'
+    )
+    profissional = models.ForeignKey(
+        Profissional,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='uploads_laudo',
+        verbose_name='Profissional'
+    )
+    nome_arquivo = models.CharField(max_length=255, verbose_name='Nome do Arquivo')
+    tamanho = models.BigIntegerField(verbose_name='Tamanho (bytes)')
+    recebido = models.BigIntegerField(default=0, verbose_name='Bytes Recebidos')
+    arquivo = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Arquivo Gravado',
+        help_text='Preenchido ao concluir o envio'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    class Meta:
+        verbose_name = 'Envio de Laudo'
+        verbose_name_plural = 'Envios de Laudos'
+        indexes = [
+            models.Index(fields=['atualizado_em'], name='upload_laudo_atualizado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.recebido}/{self.tamanho} bytes)"
+
+    @property
+    def concluido(self):
+        return bool(self.arquivo)
+
+
+class DispositivoMonitor(models.Model):
+    """
+    Monitor de beira-leito autorizado a enviar sinais vitais pela API de
+    ingestão em lote (prontuario.dispositivos).
+
+    Apenas o SHA-256 do token é guardado; o token é exibido uma única vez pelo
+    comando criar_token_dispositivo. As leituras enviadas são registradas em
+    nome do profissional vinculado.
+    """
+
+    nome = models.CharField(max_length=100, verbose_name='Nome')
+    profissional = models.ForeignKey(
+        Profissional,
+        on_delete=models.PROTECT,
+        related_name='dispositivos_monitor',
+        verbose_name='Profissional Responsável'
+    )
+    hash_token = models.CharField(max_length=64, unique=True, editable=False, verbose_name='Hash do Token')
+    ativo = models.BooleanField(default=True, verbose_name='Ativo')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    ultimo_uso_em = models.DateTimeField(null=True, blank=True, verbose_name='Último Uso')
+
+    class Meta:
+        verbose_name = 'Dispositivo Monitor'
+        verbose_name_plural = 'Dispositivos Monitores'
+        ordering = ['nome']
+
+    def __str__(self):
+        return f"{self.nome}{'' if self.ativo else ' (inativo)'}"
@@ -0,0 +1,145 @@
+"""
+Escore de alerta precoce NEWS2 (National Early Warning Score 2).
+
+A pontuação é calculada sobre arrays NumPy: a última leitura de sinais
+vitais de todos os atendimentos ativos é carregada em uma única consulta
+e todas as linhas são pontuadas de uma vez, sem laço em Python por paciente.
+
+Limitações: o prontuário não registra oxigênio suplementar nem nível de
+consciência (AVPU), então esses dois componentes são considerados normais
+(ar ambiente, alerta) e a SpO2 é avaliada pela escala 1.
+
+Parâmetros não aferidos (ausentes ou zero, a mesma regra dos alertas em
+prontuario.alertas) pontuam 0 e entram em parametros_ausentes.
+"""
+import numpy as np
+from django.db.models import OuterRef, Subquery
+
+from .alertas import mascarar_nao_aferidos
+
+
+# (subescore, campo de SinalVital, cortes superiores inclusivos, pontos por faixa)
+# Ex.: frequência respiratória <= 8 -> 3; 9-11 -> 1; 12-20 -> 0; 21-24 -> 2; >= 25 -> 3
+PARAMETROS_NEWS2 = [
+    ('pontos_fr', 'frequencia_respiratoria', [8, 11, 20, 24], [3, 1, 0, 2, 3]),
+    ('pontos_spo2', 'saturacao_o2', [91, 93, 95], [3, 2, 1, 0]),
+    ('pontos_pa', 'pressao_arterial_sistolica', [90, 100, 110, 219], [3, 2, 1, 0, 3]),
+    ('pontos_fc', 'frequencia_cardiaca', [40, 50, 90, 110, 130], [3, 1, 0, 1, 2, 3]),
+    ('pontos_temperatura', 'temperatura', [35.0, 36.0, 38.0, 39.0], [3, 1, 0, 1, 2]),
+]
+
+CAMPOS_NEWS2 = [campo for _, campo, _, _ in PARAMETROS_NEWS2]
+SUBESCORES_NEWS2 = [subescore for subescore, _, _, _ in PARAMETROS_NEWS2]
+
+RISCO_CHOICES = [
+    ('BAIXO', 'Baixo'),
+    ('BAIXO_MEDIO', 'Baixo-Médio'),
+    ('MEDIO', 'Médio'),
+    ('ALTO', 'Alto'),
+]
+
+
+def pontuar_news2(colunas):
+    """
+    Calcula o NEWS2 de forma vetorizada.
+
+    Args:
+        colunas (dict): campo -> array NumPy de floats, com NaN para valores ausentes
+            (zero também é tratado como não aferido).
+
+    Returns:
+        dict: subescore -> array de pontos, além de 'total', 'parametros_ausentes'
+        e 'risco' (array de strings com as chaves de RISCO_CHOICES).
+    """
+    resultado = {}
+    total = None
+    maximo_individual = None
+    ausentes = None
+
+    for subescore, campo, cortes, pontos in PARAMETROS_NEWS2:
+        valores = mascarar_nao_aferidos(colunas[campo])
+        faltando = np.isnan(valores)
+
+        # np.digitize com right=True devolve a faixa em que cortes[i-1] < valor <= cortes[i]
+        faixa = np.digitize(np.where(faltando, 0, valores), cortes, right=True)
+        subtotal = np.where(faltando, 0, np.asarray(pontos, dtype=np.int64)[faixa])
+
+        resultado[subescore] = subtotal
+        total = subtotal if total is None else total + subtotal
+        maximo_individual = subtotal if maximo_individual is None else np.maximum(maximo_individual, subtotal)
+        ausentes = faltando.astype(np.int64) if ausentes is None else ausentes + faltando
+
+    resultado['total'] = total
+    resultado['parametros_ausentes'] = ausentes
+    resultado['risco'] = classificar_risco(total, maximo_individual)
+    return resultado
+
+
+def classificar_risco(total, maximo_individual):
+    """Faixa de risco clínico: 0-4 baixo, 3 em um parâmetro baixo-médio, 5-6 médio, >= 7 alto"""
+    return np.select(
+        [total >= 7, total >= 5, maximo_individual >= 3],
+        ['ALTO', 'MEDIO', 'BAIXO_MEDIO'],
+        default='BAIXO'
+    )
+
+
+def calcular_news2_ativos():
+    """
+    Pontua a leitura mais recente de cada atendimento ativo e grava o histórico.
+
+    Leituras já pontuadas são ignoradas, então execuções frequentes só gravam
+    linhas para atendimentos com sinais vitais novos. A variação é calculada em
+    relação à pontuação anterior do mesmo atendimento.
+
+    Returns:
+        int: quantidade de pontuações calculadas. Uma leitura pontuada ao mesmo
+             tempo por outra execução é descartada na gravação (ignore_conflicts),
+             mas entra na contagem.
+    """
+    from atendimentos.models import Atendimento
+    from .models import PontuacaoNEWS2
+
+    anterior = PontuacaoNEWS2.objects.filter(
+        atendimento=OuterRef('pk')
+    ).order_by('-calculado_em', '-pk')
+
+    linhas = list(
+        Atendimento.objects.ativos()
+        .filter(ultimo_sinal_vital__isnull=False)
+        .annotate(
+            sinal_pontuado=Subquery(anterior.values('sinal_vital_id')[:1]),
+            total_anterior=Subquery(anterior.values('total')[:1]),
+        )
+        .values_list(
+            'pk',
+            'ultimo_sinal_vital_id',
+            'sinal_pontuado',
+            'total_anterior',
+            *[f'ultimo_sinal_vital__{campo}' for campo in CAMPOS_NEWS2]
+        )
+    )
+    linhas = [linha for linha in linhas if linha[1] != linha[2]]
+    if not linhas:
+        return 0
+
+    matriz = np.array([linha[4:] for linha in linhas], dtype=np.float64)
+    pontuacao = pontuar_news2({campo: matriz[:, i] for i, campo in enumerate(CAMPOS_NEWS2)})
+
+    registros = []
+    for i, (atendimento_id, sinal_vital_id, _, total_anterior, *_) in enumerate(linhas):
+        total = int(pontuacao['total'][i])
+        registros.append(PontuacaoNEWS2(
+            atendimento_id=atendimento_id,
+            sinal_vital_id=sinal_vital_id,
+            total=total,
+            risco=str(pontuacao['risco'][i]),
+            parametros_ausentes=int(pontuacao['parametros_ausentes'][i]),
+            variacao=None if total_anterior is None else total - total_anterior,
+            **{subescore: int(pontuacao[subescore][i]) for subescore in SUBESCORES_NEWS2},
+        ))
+
+    # ignore_conflicts: duas execuções simultâneas podem pontuar a mesma leitura
+    PontuacaoNEWS2.objects.bulk_create(registros, batch_size=1000, ignore_conflicts=True)
+
+    return len(registros)
@@ -0,0 +1,104 @@
+"""
+Particionamento mensal da tabela de sinais vitais (somente PostgreSQL).
+
+A tabela prontuario_sinalvital é particionada por faixa em data_hora, uma
+partição por mês (prontuario_sinalvital_pAAAA_MM) mais uma partição DEFAULT
+para leituras fora das partições existentes. Os limites das partições são
+meses em UTC.
+
+Consultas por atendimento em uma janela de tempo descartam as partições fora
+da janela (partition pruning) e usam, em cada partição, o btree
+(atendimento_id, data_hora). O BRIN em data_hora atende varreduras por período
+com um índice de poucas páginas, pois as leituras chegam em ordem cronológica.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+
+TABELA_SINAIS_VITAIS = 'prontuario_sinalvital'
+
+PADRAO_PARTICAO = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def inicio_do_mes(data, deslocamento=0):
+    """Primeiro instante (UTC) do mês de `data` somado a `deslocamento` meses"""
+    indice = data.year * 12 + (data.month - 1) + deslocamento
+    return datetime(indice // 12, indice % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def nome_particao(tabela, inicio):
+    """Nome da partição mensal, ex: prontuario_sinalvital_p2026_10"""
+    return f'{tabela}_p{inicio:%Y_%m}'
+
+
+def listar_particoes(cursor, tabela=TABELA_SINAIS_VITAIS):
+    """Retorna [(nome, início do mês)] das partições mensais anexadas, em ordem"""
+    cursor.execute("""
+        SELECT filha.relname
+        FROM pg_inherits
+        JOIN pg_class pai ON pai.oid = pg_inherits.inhparent
+        JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid
+        WHERE pai.relname = %s
+    """, [tabela])
+
+    particoes = []
+    for (nome,) in cursor.fetchall():
+        encontrado = PADRAO_PARTICAO.search(nome)
+        if encontrado:
+            ano, mes = int(encontrado.group(1)), int(encontrado.group(2))
+            particoes.append((nome, datetime(ano, mes, 1, tzinfo=dt_timezone.utc)))
+    return sorted(particoes, key=lambda particao: particao[1])
+
+
+def criar_particao(cursor, inicio, tabela=TABELA_SINAIS_VITAIS):
+    """
+    Cria e anexa a partição do mês iniciado em `inicio`, se ainda não existir.
+
+    Leituras desse mês que já estejam na partição DEFAULT são movidas para a
+    nova partição antes do ATTACH (que falharia caso contrário).
+
+    Returns:
+        bool: True se a partição foi criada.
+    """
+    nome = nome_particao(tabela, inicio)
+    cursor.execute('SELECT to_regclass(%s)', [nome])
+    if cursor.fetchone()[0]:
+        return False
+
+    fim = inicio_do_mes(inicio, 1)
+    padrao = f'{tabela}_default'
+
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(
+            f'CREATE TABLE "{nome}" (LIKE "{tabela}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute('SELECT to_regclass(%s)', [padrao])
+        if cursor.fetchone()[0]:
+            cursor.execute(f"""
+                WITH movidas AS (
+                    DELETE FROM "{padrao}" WHERE data_hora >= %s AND data_hora < %s RETURNING *
+                )
+                INSERT INTO "{nome}" SELECT * FROM movidas
+            """, [inicio, fim])
+        cursor.execute(
+            f'ALTER TABLE "{tabela}" ATTACH PARTITION "{nome}" '
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')"
+        )
+    return True
+
+
+def criar_particao_padrao(cursor, tabela=TABELA_SINAIS_VITAIS):
+    """Cria a partição DEFAULT, que recebe leituras sem partição mensal correspondente"""
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{tabela}_default" PARTITION OF "{tabela}" DEFAULT')
+
+
+def desanexar_particao(cursor, nome, tabela=TABELA_SINAIS_VITAIS):
+    """
+    Desanexa a partição, mantendo-a como tabela comum (para arquivamento).
+
+    DETACH ... CONCURRENTLY não é permitido quando existe partição DEFAULT,
+    então o comando bloqueia a tabela pai apenas pelo tempo do DETACH.
+    """
+    cursor.execute(f'ALTER TABLE "{tabela}" DETACH PARTITION "{nome}"')
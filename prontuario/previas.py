@@ -0,0 +1,102 @@
+"""
+Prévias (miniaturas) dos arquivos de laudo.
+
+Ao salvar um ResultadoExame com laudo, a prévia é gerada em segundo plano:
+a primeira página do PDF é renderizada (pypdfium2) ou a imagem é reduzida
+(Pillow) para LARGURA_PREVIA pixels e gravada em JPEG ao lado do original
+(nome_derivado). Os cards da timeline exibem a prévia em vez de obrigar o
+download do laudo inteiro.
+
+A renderização roda no pool de processos de prontuario.tarefas: as funções
+de renderização recebem um caminho e devolvem bytes, sem acessar o banco
+(laudos comprimidos são descomprimidos antes em um temporário).
+"""
+import io
+
+import pypdfium2
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import tarefas
+from .armazenamento import armazenamento_laudos, nome_derivado
+
+LARGURA_PREVIA = 480
+
+# Evita prévias muito compridas (ex: laudos em formato de tira)
+ALTURA_MAXIMA_PREVIA = 2 * LARGURA_PREVIA
+
+QUALIDADE_JPEG = 80
+
+SUFIXO_PREVIA = 'previa.jpg'
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png')
+
+
+def _codificar_jpeg(imagem):
+    imagem.thumbnail((LARGURA_PREVIA, ALTURA_MAXIMA_PREVIA))
+    if imagem.mode != 'RGB':
+        imagem = imagem.convert('RGB')
+    saida = io.BytesIO()
+    imagem.save(saida, 'JPEG', quality=QUALIDADE_JPEG, optimize=True)
+    return saida.getvalue()
+
+
+def renderizar_pdf(caminho):
+    """Renderiza a primeira página do PDF como JPEG"""
+    documento = pypdfium2.PdfDocument(caminho)
+    try:
+        pagina = documento[0]
+        escala = LARGURA_PREVIA / pagina.get_width()
+        return _codificar_jpeg(pagina.render(scale=escala).to_pil())
+    finally:
+        documento.close()
+
+
+def renderizar_imagem(caminho):
+    """Reduz a imagem para o tamanho da prévia, como JPEG"""
+    with Image.open(caminho) as imagem:
+        # JPEG: decodifica já reduzido (muito mais rápido em scans grandes)
+        imagem.draft('RGB', (LARGURA_PREVIA, ALTURA_MAXIMA_PREVIA))
+        return _codificar_jpeg(ImageOps.exif_transpose(imagem))
+
+
+def renderizador(nome):
+    """Função de renderização para o tipo do arquivo (None se não houver prévia)"""
+    nome = nome.lower()
+    if nome.endswith('.pdf'):
+        return renderizar_pdf
+    if nome.endswith(EXTENSOES_IMAGEM):
+        return renderizar_imagem
+    return None
+
+
+def gerar_previa(resultado_id, nome):
+    """
+    Gera (ou reaproveita) a prévia do arquivo `nome` e a associa ao resultado.
+
+    A versão da solicitação é atualizada para renovar o card em cache.
+    """
+    from .models import ResultadoExame, SolicitacaoExame
+
+    armazenamento = armazenamento_laudos()
+    nome_previa = nome_derivado(nome, SUFIXO_PREVIA)
+    # Laudos por conteúdo compartilham a prévia entre resultados com o mesmo arquivo
+    if not armazenamento.exists(nome_previa):
+        with armazenamento.caminho_local(nome) as caminho:
+            dados = tarefas.executar_em_processo(renderizador(nome), caminho)
+        armazenamento.salvar_derivado(nome_previa, dados)
+
+    # Só associa se o laudo do resultado ainda for o mesmo
+    if ResultadoExame.objects.filter(pk=resultado_id, arquivo_laudo=nome).update(previa=nome_previa):
+        SolicitacaoExame.objects.filter(resultado__pk=resultado_id).update(data_atualizacao=timezone.now())
+
+
+def agendar_previa(resultado):
+    """Agenda a geração da prévia após o commit da transação atual"""
+    nome = resultado.arquivo_laudo.name
+    if not nome or renderizador(nome) is None:
+        return
+    transaction.on_commit(
+        lambda: tarefas.agendar(f'previa:{resultado.pk}:{nome}', gerar_previa, resultado.pk, nome)
+    )
@@ -0,0 +1,73 @@
+"""
+Signals do prontuário.
+
+Mantêm as referências dos arquivos de laudo (ArquivoLaudo), agendam a
+geração das prévias e a extração do texto dos laudos e refazem o ponteiro
+Atendimento.ultimo_sinal_vital quando o registro apontado é removido.
+"""
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from atendimentos.models import Atendimento
+from .alertas import atualizar_ultimo_sinal_vital
+from .armazenamento import hash_do_nome
+from .previas import agendar_previa
+from .texto_laudos import agendar_extracao, e_pdf
+from .models import ArquivoLaudo, ResultadoExame, SinalVital
+
+
+def _ajustar_referencias(nome, variacao, tamanho=None):
+    """Soma `variacao` às referências do arquivo (apenas arquivos por conteúdo)"""
+    if not hash_do_nome(nome):
+        return
+    if tamanho is not None:
+        ArquivoLaudo.objects.get_or_create(nome=nome, defaults={'tamanho': tamanho})
+    ArquivoLaudo.objects.filter(nome=nome).update(
+        referencias=F('referencias') + variacao,
+        atualizado_em=timezone.now()
+    )
+
+
+@receiver(pre_save, sender=ResultadoExame)
+def resultado_exame_salvando(sender, instance, **kwargs):
+    # Arquivo referenciado antes desta gravação
+    instance._laudo_anterior = ResultadoExame.objects.filter(
+        pk=instance.pk
+    ).values_list('arquivo_laudo', flat=True).first() if instance.pk else None
+    if (instance._laudo_anterior or '') != (instance.arquivo_laudo.name or ''):
+        # A prévia e o texto do arquivo anterior não valem mais; os novos são gerados após salvar
+        instance.previa = ''
+        instance.texto_laudo = ''
+        instance.extraido_em = None
+        instance.status_extracao = 'PENDENTE' if e_pdf(instance.arquivo_laudo.name) else 'NAO_APLICAVEL'
+
+
+@receiver(post_save, sender=ResultadoExame)
+def resultado_exame_salvo(sender, instance, **kwargs):
+    anterior = getattr(instance, '_laudo_anterior', None) or ''
+    atual = instance.arquivo_laudo.name or ''
+    if anterior == atual:
+        return
+    if atual:
+        _ajustar_referencias(atual, 1, tamanho=instance.arquivo_laudo.size)
+        agendar_previa(instance)
+        agendar_extracao(instance)
+    if anterior:
+        _ajustar_referencias(anterior, -1)
+
+
+@receiver(post_delete, sender=ResultadoExame)
+def resultado_exame_removido(sender, instance, **kwargs):
+    if instance.arquivo_laudo.name:
+        _ajustar_referencias(instance.arquivo_laudo.name, -1)
+
+
+@receiver(post_delete, sender=SinalVital)
+def sinal_vital_removido(sender, instance, **kwargs):
+    # O SET_NULL de ultimo_sinal_vital já limpou o ponteiro se era este o registro:
+    # aponta para o registro anterior que restou
+    atualizar_ultimo_sinal_vital(
+        Atendimento.objects.filter(pk=instance.atendimento_id, ultimo_sinal_vital__isnull=True)
+    )
@@ -0,0 +1,90 @@
+"""
+Execução de tarefas em segundo plano no próprio processo web.
+
+Um ThreadPoolExecutor compartilhado (TAREFAS_WORKERS threads) executa
+tarefas longas fora do ciclo da requisição. Uma tarefa é identificada por
+uma chave: enquanto ela estiver na fila ou em execução, novos agendamentos
+com a mesma chave são ignorados.
+
+O estado das tarefas é por processo; o resultado deve ser persistido pela
+própria tarefa (arquivo, banco) para ser visto pelos demais workers.
+
+Trabalho pesado de CPU (renderizar PDFs, redimensionar imagens) vai para um
+pool de processos (TAREFAS_PROCESSOS) com executar_em_processo: a função
+deve estar no nível do módulo, não acessar o banco e receber/retornar
+valores simples (são serializados entre os processos).
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_processos = None
+_em_andamento = {}
+_trava = threading.Lock()
+
+
+def _obter_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TAREFAS_WORKERS', 2),
+            thread_name_prefix='tarefas'
+        )
+    return _executor
+
+
+def _obter_processos():
+    global _processos
+    with _trava:
+        if _processos is None:
+            _processos = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'TAREFAS_PROCESSOS', 2),
+                # spawn: os processos não herdam conexões nem threads do processo web
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _processos
+
+
+def executar_em_processo(funcao, *args):
+    """Executa `funcao(*args)` no pool de processos e aguarda o resultado"""
+    return _obter_processos().submit(funcao, *args).result()
+
+
+def agendar(chave, funcao, *args, **kwargs):
+    """
+    Agenda `funcao(*args, **kwargs)` em segundo plano.
+
+    Returns:
+        bool: False se já existe tarefa com a mesma chave pendente.
+    """
+    with _trava:
+        if chave in _em_andamento:
+            return False
+        _em_andamento[chave] = _obter_executor().submit(_executar, chave, funcao, args, kwargs)
+        return True
+
+
+def em_andamento(chave):
+    """Indica se a tarefa da chave está na fila ou em execução neste processo"""
+    with _trava:
+        return chave in _em_andamento
+
+
+def _executar(chave, funcao, args, kwargs):
+    try:
+        return funcao(*args, **kwargs)
+    except Exception:
+        logger.exception('Falha na tarefa em segundo plano %s', chave)
+        raise
+    finally:
+        # Cada thread abre a própria conexão com o banco; fecha ao terminar
+        connections.close_all()
+        with _trava:
+            _em_andamento.pop(chave, None)
@@ -0,0 +1,177 @@
+"""
+Tempo de liberação de exames (TAT: solicitação -> resultado).
+
+Os tempos são consolidados na tabela TempoExameConsolidado por dia e hora
+da solicitação, tipo e nome do exame, com quantidade, soma, mediana, p90 e
+um histograma em faixas fixas. Os relatórios leem apenas essa tabela: a
+média de um período é exata (soma / quantidade) e os percentis do período
+são estimados somando os histogramas, já que percentis não se combinam.
+
+O processamento é incremental: a cada execução são refeitos apenas os dias
+de solicitação que receberam resultados depois do último resultado já
+consolidado.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ResultadoExame, TempoExameConsolidado
+
+
+# Limites superiores (em minutos) das faixas do histograma; a última faixa é aberta
+FAIXAS_MINUTOS = [
+    15, 30, 45, 60, 90, 120, 180, 240, 360, 480, 720, 960,
+    1440, 2160, 2880, 4320, 7200, 10080,
+]
+
+# Resultados gravados por transações concluídas fora de ordem ainda entram na
+# execução seguinte: a marca incremental recua essa margem
+MARGEM_REPROCESSAMENTO = timedelta(minutes=10)
+
+TAMANHO_LOTE_INSERCAO = 1000
+
+# Períodos (em dias) e agrupamentos disponíveis no relatório
+PERIODO_CHOICES = [(7, 'Últimos 7 dias'), (30, 'Últimos 30 dias'), (90, 'Últimos 90 dias'), (365, 'Último ano')]
+AGRUPAMENTO_CHOICES = [
+    ('tipo', 'Tipo de exame'),
+    ('nome_exame', 'Exame'),
+    ('hora', 'Hora da solicitação'),
+    ('dia', 'Dia'),
+]
+
+
+def dias_alterados(desde=None, completo=False):
+    """
+    Dias (locais) de solicitação com resultados registrados após `desde`.
+
+    Sem `desde`, usa a marca do último resultado consolidado (ou todos os dias,
+    na primeira execução). Com `completo`, retorna todos os dias com resultados.
+    """
+    if desde is None and not completo:
+        ultimo = TempoExameConsolidado.objects.aggregate(ultimo=Max('ultimo_resultado'))['ultimo']
+        desde = ultimo - MARGEM_REPROCESSAMENTO if ultimo else None
+
+    resultados = ResultadoExame.objects.all()
+    if desde is not None:
+        resultados = resultados.filter(data_resultado__gt=desde)
+
+    return sorted({
+        timezone.localtime(data).date()
+        for data in resultados.values_list('solicitacao__data_solicitacao', flat=True).distinct()
+    })
+
+
+def consolidar_dias(dias):
+    """
+    Recalcula as linhas consolidadas dos dias informados.
+
+    Returns:
+        int: quantidade de linhas gravadas.
+    """
+    if not dias:
+        return 0
+
+    tempos = ResultadoExame.objects.filter(
+        solicitacao__data_solicitacao__date__in=dias
+    ).values_list(
+        'solicitacao__data_solicitacao',
+        'data_resultado',
+        'solicitacao__tipo',
+        'solicitacao__nome_exame',
+    )
+
+    grupos = {}
+    for solicitado, liberado, tipo, nome_exame in tempos.iterator(chunk_size=5000):
+        solicitado = timezone.localtime(solicitado)
+        chave = (solicitado.date(), solicitado.hour, tipo, nome_exame.strip())
+        grupos.setdefault(chave, ([], []))
+        grupos[chave][0].append((liberado - solicitado).total_seconds() / 60)
+        grupos[chave][1].append(liberado)
+
+    linhas = []
+    for (dia, hora, tipo, nome_exame), (minutos, liberacoes) in grupos.items():
+        minutos = np.maximum(np.array(minutos), 0)
+        p50, p90 = np.percentile(minutos, [50, 90])
+        linhas.append(TempoExameConsolidado(
+            dia=dia,
+            hora=hora,
+            tipo=tipo,
+            nome_exame=nome_exame,
+            quantidade=len(minutos),
+            soma_minutos=float(minutos.sum()),
+            p50_minutos=float(p50),
+            p90_minutos=float(p90),
+            histograma=histograma(minutos),
+            ultimo_resultado=max(liberacoes),
+        ))
+
+    with transaction.atomic():
+        TempoExameConsolidado.objects.filter(dia__in=dias).delete()
+        TempoExameConsolidado.objects.bulk_create(linhas, batch_size=TAMANHO_LOTE_INSERCAO)
+
+    return len(linhas)
+
+
+def histograma(minutos):
+    """Contagem dos tempos por faixa de FAIXAS_MINUTOS (última faixa aberta)"""
+    indices = np.searchsorted(FAIXAS_MINUTOS, minutos, side='right')
+    return np.bincount(indices, minlength=len(FAIXAS_MINUTOS) + 1).tolist()
+
+
+def percentil_histograma(contagens, percentil):
+    """Estima o percentil interpolando linearmente dentro da faixa que o contém"""
+    contagens = np.asarray(contagens, dtype=np.float64)
+    total = contagens.sum()
+    if not total:
+        return None
+
+    alvo = total * percentil / 100
+    acumulado = np.cumsum(contagens)
+    faixa = int(np.searchsorted(acumulado, alvo))
+
+    inicio = FAIXAS_MINUTOS[faixa - 1] if faixa else 0
+    if faixa == len(FAIXAS_MINUTOS):
+        # Faixa aberta: não há limite superior para interpolar
+        return float(inicio)
+    anteriores = acumulado[faixa - 1] if faixa else 0
+    fracao = (alvo - anteriores) / contagens[faixa]
+    return float(inicio + fracao * (FAIXAS_MINUTOS[faixa] - inicio))
+
+
+def resumir_tempos(linhas, chave=None):
+    """
+    Combina linhas consolidadas agrupando por `chave`.
+
+    Args:
+        linhas: iterável de dicionários com quantidade, soma_minutos, histograma
+            e o campo de agrupamento.
+        chave (str): campo de agrupamento ('tipo', 'nome_exame', 'hora' ou 'dia');
+            sem chave, todas as linhas formam um único grupo.
+
+    Returns:
+        list: dicionários {valor, quantidade, media, p50, p90}, em ordem de valor.
+    """
+    grupos = {}
+    for linha in linhas:
+        grupo = grupos.setdefault(linha[chave] if chave else None, {
+            'quantidade': 0,
+            'soma': 0.0,
+            'histograma': np.zeros(len(FAIXAS_MINUTOS) + 1, dtype=np.int64),
+        })
+        grupo['quantidade'] += linha['quantidade']
+        grupo['soma'] += linha['soma_minutos']
+        grupo['histograma'] += linha['histograma']
+
+    return [
+        {
+            'valor': valor,
+            'quantidade': grupo['quantidade'],
+            'media': grupo['soma'] / grupo['quantidade'],
+            'p50': percentil_histograma(grupo['histograma'], 50),
+            'p90': percentil_histograma(grupo['histograma'], 90),
+        }
+        for valor, grupo in sorted(grupos.items(), key=lambda item: item[0])
+    ]
@@ -0,0 +1,141 @@
+"""
+Séries temporais de sinais vitais para gráficos de tendência.
+
+As leituras são reduzidas no servidor com LTTB (Largest-Triangle-Three-Buckets),
+que preserva a forma visual da curva (picos e vales) com um número fixo de
+pontos, independentemente de quantos registros de SinalVital existam.
+"""
+import numpy as np
+
+from .models import SinalVital
+
+
+PARAMETROS_SERIE = {
+    'pa': {
+        'label': 'Pressão Arterial',
+        'unidade': 'mmHg',
+        'campos': [
+            ('pressao_arterial_sistolica', 'Sistólica'),
+            ('pressao_arterial_diastolica', 'Diastólica'),
+        ],
+    },
+    'fc': {
+        'label': 'Frequência Cardíaca',
+        'unidade': 'bpm',
+        'campos': [('frequencia_cardiaca', 'Frequência Cardíaca')],
+    },
+    'fr': {
+        'label': 'Frequência Respiratória',
+        'unidade': 'irpm',
+        'campos': [('frequencia_respiratoria', 'Frequência Respiratória')],
+    },
+    'temperatura': {
+        'label': 'Temperatura',
+        'unidade': '°C',
+        'campos': [('temperatura', 'Temperatura')],
+    },
+    'spo2': {
+        'label': 'Saturação de O₂',
+        'unidade': '%',
+        'campos': [('saturacao_o2', 'Saturação de O₂')],
+    },
+    'glicemia': {
+        'label': 'Glicemia',
+        'unidade': 'mg/dL',
+        'campos': [('glicemia', 'Glicemia')],
+    },
+}
+
+PONTOS_PADRAO = 300
+PONTOS_MAXIMO = 2000
+
+
+def lttb(x, y, limite):
+    """
+    Retorna os índices dos pontos selecionados pelo LTTB.
+
+    x deve estar em ordem crescente. O primeiro e o último ponto são sempre
+    mantidos; os demais são divididos em `limite - 2` buckets e, em cada um,
+    escolhe-se o ponto que forma o maior triângulo com o ponto escolhido no
+    bucket anterior e a média do bucket seguinte.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    total = len(x)
+
+    if limite >= total or limite < 3:
+        return np.arange(total)
+
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = total - 1
+
+    # Limites dos buckets dos pontos internos (1 .. total - 2)
+    bordas = np.linspace(1, total - 1, limite - 1).astype(np.int64)
+
+    anterior = 0
+    for bucket in range(limite - 2):
+        inicio, fim = bordas[bucket], bordas[bucket + 1]
+
+        # Média do próximo bucket (o último ponto faz o papel do bucket final)
+        if bucket + 2 < len(bordas):
+            proximo = slice(bordas[bucket + 1], bordas[bucket + 2])
+        else:
+            proximo = slice(total - 1, total)
+        media_x = x[proximo].mean()
+        media_y = y[proximo].mean()
+
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[bucket + 1] = anterior
+
+    return indices
+
+
+def serie_sinal_vital(atendimento_id, parametro, pontos=PONTOS_PADRAO, inicio=None, fim=None):
+    """
+    Monta a série reduzida de um parâmetro para o atendimento e janela de tempo.
+
+    Os pontos são retornados como [timestamp_ms, valor] para consumo direto
+    por bibliotecas de gráficos.
+    """
+    config = PARAMETROS_SERIE[parametro]
+    series = []
+    total_leituras = 0
+
+    for campo, label in config['campos']:
+        leituras = SinalVital.objects.filter(
+            atendimento_id=atendimento_id,
+            **{f'{campo}__isnull': False}
+        )
+        if inicio:
+            leituras = leituras.filter(data_hora__gte=inicio)
+        if fim:
+            leituras = leituras.filter(data_hora__lte=fim)
+
+        linhas = list(leituras.order_by('data_hora', 'pk').values_list('data_hora', campo))
+        total_leituras = max(total_leituras, len(linhas))
+
+        tempos = np.fromiter((data.timestamp() * 1000 for data, _ in linhas), dtype=np.float64, count=len(linhas))
+        valores = np.fromiter((float(valor) for _, valor in linhas), dtype=np.float64, count=len(linhas))
+        selecionados = lttb(tempos, valores, pontos)
+
+        series.append({
+            'campo': campo,
+            'label': label,
+            'pontos': [[int(tempos[i]), valores[i].item()] for i in selecionados],
+        })
+
+    return {
+        'atendimento': atendimento_id,
+        'parametro': parametro,
+        'label': config['label'],
+        'unidade': config['unidade'],
+        'total_leituras': total_leituras,
+        'inicio': inicio.isoformat() if inicio else None,
+        'fim': fim.isoformat() if fim else None,
+        'series': series,
+    }
@@ -1,3 +1,793 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from atendimentos.models import Atendimento
+from pacientes.models import Paciente
+from usuarios.models import Profissional
+from .alergias import VerificadorAlergias, extrair_termos
+from .alertas import BITS_ALERTA, CAMPOS_ALERTA, calcular_alertas, calcular_alertas_em_lote
+from .armazenamento import PREFIXO_CONTEUDO, SUFIXO_ZSTD, armazenamento_laudos
+from .dispositivos import criar_dispositivo
+from .fila_exames import fila_exames, marcar_coletados, pagina_fila
+from .forms import ItemPrescricaoForm
+from .ingestao import validar_leituras
+from .laudos import IntervaloInvalido, aceita_zstd, intervalo_da_requisicao
+from .models import (
+    ArquivoLaudo, Evolucao, Prescricao, ResultadoExame, SinalVital, SolicitacaoExame, UploadLaudo,
+)
+from .news2 import CAMPOS_NEWS2, pontuar_news2
+from .tempos_exames import histograma, percentil_histograma, resumir_tempos
+from .tendencias import lttb
+from .timeline import codificar_cursor, decodificar_cursor, iterar_eventos, pagina_eventos
+from .uploads import ValidadorUploadLaudo, validar_conteudo
+
+
+class LTTBTestCase(SimpleTestCase):
+    """Testes para a redução de séries temporais com LTTB"""
+
+    def test_serie_menor_que_limite_retorna_todos_os_pontos(self):
+        """Séries curtas não devem ser reduzidas"""
+        indices = lttb(np.arange(10), np.arange(10), 50)
+        self.assertEqual(list(indices), list(range(10)))
+
+    def test_reduz_para_quantidade_solicitada_mantendo_extremidades(self):
+        """Deve retornar exatamente `limite` índices crescentes, incluindo o primeiro e o último"""
+        x = np.arange(10000)
+        y = np.sin(x / 100.0)
+        indices = lttb(x, y, 200)
+
+        self.assertEqual(len(indices), 200)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9999)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_preserva_pico_isolado(self):
+        """Um pico isolado deve sobreviver à redução"""
+        x = np.arange(5000)
+        y = np.full(5000, 80.0)
+        y[2500] = 180.0
+        indices = lttb(x, y, 50)
+
+        self.assertIn(2500, indices)
+
+
+class AlertasSinaisVitaisTestCase(SimpleTestCase):
+    """Testes para o cálculo do bitmask de alertas"""
+
+    def test_calculo_individual(self):
+        """Valores fora dos limites ativam os bits correspondentes; ausentes são ignorados"""
+        sinal = SimpleNamespace(
+            pressao_arterial_sistolica=None,
+            pressao_arterial_diastolica=None,
+            frequencia_cardiaca=130,
+            temperatura=38.2,
+            saturacao_o2=None,
+        )
+        self.assertEqual(calcular_alertas(sinal), BITS_ALERTA['TAQUICARDIA'] | BITS_ALERTA['FEBRE'])
+
+    def test_lote_equivale_ao_calculo_individual(self):
+        """A versão vetorizada deve produzir as mesmas máscaras do cálculo por objeto"""
+        registros = [
+            {'pressao_arterial_sistolica': 150, 'pressao_arterial_diastolica': 95, 'frequencia_cardiaca': 55,
+             'temperatura': 35.5, 'saturacao_o2': 90},
+            {'pressao_arterial_sistolica': 120, 'pressao_arterial_diastolica': 80, 'frequencia_cardiaca': 80,
+             'temperatura': 36.5, 'saturacao_o2': 98},
+            {'pressao_arterial_sistolica': None, 'pressao_arterial_diastolica': None, 'frequencia_cardiaca': None,
+             'temperatura': None, 'saturacao_o2': 0},
+        ]
+        colunas = {
+            campo: np.array([np.nan if r[campo] is None else r[campo] for r in registros], dtype=np.float64)
+            for campo in CAMPOS_ALERTA
+        }
+        mascaras, totais = calcular_alertas_em_lote(colunas)
+
+        esperado = [calcular_alertas(SimpleNamespace(**r)) for r in registros]
+        self.assertEqual(list(mascaras), esperado)
+        self.assertEqual(list(totais), [5, 0, 0])
+
+
+class NEWS2TestCase(SimpleTestCase):
+    """Testes para a pontuação vetorizada do NEWS2"""
+
+    def test_pontuacao_e_risco(self):
+        """Cada linha deve receber subescores, total e faixa de risco conforme a tabela NEWS2"""
+        colunas = {
+            'frequencia_respiratoria': np.array([16, 26, np.nan, 22]),
+            'saturacao_o2': np.array([98, 90, np.nan, 95]),
+            'pressao_arterial_sistolica': np.array([120, 95, np.nan, 105]),
+            'frequencia_cardiaca': np.array([70, 120, 135, 95]),
+            'temperatura': np.array([36.5, 39.5, np.nan, 38.1]),
+        }
+        resultado = pontuar_news2(colunas)
+
+        self.assertEqual(list(resultado['total']), [0, 12, 3, 6])
+        self.assertEqual(list(resultado['risco']), ['BAIXO', 'ALTO', 'BAIXO_MEDIO', 'MEDIO'])
+        self.assertEqual(list(resultado['parametros_ausentes']), [0, 0, 4, 0])
+
+    def test_zero_nao_aferido_como_nos_alertas(self):
+        """Zero é um parâmetro não aferido, como em calcular_alertas, e não um valor crítico"""
+        colunas = {campo: np.array([0.0, np.nan]) for campo in CAMPOS_NEWS2}
+        colunas['frequencia_cardiaca'] = np.array([0.0, 80.0])
+        resultado = pontuar_news2(colunas)
+
+        self.assertEqual(list(resultado['total']), [0, 0])
+        self.assertEqual(list(resultado['parametros_ausentes']), [5, 4])
+        self.assertEqual(list(resultado['risco']), ['BAIXO', 'BAIXO'])
+
+        sinal = SimpleNamespace(**{campo: 0 for campo in CAMPOS_ALERTA})
+        self.assertEqual(calcular_alertas(sinal), 0)
+
+
+class AlergiasTestCase(SimpleTestCase):
+    """Testes para a verificação de conflitos entre alergias e medicamentos"""
+
+    def test_extrai_termos_do_texto_livre(self):
+        """Prefixos, reações entre parênteses e negações devem ser descartados"""
+        termos = extrair_termos('Alergia a Penicilina (urticária); AINEs e dipirona. Nega outras')
+        self.assertEqual(termos, ['penicilina', 'aines', 'dipirona'])
+        self.assertEqual(extrair_termos('Nega alergias'), [])
+
+    def test_conflitos_por_classe_e_sinonimo(self):
+        """Medicamentos da classe ou sinônimos do termo alérgico devem ser apontados"""
+        verificador = VerificadorAlergias('Penicilina, AINEs, Dipirona')
+
+        self.assertEqual(
+            verificador.conflitos('Amoxicilina + Clavulanato 875mg'),
+            [{'trecho': 'amoxicilina', 'alergia': 'penicilina'}]
+        )
+        self.assertEqual(verificador.conflitos('Ibuprofeno 600mg')[0]['alergia'], 'aines')
+        self.assertEqual(verificador.conflitos('Metamizol sódico')[0]['alergia'], 'dipirona')
+        self.assertEqual(verificador.conflitos('Paracetamol 750mg'), [])
+        self.assertFalse(VerificadorAlergias(''))
+
+
+class TemposExamesTestCase(SimpleTestCase):
+    """Testes para o histograma e os percentis dos tempos de liberação"""
+
+    def test_percentis_estimados_pelo_histograma(self):
+        """Percentis estimados devem ficar próximos dos exatos"""
+        minutos = np.random.default_rng(7).lognormal(4, 1, 5000)
+        contagens = histograma(minutos)
+
+        self.assertEqual(sum(contagens), 5000)
+        for percentil in (50, 90):
+            exato = np.percentile(minutos, percentil)
+            self.assertLess(abs(percentil_histograma(contagens, percentil) - exato) / exato, 0.15)
+
+    def test_combina_linhas_consolidadas(self):
+        """A média do grupo é exata (soma / quantidade) e os histogramas são somados"""
+        linhas = [
+            {'tipo': 'IMAGEM', 'quantidade': 2, 'soma_minutos': 60.0, 'histograma': histograma([20, 40])},
+            {'tipo': 'IMAGEM', 'quantidade': 1, 'soma_minutos': 90.0, 'histograma': histograma([90])},
+            {'tipo': 'LABORATORIO', 'quantidade': 1, 'soma_minutos': 10.0, 'histograma': histograma([10])},
+        ]
+        resumo = resumir_tempos(linhas, 'tipo')
+
+        self.assertEqual([grupo['valor'] for grupo in resumo], ['IMAGEM', 'LABORATORIO'])
+        self.assertEqual(resumo[0]['quantidade'], 3)
+        self.assertEqual(resumo[0]['media'], 50.0)
+        self.assertEqual(resumir_tempos(linhas)[0]['quantidade'], 4)
+
+
+class IntervaloLaudoTestCase(SimpleTestCase):
+    """Testes para a interpretação do cabeçalho Range dos laudos"""
+
+    def test_formatos_de_intervalo(self):
+        self.assertEqual(intervalo_da_requisicao('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(intervalo_da_requisicao('bytes=900-', 1000), (900, 999))
+        self.assertEqual(intervalo_da_requisicao('bytes=-100', 1000), (900, 999))
+        self.assertEqual(intervalo_da_requisicao('bytes=500-5000', 1000), (500, 999))
+
+    def test_envia_arquivo_inteiro_ou_rejeita(self):
+        self.assertIsNone(intervalo_da_requisicao(None, 1000))
+        self.assertIsNone(intervalo_da_requisicao('bytes=0-1,5-9', 1000))
+        self.assertIsNone(intervalo_da_requisicao('itens=0-1', 1000))
+        with self.assertRaises(IntervaloInvalido):
+            intervalo_da_requisicao('bytes=1000-', 1000)
+
+
+class CodificacaoLaudoTestCase(SimpleTestCase):
+    """Testes para a negociação do envio dos laudos comprimidos"""
+
+    def aceita(self, cabecalho):
+        return aceita_zstd(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=cabecalho))
+
+    def test_aceita_zstd(self):
+        self.assertTrue(self.aceita('gzip, deflate, br, zstd'))
+        self.assertTrue(self.aceita('zstd;q=0.5'))
+        self.assertFalse(self.aceita('gzip, br'))
+        self.assertFalse(self.aceita('zstd;q=0, gzip'))
+        self.assertFalse(self.aceita(''))
+
+
+class ConteudoLaudoTestCase(SimpleTestCase):
+    """Testes para a conferência do conteúdo dos laudos enviados"""
+
+    def validar(self, nome, dados):
+        validar_conteudo(nome, BytesIO(dados), len(dados))
+
+    def test_aceita_tipos_conhecidos(self):
+        self.validar('laudo.pdf', b'%PDF-1.7\n' + b'x' * 2000 + b'%%EOF\n')
+        self.validar('raio-x.JPG', b'\xff\xd8\xff\xe0' + b'x' * 100)
+        self.validar('raio-x.png', b'\x89PNG\r\n\x1a\n' + b'x' * 100)
+
+    def test_rejeita_tipo_trocado_ou_pdf_truncado(self):
+        with self.assertRaises(ValidationError):
+            self.validar('laudo.pdf', b'\x89PNG\r\n\x1a\n%%EOF')
+        with self.assertRaises(ValidationError):
+            self.validar('raio-x.jpg', b'MZ\x90\x00')
+        with self.assertRaises(ValidationError):
+            self.validar('laudo.pdf', b'%PDF-1.7\n' + b'x' * 2000)
+
+
+class AtendimentoTestCase(TestCase):
+    """Base dos testes com banco: profissional logado e um atendimento"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='medico', password='pass123')
+        self.profissional = Profissional.objects.create(user=self.user, perfil='MEDICO')
+        self.paciente = Paciente.objects.create(
+            nome='Maria Souza',
+            cpf='12345678901',
+            data_nascimento=date(1980, 5, 15),
+            alergias='Penicilina'
+        )
+        self.atendimento = Atendimento.objects.create(
+            paciente=self.paciente,
+            profissional_responsavel=self.profissional,
+            queixa='Dor torácica',
+            status='EM_ATENDIMENTO'
+        )
+        self.client.login(username='medico', password='pass123')
+
+
+class IngestaoSinaisVitaisTestCase(AtendimentoTestCase):
+    """Testes para a ingestão em lote de sinais vitais"""
+
+    def enviar(self, leituras, **extra):
+        return self.client.post(
+            reverse('ingestao_sinais_vitais'), {'leituras': leituras}, content_type='application/json', **extra
+        )
+
+    def test_aceita_leituras_validas(self):
+        resposta = self.enviar([
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 130, 'temperatura': 38.5,
+             'data_hora': '2026-01-01T10:00:00'},
+            {'atendimento': self.atendimento.pk, 'saturacao_o2': '97', 'observacoes': 'Monitor 3',
+             'data_hora': '2026-01-01T11:00:00'},
+        ])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json(), {'recebidas': 2, 'inseridas': 2, 'rejeitadas': []})
+
+        primeiro = SinalVital.objects.order_by('data_hora').first()
+        self.assertEqual(str(primeiro.temperatura), '38.5')
+        self.assertEqual(primeiro.total_alertas, 2)
+        self.atendimento.refresh_from_db()
+        self.assertEqual(self.atendimento.ultimo_sinal_vital.observacoes, 'Monitor 3')
+
+    def test_rejeicoes_por_linha(self):
+        leituras = [
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 80},
+            'texto',
+            {'atendimento': 'abc', 'frequencia_cardiaca': 80},
+            {'atendimento': 10 ** 30, 'frequencia_cardiaca': 80},
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 80, 'data_hora': '2026-02-30T10:00:00'},
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 80, 'data_hora': '2026-13-45T10:00:00'},
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 'nan'},
+            {'atendimento': self.atendimento.pk, 'temperatura': 'inf'},
+            {'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 400},
+            {'atendimento': self.atendimento.pk, 'temperatura': 36.55},
+            {'atendimento': self.atendimento.pk, 'pressao_arterial_sistolica': 120},
+            {'atendimento': self.atendimento.pk},
+            {'atendimento': self.atendimento.pk + 1000, 'frequencia_cardiaca': 80},
+        ]
+        validos, _, _, _, rejeitados = validar_leituras(leituras)
+        self.assertEqual(validos, [0])
+        erros = {rejeicao['indice']: rejeicao['erros'] for rejeicao in rejeitados}
+        self.assertEqual(list(erros), list(range(1, len(leituras))))
+        self.assertEqual(erros[3], ['Atendimento inválido.'])
+        self.assertEqual(erros[4], ['Data/hora inválida.'])
+        self.assertEqual(erros[5], ['Data/hora inválida.'])
+        self.assertEqual(erros[6], ['frequencia_cardiaca: valor numérico inválido.'])
+        self.assertEqual(erros[12], ['Atendimento não encontrado.'])
+
+        resposta = self.enviar(leituras)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['inseridas'], 1)
+        self.assertEqual(SinalVital.objects.count(), 1)
+
+    def test_autenticacao_por_token(self):
+        leituras = [{'atendimento': self.atendimento.pk, 'frequencia_cardiaca': 80}]
+        self.client.logout()
+        self.assertEqual(self.enviar(leituras).status_code, 401)
+        self.assertEqual(self.enviar(leituras, HTTP_AUTHORIZATION='Token invalido').status_code, 401)
+
+        dispositivo, token = criar_dispositivo('Monitor leito 1', self.profissional)
+        resposta = self.enviar(leituras, HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(SinalVital.objects.get().profissional, self.profissional)
+
+        dispositivo.ativo = False
+        dispositivo.save()
+        self.assertEqual(self.enviar(leituras, HTTP_AUTHORIZATION=f'Token {token}').status_code, 401)
+
+
+class TimelineCursorTestCase(AtendimentoTestCase):
+    """Testes para a paginação por cursor da timeline do prontuário"""
+
+    def setUp(self):
+        super().setUp()
+        instante = timezone.now() - timedelta(hours=1)
+        # Evoluções e sinais vitais no mesmo instante: o desempate é por tipo e id
+        for i in range(3):
+            evolucao = Evolucao.objects.create(
+                atendimento=self.atendimento, profissional=self.profissional, tipo='ANAMNESE', descricao=f'Evolução {i}'
+            )
+            sinal = SinalVital.objects.create(
+                atendimento=self.atendimento, profissional=self.profissional, frequencia_cardiaca=80 + i
+            )
+        Evolucao.objects.update(data_hora=instante)
+        SinalVital.objects.exclude(pk=sinal.pk).update(data_hora=instante)
+        SinalVital.objects.filter(pk=sinal.pk).update(data_hora=instante - timedelta(minutes=5))
+
+    def paginas(self, limite):
+        eventos, cursor = pagina_eventos(limite=limite, atendimento_id=self.atendimento.pk)
+        paginas = [eventos]
+        while cursor:
+            eventos, cursor = pagina_eventos(cursor=cursor, limite=limite, atendimento_id=self.atendimento.pk)
+            paginas.append(eventos)
+        return paginas
+
+    def test_cursor_codificado_e_decodificado(self):
+        evento = pagina_eventos(limite=1, atendimento_id=self.atendimento.pk)[0][0]
+        data, indice_tipo, pk = decodificar_cursor(codificar_cursor(evento))
+        self.assertEqual(data, evento['data'])
+        self.assertEqual((indice_tipo, pk), (1, evento['objeto'].pk))
+
+        for cursor in ('lixo', '2026-01-01T10:00:00|evolucao', '2026-02-30T10:00:00|evolucao|1',
+                       '2026-01-01T10:00:00|consulta|1', '2026-01-01T10:00:00|evolucao|x'):
+            with self.assertRaises(ValueError):
+                decodificar_cursor(cursor)
+
+    def test_paginas_sem_repeticoes_nem_lacunas(self):
+        todos = [(evento['tipo'], evento['objeto'].pk) for evento in self.paginas(limite=100)[0]]
+        self.assertEqual(len(todos), 6)
+        self.assertEqual([tipo for tipo, _ in todos], ['sinal_vital'] * 2 + ['evolucao'] * 3 + ['sinal_vital'])
+
+        for limite in (1, 2, 4, 5):
+            paginas = self.paginas(limite)
+            self.assertEqual([(evento['tipo'], evento['objeto'].pk) for pagina in paginas for evento in pagina], todos)
+            self.assertTrue(all(len(pagina) == limite for pagina in paginas[:-1]))
+
+        # Página exatamente cheia não indica próxima página
+        self.assertEqual(len(self.paginas(limite=6)), 1)
+
+    def test_view_eventos(self):
+        url = reverse('prontuario_eventos', args=[self.atendimento.pk])
+        _, cursor = pagina_eventos(limite=4, atendimento_id=self.atendimento.pk)
+        resposta = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.context['eventos']), 2)
+        self.assertIsNone(resposta.context['proximo_cursor'])
+        self.assertEqual(self.client.get(url, {'cursor': 'lixo'}).status_code, 400)
+
+
+class TimelinePacienteTestCase(AtendimentoTestCase):
+    """Testes para a timeline longitudinal do paciente (intercalação dos tipos em streaming)"""
+
+    def setUp(self):
+        super().setUp()
+        anterior = Atendimento.objects.create(
+            paciente=self.paciente,
+            profissional_responsavel=self.profissional,
+            queixa='Febre',
+            status='ALTA'
+        )
+        agora = timezone.now()
+
+        def evolucao(atendimento, descricao, horas):
+            objeto = Evolucao.objects.create(
+                atendimento=atendimento, profissional=self.profissional, tipo='ANAMNESE', descricao=descricao
+            )
+            Evolucao.objects.filter(pk=objeto.pk).update(data_hora=agora - timedelta(hours=horas))
+
+        def sinal_vital(atendimento, horas):
+            objeto = SinalVital.objects.create(
+                atendimento=atendimento, profissional=self.profissional, frequencia_cardiaca=80
+            )
+            SinalVital.objects.filter(pk=objeto.pk).update(data_hora=agora - timedelta(hours=horas))
+
+        # Solicitado há 5 horas, mas ordenado pela data do resultado (30 minutos)
+        exame = SolicitacaoExame.objects.create(
+            atendimento=self.atendimento, profissional=self.profissional, tipo='LABORATORIO',
+            nome_exame='Troponina', justificativa='Dor torácica'
+        )
+        SolicitacaoExame.objects.filter(pk=exame.pk).update(data_solicitacao=agora - timedelta(hours=5))
+        ResultadoExame.objects.create(solicitacao=exame, resultado_texto='Negativa')
+        ResultadoExame.objects.filter(solicitacao=exame).update(data_resultado=agora - timedelta(minutes=30))
+
+        evolucao(self.atendimento, 'Reavaliação', 1)
+        sinal_vital(self.atendimento, 2)
+        prescricao = Prescricao.objects.create(
+            atendimento=self.atendimento, profissional=self.profissional, validade=agora.date() + timedelta(days=1)
+        )
+        Prescricao.objects.filter(pk=prescricao.pk).update(data_prescricao=agora - timedelta(hours=3))
+        evolucao(anterior, 'Alta com antitérmico', 30)
+        sinal_vital(anterior, 40)
+        evolucao(anterior, 'Febre há dois dias', 48)
+
+    def test_intercala_tipos_em_ordem_decrescente(self):
+        esperado = ['exame', 'evolucao', 'sinal_vital', 'prescricao', 'evolucao', 'sinal_vital', 'evolucao']
+        for tamanho_lote in (1, 200):
+            eventos = list(iterar_eventos(tamanho_lote=tamanho_lote, atendimento__paciente_id=self.paciente.pk))
+            self.assertEqual([evento['tipo'] for evento in eventos], esperado)
+            self.assertEqual([evento['data'] for evento in eventos], sorted([e['data'] for e in eventos], reverse=True))
+
+        eventos = iterar_eventos(['evolucao'], atendimento__paciente_id=self.paciente.pk)
+        self.assertEqual(
+            [evento['objeto'].descricao for evento in eventos],
+            ['Reavaliação', 'Alta com antitérmico', 'Febre há dois dias']
+        )
+
+    def test_view_em_streaming(self):
+        resposta = self.client.get(reverse('timeline_paciente', args=[self.paciente.pk]))
+        self.assertTrue(resposta.streaming)
+        html = b''.join(resposta.streaming_content).decode()
+        self.assertEqual(html.count('Atendimento de '), 2)
+        posicoes = [html.index(texto) for texto in ('Troponina', 'Reavaliação', 'Alta com antitérmico', 'Febre há dois dias')]
+        self.assertEqual(posicoes, sorted(posicoes))
+
+
+class FilaExamesTestCase(AtendimentoTestCase):
+    """Testes para a fila departamental de exames"""
+
+    def setUp(self):
+        super().setUp()
+        instante = timezone.now() - timedelta(hours=2)
+        self.solicitacoes = [
+            SolicitacaoExame.objects.create(
+                atendimento=self.atendimento, profissional=self.profissional, tipo='LABORATORIO',
+                nome_exame=f'Exame {i}', justificativa='Rotina'
+            )
+            for i in range(6)
+        ]
+        # Quatro solicitações no mesmo instante: o desempate do cursor é pelo id
+        SolicitacaoExame.objects.filter(pk__in=[s.pk for s in self.solicitacoes[1:5]]).update(data_solicitacao=instante)
+        SolicitacaoExame.objects.filter(pk=self.solicitacoes[0].pk).update(
+            data_solicitacao=instante - timedelta(hours=1)
+        )
+        SolicitacaoExame.objects.filter(pk=self.solicitacoes[5].pk).update(status='CANCELADO')
+
+    def test_paginas_por_cursor(self):
+        esperado = [s.pk for s in self.solicitacoes[:5]]
+        self.assertEqual([s.pk for s in fila_exames()], esperado)
+
+        for limite in (1, 2, 3, 5):
+            vistos = []
+            itens, cursor = pagina_fila(fila_exames(), limite=limite)
+            vistos += [s.pk for s in itens]
+            while cursor:
+                itens, cursor = pagina_fila(fila_exames(), cursor=cursor, limite=limite)
+                vistos += [s.pk for s in itens]
+            self.assertEqual(vistos, esperado)
+
+        resposta = self.client.get(reverse('fila_exames'), {'cursor': 'lixo'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_marcar_coletados_em_um_update(self):
+        SolicitacaoExame.objects.filter(pk=self.solicitacoes[0].pk).update(status='COLETADO')
+        ids = [s.pk for s in self.solicitacoes]
+        antes = dict(SolicitacaoExame.objects.values_list('pk', 'data_atualizacao'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(marcar_coletados(ids), 4)
+
+        status = dict(SolicitacaoExame.objects.values_list('pk', 'status'))
+        self.assertEqual([status[pk] for pk in ids], ['COLETADO'] * 5 + ['CANCELADO'])
+        atualizadas = SolicitacaoExame.objects.filter(pk__in=ids[1:5])
+        self.assertTrue(all(s.data_atualizacao > antes[s.pk] for s in atualizadas))
+
+        resposta = self.client.post(
+            reverse('marcar_exames_coletados'), {'solicitacoes': [ids[0]], 'query_filtros': 'tipo=IMAGEM'}
+        )
+        self.assertRedirects(resposta, reverse('fila_exames') + '?tipo=IMAGEM', fetch_redirect_response=False)
+
+    def test_atualizacoes_desde(self):
+        url = reverse('fila_exames_atualizacoes')
+        # 'desde' sem fuso é lido no horário local
+        desde = (timezone.localtime() - timedelta(minutes=1)).strftime('%Y-%m-%dT%H:%M:%S')
+        resposta = self.client.get(url, {'desde': desde})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.json()['abertos']), 5)
+        self.assertEqual(resposta.json()['encerrados'], [self.solicitacoes[5].pk])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class LaudosTestCase(AtendimentoTestCase):
+    """Base dos testes de laudos: MEDIA_ROOT e VAR_ROOT em diretórios temporários"""
+
+    def setUp(self):
+        super().setUp()
+        diretorios = {'MEDIA_ROOT': tempfile.mkdtemp(), 'VAR_ROOT': tempfile.mkdtemp()}
+        for diretorio in diretorios.values():
+            self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = override_settings(**diretorios)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.armazenamento = armazenamento_laudos()
+
+    def solicitar_exame(self, nome_exame='Raio-X de tórax'):
+        return SolicitacaoExame.objects.create(
+            atendimento=self.atendimento, profissional=self.profissional, tipo='IMAGEM',
+            nome_exame=nome_exame, justificativa='Dor torácica'
+        )
+
+    def registrar_resultado(self, nome_arquivo, dados, solicitacao=None):
+        resultado = ResultadoExame(solicitacao=solicitacao or self.solicitar_exame(), resultado_texto='Sem alterações')
+        resultado.arquivo_laudo.save(nome_arquivo, ContentFile(dados), save=False)
+        resultado.save()
+        return resultado
+
+    def arquivos_gravados(self):
+        diretorio = self.armazenamento.path(PREFIXO_CONTEUDO)
+        return sorted(nome for _, _, nomes in os.walk(diretorio) for nome in nomes)
+
+
+class ArmazenamentoPorConteudoTestCase(LaudosTestCase):
+    """Testes para o armazenamento de laudos por conteúdo e a coleta dos órfãos"""
+
+    PNG = b'\x89PNG\r\n\x1a\n' + b'imagem' * 100
+
+    def envelhecer(self, horas):
+        """Recua a data dos registros e dos arquivos gravados em `horas`"""
+        passado = timezone.now() - timedelta(hours=horas)
+        ArquivoLaudo.objects.update(atualizado_em=passado)
+        for raiz, _, nomes in os.walk(self.armazenamento.path(PREFIXO_CONTEUDO)):
+            for nome in nomes:
+                os.utime(os.path.join(raiz, nome), (passado.timestamp(), passado.timestamp()))
+
+    def coletar(self):
+        saida = StringIO()
+        call_command('coletar_laudos_orfaos', stdout=saida)
+        return saida.getvalue()
+
+    def test_conteudo_duplicado_incrementa_referencias(self):
+        primeiro = self.registrar_resultado('raio-x.png', self.PNG)
+        segundo = self.registrar_resultado('OUTRO-NOME.PNG', self.PNG)
+        self.assertEqual(primeiro.arquivo_laudo.name, segundo.arquivo_laudo.name)
+        self.assertRegex(primeiro.arquivo_laudo.name, r'^laudos/sha256/../../[0-9a-f]{64}\.png$')
+        self.assertEqual(len(self.arquivos_gravados()), 1)
+
+        arquivo = ArquivoLaudo.objects.get()
+        self.assertEqual((arquivo.referencias, arquivo.tamanho), (2, len(self.PNG)))
+
+        segundo.delete()
+        arquivo.refresh_from_db()
+        self.assertEqual(arquivo.referencias, 1)
+
+    def test_coleta_respeita_carencia(self):
+        referenciado = self.registrar_resultado('raio-x.png', self.PNG)
+        orfao = self.registrar_resultado('outro.png', self.PNG + b'diferente')
+        orfao.delete()
+        self.assertEqual(len(self.arquivos_gravados()), 2)
+
+        # Sem referências, mas dentro da carência de 24 horas
+        self.envelhecer(horas=23)
+        self.assertIn('Removidos: 0 arquivo(s)', self.coletar())
+        self.assertEqual(len(self.arquivos_gravados()), 2)
+
+        self.envelhecer(horas=25)
+        self.assertIn('Removidos: 1 arquivo(s)', self.coletar())
+        self.assertEqual(self.arquivos_gravados(), [os.path.basename(referenciado.arquivo_laudo.name)])
+        self.assertEqual(list(ArquivoLaudo.objects.values_list('nome', flat=True)), [referenciado.arquivo_laudo.name])
+
+
+class UploadEmPartesTestCase(LaudosTestCase):
+    """Testes para o upload retomável de laudos em partes"""
+
+    PDF = b'%PDF-1.4\n' + b'laudo' * 20000 + b'\n%%EOF\n'
+
+    def setUp(self):
+        super().setUp()
+        self.solicitacao = self.solicitar_exame()
+
+    def iniciar(self, nome='tomografia.pdf', tamanho=len(PDF)):
+        resposta = self.client.post(
+            reverse('iniciar_upload_laudo', args=[self.solicitacao.pk]), {'nome': nome, 'tamanho': tamanho}
+        )
+        self.assertEqual(resposta.status_code, 201)
+        return resposta.json()
+
+    def enviar_parte(self, url, deslocamento, dados):
+        return self.client.patch(
+            url, dados, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(deslocamento)
+        )
+
+    def test_parte_fora_do_deslocamento(self):
+        url = self.iniciar()['url']
+        self.assertEqual(self.enviar_parte(url, 0, self.PDF[:40000]).json()['recebido'], 40000)
+
+        # Reenvio da mesma parte: 409 com o total já recebido, para o cliente retomar
+        resposta = self.enviar_parte(url, 0, self.PDF[:40000])
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['recebido'], 40000)
+        self.assertEqual(self.enviar_parte(url, 50000, self.PDF[50000:]).status_code, 409)
+
+        resposta = self.enviar_parte(url, 40000, self.PDF[40000:])
+        self.assertEqual(resposta.json()['recebido'], len(self.PDF))
+        self.assertEqual(self.client.get(url).json()['recebido'], len(self.PDF))
+
+    def test_primeira_parte_com_assinatura_de_outro_tipo(self):
+        url = self.iniciar(tamanho=100)['url']
+        resposta = self.enviar_parte(url, 0, b'GIF89a' + b'x' * 94)
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('PDF', resposta.json()['erro'])
+        self.assertEqual(self.client.get(url).json()['recebido'], 0)
+
+    def test_conclusao_confere_sha256(self):
+        envio = self.iniciar()
+        self.enviar_parte(envio['url'], 0, self.PDF)
+        resposta = self.client.post(envio['url'] + 'concluir/', {'sha256': hashlib.sha256(b'outro').hexdigest()})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('hash', resposta.json()['erro'])
+        self.assertFalse(UploadLaudo.objects.exists())
+
+        envio = self.iniciar()
+        self.enviar_parte(envio['url'], 0, self.PDF)
+        resposta = self.client.post(envio['url'] + 'concluir/', {'sha256': hashlib.sha256(self.PDF).hexdigest()})
+        self.assertEqual(resposta.status_code, 200)
+        upload = UploadLaudo.objects.get()
+        self.assertTrue(upload.concluido)
+        with self.armazenamento.open(upload.arquivo) as arquivo:
+            self.assertEqual(arquivo.read(), self.PDF)
+
+
+@override_settings(LAUDOS_COMPRIMIR=True)
+class CompressaoLaudosTestCase(LaudosTestCase):
+    """Testes para a compressão zstd transparente dos laudos gravados"""
+
+    PDF = b'%PDF-1.4\n' + b'Hemograma completo: valores de referencia\n' * 500 + b'%%EOF\n'
+
+    def test_leitura_do_laudo_comprimido(self):
+        nome = self.registrar_resultado('hemograma.pdf', self.PDF).arquivo_laudo.name
+        self.assertTrue(self.armazenamento.comprimido(nome))
+        self.assertTrue(os.path.exists(self.armazenamento.path(nome + SUFIXO_ZSTD)))
+        self.assertFalse(os.path.exists(self.armazenamento.path(nome)))
+        self.assertLess(os.path.getsize(self.armazenamento.path(nome + SUFIXO_ZSTD)), len(self.PDF))
+
+        self.assertTrue(self.armazenamento.exists(nome))
+        self.assertEqual(self.armazenamento.size(nome), len(self.PDF))
+        with self.armazenamento.open(nome) as arquivo:
+            self.assertEqual(arquivo.size, len(self.PDF))
+            self.assertEqual(arquivo.read(), self.PDF)
+
+        with self.armazenamento.caminho_local(nome) as caminho:
+            with open(caminho, 'rb') as arquivo:
+                self.assertEqual(arquivo.read(), self.PDF)
+        self.assertFalse(os.path.exists(caminho))
+
+    def test_imagens_nao_sao_comprimidas(self):
+        png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 5000
+        nome = self.registrar_resultado('raio-x.png', png).arquivo_laudo.name
+        self.assertFalse(self.armazenamento.comprimido(nome))
+        with self.armazenamento.caminho_local(nome) as caminho:
+            self.assertEqual(caminho, self.armazenamento.path(nome))
+        self.assertEqual(self.armazenamento.size(nome), len(png))
+
+
+class ValidadorUploadLaudoTestCase(LaudosTestCase):
+    """Testes para a validação do laudo durante a leitura do corpo do envio"""
+
+    def validador(self, nome_arquivo, tamanho_maximo=1000):
+        request = RequestFactory().post('/')
+        validador = ValidadorUploadLaudo(request, 'arquivo_laudo', tamanho_maximo)
+        validador.new_file('arquivo_laudo', nome_arquivo, 'application/octet-stream', None)
+        return validador, request
+
+    def test_rejeita_assinatura_de_outro_tipo(self):
+        validador, request = self.validador('laudo.pdf')
+        with self.assertRaises(SkipFile):
+            validador.receive_data_chunk(b'\x89PNG\r\n\x1a\n' + b'x' * 100, 0)
+        self.assertIn('não é um PDF', request.erros_upload['arquivo_laudo'])
+
+        validador, _ = self.validador('laudo.pdf')
+        self.assertEqual(validador.receive_data_chunk(b'%PDF-1.4\n', 0), b'%PDF-1.4\n')
+
+    def test_rejeita_arquivo_acima_do_limite(self):
+        validador, request = self.validador('laudo.pdf', tamanho_maximo=1024 * 1024)
+        bloco = b'x' * (512 * 1024)
+        validador.receive_data_chunk(b'%PDF-1.4\n' + bloco[9:], 0)
+        validador.receive_data_chunk(bloco, len(bloco))
+        with self.assertRaises(SkipFile):
+            validador.receive_data_chunk(b'x', 2 * len(bloco))
+        self.assertIn('exceder 1MB', request.erros_upload['arquivo_laudo'])
+
+    def test_ignora_outros_campos(self):
+        validador, request = self.validador('laudo.pdf')
+        validador.new_file('anexo', 'planilha.exe', 'application/octet-stream', None)
+        self.assertEqual(validador.receive_data_chunk(b'MZ' * 1000, 0), b'MZ' * 1000)
+        self.assertEqual(request.erros_upload, {})
+
+    def test_formulario_descarta_laudo_invalido(self):
+        solicitacao = self.solicitar_exame()
+        url = reverse('adicionar_resultado_exame', args=[solicitacao.pk])
+        resposta = self.client.post(url, {
+            'resultado_texto': 'Sem alterações',
+            'arquivo_laudo': SimpleUploadedFile('laudo.pdf', b'\x89PNG\r\n\x1a\n' + b'x' * 1000),
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('não é um PDF', resposta.context['form'].errors['arquivo_laudo'][0])
+        self.assertFalse(ResultadoExame.objects.exists())
+        self.assertEqual(self.arquivos_gravados(), [])
+
+
+class VersaoCardsTestCase(AtendimentoTestCase):
+    """Testes para a versão usada na chave do cache dos cards da timeline"""
+
+    def test_resultado_removido_atualiza_solicitacao(self):
+        solicitacao = SolicitacaoExame.objects.create(
+            atendimento=self.atendimento, profissional=self.profissional, tipo='LABORATORIO',
+            nome_exame='Hemograma', justificativa='Rotina'
+        )
+        resultado = ResultadoExame.objects.create(solicitacao=solicitacao, resultado_texto='Normal')
+        solicitacao.refresh_from_db()
+        versao = solicitacao.data_atualizacao
+
+        resultado.delete()
+        solicitacao.refresh_from_db()
+        self.assertGreater(solicitacao.data_atualizacao, versao)
+
+
+class ConfirmacaoAlergiaTestCase(AtendimentoTestCase):
+    """Testes para a confirmação de medicamentos que conflitam com as alergias"""
+
+    def formulario(self, medicamento, **dados):
+        return ItemPrescricaoForm(
+            {'medicamento': medicamento, 'dose': '1 comprimido', 'via': 'ORAL', 'frequencia': '8/8h',
+             'duracao_dias': 7, **dados},
+            verificador_alergias=VerificadorAlergias('Penicilina, Dipirona'),
+            profissional=self.profissional
+        )
+
+    def test_confirmacao_vale_apenas_para_o_conflito_exibido(self):
+        formulario = self.formulario('Amoxicilina 500mg')
+        self.assertFalse(formulario.is_valid())
+        conflito = formulario['conflito_confirmado'].value()
+        self.assertEqual(conflito, 'amoxicilina (alergia: penicilina)')
+
+        # Confirmado o conflito exibido, mas o medicamento foi trocado por outro que também conflita
+        formulario = self.formulario('Dipirona 1g', ciente_alergia='on', conflito_confirmado=conflito)
+        self.assertFalse(formulario.is_valid())
+        self.assertIn('dipirona (alergia: dipirona)', formulario.errors['medicamento'][0])
+        self.assertEqual(formulario['conflito_confirmado'].value(), 'dipirona (alergia: dipirona)')
+        self.assertFalse(formulario['ciente_alergia'].value())
+
+        self.assertFalse(self.formulario('Amoxicilina 500mg', ciente_alergia='on').is_valid())
+
+        formulario = self.formulario('Amoxicilina 500mg', ciente_alergia='on', conflito_confirmado=conflito)
+        self.assertTrue(formulario.is_valid())
+        item = formulario.save(commit=False)
+        self.assertEqual(item.conflito_alergia, conflito)
+        self.assertEqual(item.alergia_confirmada_por, self.profissional)
+        self.assertIsNotNone(item.alergia_confirmada_em)
+
+    def test_medicamento_sem_conflito(self):
+        formulario = self.formulario('Paracetamol 750mg')
+        self.assertTrue(formulario.is_valid())
+        self.assertEqual(formulario.save(commit=False).conflito_alergia, '')
@@ -0,0 +1,100 @@
+"""
+Extração do texto dos laudos em PDF para a busca.
+
+O texto é extraído com pypdfium2 no pool de processos de prontuario.tarefas
+e gravado em ResultadoExame.texto_laudo, com a situação da extração em
+status_extracao. Novos laudos são extraídos após salvar o resultado (signal);
+os existentes, pelo comando extrair_texto_laudos.
+
+No PostgreSQL, texto_laudo tem índice GIN de texto completo (configuração
+'portuguese', migração 0018); filtrar_por_texto_laudo usa a mesma expressão do
+índice. Nos demais bancos a busca usa icontains.
+"""
+import pypdfium2
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import tarefas
+
+CONFIGURACAO_BUSCA = 'portuguese'
+
+# Limite do texto guardado por laudo (o tsvector do PostgreSQL tem limite de 1MB)
+MAXIMO_CARACTERES = 200_000
+
+
+def e_pdf(nome):
+    return (nome or '').lower().endswith('.pdf')
+
+
+def extrair_texto_pdf(caminho):
+    """Extrai o texto de todas as páginas do PDF (executado no pool de processos)"""
+    documento = pypdfium2.PdfDocument(caminho)
+    partes = []
+    tamanho = 0
+    try:
+        for pagina in documento:
+            texto_pagina = pagina.get_textpage()
+            texto = texto_pagina.get_text_bounded()
+            texto_pagina.close()
+            pagina.close()
+            partes.append(texto)
+            tamanho += len(texto)
+            if tamanho >= MAXIMO_CARACTERES:
+                break
+    finally:
+        documento.close()
+    # O PostgreSQL não aceita NUL em colunas de texto
+    return '\n'.join(partes)[:MAXIMO_CARACTERES].replace('\x00', '').strip()
+
+
+def situacao_extracao(texto):
+    """Status da extração para o texto obtido (PDFs digitalizados não têm texto)"""
+    return 'EXTRAIDO' if texto else 'SEM_TEXTO'
+
+
+def registrar_extracao(resultado_id, nome, texto=None, erro=False):
+    """Grava o texto (ou o erro) se o laudo do resultado ainda for `nome`"""
+    from .models import ResultadoExame
+
+    campos = {'status_extracao': 'ERRO', 'extraido_em': timezone.now()}
+    if not erro:
+        campos.update(texto_laudo=texto, status_extracao=situacao_extracao(texto))
+    return ResultadoExame.objects.filter(pk=resultado_id, arquivo_laudo=nome).update(**campos)
+
+
+def extrair_texto_resultado(resultado_id, nome):
+    """Extrai e grava o texto do laudo de um resultado (tarefa em segundo plano)"""
+    from .models import ResultadoExame
+
+    armazenamento = ResultadoExame._meta.get_field('arquivo_laudo').storage
+    try:
+        with armazenamento.caminho_local(nome) as caminho:
+            texto = tarefas.executar_em_processo(extrair_texto_pdf, caminho)
+    except Exception:
+        registrar_extracao(resultado_id, nome, erro=True)
+        raise
+    registrar_extracao(resultado_id, nome, texto)
+
+
+def agendar_extracao(resultado):
+    """Agenda a extração do texto do laudo após o commit da transação atual"""
+    nome = resultado.arquivo_laudo.name
+    if not e_pdf(nome):
+        return
+    transaction.on_commit(
+        lambda: tarefas.agendar(f'texto:{resultado.pk}:{nome}', extrair_texto_resultado, resultado.pk, nome)
+    )
+
+
+def vetor_busca():
+    """Expressão indexada do texto do laudo (deve coincidir com o índice GIN)"""
+    return SearchVector('texto_laudo', config=CONFIGURACAO_BUSCA)
+
+
+def filtrar_por_texto_laudo(queryset, termo):
+    """Filtra os resultados cujo texto do laudo contenha o termo"""
+    if connection.vendor == 'postgresql':
+        consulta = SearchQuery(termo, config=CONFIGURACAO_BUSCA, search_type='websearch')
+        return queryset.annotate(busca_laudo=vetor_busca()).filter(busca_laudo=consulta)
+    return queryset.filter(texto_laudo__icontains=termo)
@@ -0,0 +1,188 @@
+"""
+Montagem da timeline cronológica unificada do prontuário.
+
+Os eventos (evoluções, sinais vitais, prescrições e exames) são buscados
+por tipo, já ordenados pelo banco, e intercalados em memória. A paginação
+usa cursor (data do evento, tipo, id) em vez de OFFSET, de modo que cada
+página custa o mesmo independentemente da profundidade da timeline.
+"""
+import heapq
+
+from django.db.models import F, Prefetch, Q
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .models import Evolucao, ItemPrescricao, SinalVital, Prescricao, SolicitacaoExame
+
+
+# Ordem dos tipos também define o desempate entre eventos com a mesma data
+TIPOS_EVENTO = ['evolucao', 'sinal_vital', 'prescricao', 'exame']
+
+TIPOS_EVENTO_LABELS = {
+    'evolucao': 'Evoluções',
+    'sinal_vital': 'Sinais Vitais',
+    'prescricao': 'Prescrições',
+    'exame': 'Exames',
+}
+
+ESTILOS_EVENTO = {
+    'evolucao': {
+        'icone': 'M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z',
+        'cor_borda': 'blue',
+    },
+    'sinal_vital': {
+        'icone': 'M4.318 6.318a4.5 4.5 0 000 6.364L12 20.364l7.682-7.682a4.5 4.5 0 00-6.364-6.364L12 7.636l-1.318-1.318a4.5 4.5 0 00-6.364 0z',
+        'cor_borda': 'purple',
+    },
+    'prescricao': {
+        'icone': 'M9 5H7a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2V7a2 2 0 00-2-2h-2M9 5a2 2 0 002 2h2a2 2 0 002-2M9 5a2 2 0 012-2h2a2 2 0 012 2',
+        'cor_borda': 'indigo',
+    },
+    'exame': {
+        'icone': 'M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z',
+        'cor_borda': 'orange',
+    },
+}
+
+# Quantidade de eventos renderizados por página/fragmento
+EVENTOS_POR_PAGINA = 50
+
+# Linhas lidas do banco por vez em cada fluxo da timeline em streaming
+TAMANHO_LOTE_STREAMING = 200
+
+
+def querysets_eventos(tipos=None, **filtros):
+    """
+    Retorna um dicionário tipo -> queryset com a anotação `data_evento`,
+    ordenado do evento mais recente para o mais antigo.
+
+    Os filtros nomeados são aplicados a todos os tipos (ex: atendimento_id=1).
+    """
+    tipos = tipos or TIPOS_EVENTO
+    querysets = {}
+
+    if 'evolucao' in tipos:
+        querysets['evolucao'] = Evolucao.objects.filter(**filtros).select_related(
+            'profissional__user'
+        ).annotate(data_evento=F('data_hora'))
+
+    if 'sinal_vital' in tipos:
+        querysets['sinal_vital'] = SinalVital.objects.filter(**filtros).select_related(
+            'profissional__user'
+        ).annotate(data_evento=F('data_hora'))
+
+    if 'prescricao' in tipos:
+        querysets['prescricao'] = Prescricao.objects.filter(**filtros).select_related(
+            'profissional__user'
+        ).prefetch_related(
+            Prefetch('itens', queryset=ItemPrescricao.objects.select_related('alergia_confirmada_por__user'))
+        ).annotate(data_evento=F('data_prescricao'))
+
+    if 'exame' in tipos:
+        # Usa data do resultado se disponível, senão usa data de solicitação
+        querysets['exame'] = SolicitacaoExame.objects.filter(**filtros).select_related(
+            'profissional__user',
+            'resultado'
+        ).annotate(data_evento=Coalesce('resultado__data_resultado', 'data_solicitacao'))
+
+    return {
+        tipo: queryset.order_by('-data_evento', '-pk')
+        for tipo, queryset in querysets.items()
+    }
+
+
+def montar_evento(tipo, objeto):
+    """Monta o dicionário de evento consumido pelos templates da timeline"""
+    return {
+        'tipo': tipo,
+        'data': objeto.data_evento,
+        'objeto': objeto,
+        **ESTILOS_EVENTO[tipo],
+    }
+
+
+def chave_evento(evento):
+    """Chave de ordenação total dos eventos: (data, tipo, id)"""
+    return (evento['data'], TIPOS_EVENTO.index(evento['tipo']), evento['objeto'].pk)
+
+
+def codificar_cursor(evento):
+    """Serializa a posição de um evento para uso na query string"""
+    return f"{evento['data'].isoformat()}|{evento['tipo']}|{evento['objeto'].pk}"
+
+
+def decodificar_cursor(cursor):
+    """Converte o cursor da query string em (data, índice do tipo, id)"""
+    try:
+        data_iso, tipo, pk = cursor.split('|')
+        data = parse_datetime(data_iso)
+        if data is None or tipo not in TIPOS_EVENTO:
+            raise ValueError
+        return data, TIPOS_EVENTO.index(tipo), int(pk)
+    except ValueError:
+        raise ValueError(f'Cursor inválido: {cursor}')
+
+
+def _filtrar_apos_cursor(queryset, tipo, cursor):
+    """Restringe o queryset aos eventos posteriores ao cursor na ordem decrescente"""
+    data, indice_cursor, pk = cursor
+    indice = TIPOS_EVENTO.index(tipo)
+
+    if indice < indice_cursor:
+        return queryset.filter(data_evento__lte=data)
+    if indice > indice_cursor:
+        return queryset.filter(data_evento__lt=data)
+    return queryset.filter(Q(data_evento__lt=data) | Q(data_evento=data, pk__lt=pk))
+
+
+def pagina_eventos(tipos=None, cursor=None, limite=EVENTOS_POR_PAGINA, **filtros):
+    """
+    Retorna (eventos, proximo_cursor) com até `limite` eventos após o cursor.
+
+    Cada tipo busca no máximo `limite + 1` linhas; o registro excedente
+    indica se existe uma próxima página.
+    """
+    posicao = decodificar_cursor(cursor) if cursor else None
+
+    fluxos = []
+    for tipo, queryset in querysets_eventos(tipos, **filtros).items():
+        if posicao:
+            queryset = _filtrar_apos_cursor(queryset, tipo, posicao)
+        fluxos.append([montar_evento(tipo, objeto) for objeto in queryset[:limite + 1]])
+
+    eventos = list(heapq.merge(*fluxos, key=chave_evento, reverse=True))[:limite + 1]
+
+    proximo_cursor = None
+    if len(eventos) > limite:
+        eventos = eventos[:limite]
+        proximo_cursor = codificar_cursor(eventos[-1])
+
+    return eventos, proximo_cursor
+
+
+def iterar_eventos(tipos=None, tamanho_lote=TAMANHO_LOTE_STREAMING, **filtros):
+    """
+    Gera todos os eventos (mais recente primeiro) sem carregá-los de uma vez.
+
+    Cada tipo é lido por um cursor do banco em lotes de `tamanho_lote`
+    e os fluxos já ordenados são intercalados com heapq.merge (k-way merge),
+    de modo que a memória fica limitada a k lotes independentemente do
+    tamanho do histórico.
+    """
+    fluxos = [
+        _fluxo_eventos(tipo, queryset, tamanho_lote)
+        for tipo, queryset in querysets_eventos(tipos, **filtros).items()
+    ]
+    return heapq.merge(*fluxos, key=chave_evento, reverse=True)
+
+
+def _fluxo_eventos(tipo, queryset, tamanho_lote):
+    """Lê um tipo de evento do banco em lotes, na ordem da timeline"""
+    for objeto in queryset.iterator(chunk_size=tamanho_lote):
+        yield montar_evento(tipo, objeto)
+
+
+def tipos_da_requisicao(request):
+    """Extrai os tipos de evento selecionados (?tipo=...) ignorando valores inválidos"""
+    tipos = [tipo for tipo in request.GET.getlist('tipo') if tipo in TIPOS_EVENTO]
+    return tipos or list(TIPOS_EVENTO)
@@ -0,0 +1,278 @@
+"""
+Upload retomável, em partes, dos arquivos de laudo.
+
+Protocolo (views em prontuario.views):
+    1. POST exame/<id>/laudo/upload/ com nome e tamanho: cria o envio.
+    2. PATCH exame/laudo/upload/<uuid>/ com o cabeçalho Upload-Offset e o
+       corpo bruto da parte; a parte só é aceita se Upload-Offset for igual
+       ao total já recebido (senão 409 com o total atual). GET no mesmo
+       endereço informa o total recebido para retomar após uma falha.
+    3. POST exame/laudo/upload/<uuid>/concluir/ com o SHA-256 do arquivo:
+       grava o arquivo montado no armazenamento de laudos.
+O resultado é registrado pelo formulário normal com o campo upload_laudo.
+
+As partes são copiadas do corpo da requisição direto para o arquivo parcial
+em blocos; nenhuma parte fica inteira na memória do worker.
+
+O envio direto pelo formulário passa por ValidadorUploadLaudo, que confere
+a assinatura (magic bytes) e o tamanho enquanto o corpo é lido e descarta o
+arquivo inválido antes de ele ser recebido por inteiro.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import transaction
+from django.utils import timezone
+
+from .armazenamento import armazenamento_laudos, hash_do_nome
+from .models import UploadLaudo
+
+EXTENSOES_LAUDO = ['.pdf', '.jpg', '.jpeg', '.png']
+
+# Tipo e assinatura (primeiros bytes) esperados para cada extensão
+ASSINATURAS_LAUDO = {
+    '.pdf': ('PDF', b'%PDF-'),
+    '.jpg': ('JPEG', b'\xff\xd8\xff'),
+    '.jpeg': ('JPEG', b'\xff\xd8\xff'),
+    '.png': ('PNG', b'\x89PNG\r\n\x1a\n'),
+}
+TAMANHO_ASSINATURA = 8
+
+# Um PDF completo termina com %%EOF (tolerando lixo nos últimos bytes)
+MARCADOR_FIM_PDF = b'%%EOF'
+TAMANHO_CAUDA_PDF = 1024
+
+# Limite do envio direto pelo formulário (arquivos maiores vão em partes)
+TAMANHO_MAXIMO_FORMULARIO = 10 * 1024 * 1024
+
+# Maior parte aceita por requisição
+TAMANHO_MAXIMO_PARTE = 8 * 1024 * 1024
+
+TAMANHO_BLOCO = 64 * 1024
+
+# Envios sem atividade por mais tempo são descartados (coletar_laudos_orfaos)
+EXPIRACAO_UPLOAD = timedelta(hours=24)
+
+
+class DeslocamentoInvalido(Exception):
+    """Upload-Offset diferente do total já recebido"""
+
+    def __init__(self, recebido):
+        super().__init__(f'Deslocamento esperado: {recebido}')
+        self.recebido = recebido
+
+
+def validar_extensao(nome_arquivo):
+    if not any(nome_arquivo.lower().endswith(extensao) for extensao in EXTENSOES_LAUDO):
+        raise ValidationError('Apenas arquivos PDF e imagens (JPG, PNG) são permitidos.')
+
+
+def validar_assinatura(nome_arquivo, cabecalho):
+    """Confere os primeiros bytes do arquivo com o tipo indicado pela extensão"""
+    tipo, assinatura = ASSINATURAS_LAUDO[os.path.splitext(nome_arquivo.lower())[1]]
+    if not cabecalho.startswith(assinatura):
+        raise ValidationError(f'O conteúdo do arquivo não é um {tipo} válido.')
+
+
+def validar_conteudo(nome_arquivo, arquivo, tamanho):
+    """
+    Confere a assinatura e, nos PDFs, o marcador de fim de um arquivo recebido.
+
+    Raises:
+        ValidationError: conteúdo de outro tipo ou PDF truncado.
+    """
+    arquivo.seek(0)
+    validar_assinatura(nome_arquivo, arquivo.read(TAMANHO_ASSINATURA))
+    if nome_arquivo.lower().endswith('.pdf'):
+        arquivo.seek(max(tamanho - TAMANHO_CAUDA_PDF, 0))
+        if MARCADOR_FIM_PDF not in arquivo.read(TAMANHO_CAUDA_PDF):
+            raise ValidationError('O PDF está incompleto ou corrompido; envie o arquivo novamente.')
+    arquivo.seek(0)
+
+
+class ValidadorUploadLaudo(FileUploadHandler):
+    """
+    Handler de upload que valida o laudo enquanto o corpo é lido.
+
+    Deve ficar à frente dos handlers padrão (memória/arquivo temporário):
+    confere a extensão e a assinatura no início do arquivo e o tamanho a cada
+    bloco. Um arquivo inválido é descartado (SkipFile) sem que o restante
+    chegue aos demais handlers; o motivo fica em request.erros_upload.
+    """
+
+    def __init__(self, request, campo, tamanho_maximo):
+        super().__init__(request)
+        self.campo = campo
+        self.tamanho_maximo = tamanho_maximo
+        self.validar = False
+        request.erros_upload = {}
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.validar = field_name == self.campo
+        if self.validar:
+            self._verificar(validar_extensao, file_name)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.validar:
+            return raw_data
+        if start == 0:
+            self._verificar(validar_assinatura, self.file_name, raw_data[:TAMANHO_ASSINATURA])
+        if start + len(raw_data) > self.tamanho_maximo:
+            limite = self.tamanho_maximo // (1024 * 1024)
+            self._rejeitar(f'O arquivo não pode exceder {limite}MB.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        # O arquivo em si é montado pelos handlers seguintes
+        return None
+
+    def _verificar(self, validacao, *args):
+        try:
+            validacao(*args)
+        except ValidationError as erro:
+            self._rejeitar(erro.messages[0])
+
+    def _rejeitar(self, mensagem):
+        self.request.erros_upload[self.campo] = mensagem
+        raise SkipFile(mensagem)
+
+
+def diretorio_uploads():
+    return os.path.join(settings.VAR_ROOT, 'uploads_laudos')
+
+
+def caminho_parcial(upload):
+    return os.path.join(diretorio_uploads(), f'{upload.pk}.part')
+
+
+def iniciar_upload(solicitacao, profissional, nome_arquivo, tamanho):
+    """
+    Cria um envio em partes para a solicitação.
+
+    Raises:
+        ValidationError: extensão não aceita ou tamanho fora do limite.
+    """
+    nome_arquivo = os.path.basename(nome_arquivo or '')
+    validar_extensao(nome_arquivo)
+    if tamanho <= 0 or tamanho > settings.LAUDOS_UPLOAD_TAMANHO_MAXIMO:
+        limite = settings.LAUDOS_UPLOAD_TAMANHO_MAXIMO // (1024 * 1024)
+        raise ValidationError(f'O arquivo deve ter entre 1 byte e {limite}MB.')
+
+    upload = UploadLaudo.objects.create(
+        solicitacao=solicitacao,
+        profissional=profissional,
+        nome_arquivo=nome_arquivo,
+        tamanho=tamanho
+    )
+    os.makedirs(diretorio_uploads(), exist_ok=True)
+    open(caminho_parcial(upload), 'wb').close()
+    return upload
+
+
+def anexar_parte(upload_id, deslocamento, fluxo, tamanho_parte):
+    """
+    Grava a parte lida de `fluxo` a partir de `deslocamento`.
+
+    O registro do envio fica bloqueado durante a gravação, então partes
+    concorrentes do mesmo envio são serializadas.
+
+    Returns:
+        UploadLaudo: envio com o novo total recebido.
+
+    Raises:
+        DeslocamentoInvalido: a parte não começa no total já recebido.
+        ValidationError: parte vazia, grande demais, além do tamanho declarado
+            ou (na primeira parte) com assinatura de outro tipo de arquivo.
+    """
+    with transaction.atomic():
+        upload = UploadLaudo.objects.select_for_update().get(pk=upload_id, arquivo='')
+        if deslocamento != upload.recebido:
+            raise DeslocamentoInvalido(upload.recebido)
+        if tamanho_parte <= 0 or tamanho_parte > TAMANHO_MAXIMO_PARTE:
+            raise ValidationError(f'Cada parte deve ter entre 1 byte e {TAMANHO_MAXIMO_PARTE} bytes.')
+        if upload.recebido + tamanho_parte > upload.tamanho:
+            raise ValidationError('A parte ultrapassa o tamanho declarado do arquivo.')
+
+        gravados = 0
+        with open(caminho_parcial(upload), 'r+b') as arquivo:
+            arquivo.seek(upload.recebido)
+            while gravados < tamanho_parte:
+                bloco = fluxo.read(min(TAMANHO_BLOCO, tamanho_parte - gravados))
+                if not bloco:
+                    break
+                if arquivo.tell() == 0:
+                    # Primeira parte: recusa um arquivo de outro tipo antes de gravar
+                    validar_assinatura(upload.nome_arquivo, bloco)
+                arquivo.write(bloco)
+                gravados += len(bloco)
+            # Descarta restos de uma gravação anterior interrompida
+            arquivo.truncate()
+
+        if gravados != tamanho_parte:
+            raise ValidationError('A parte chegou incompleta; reenvie a partir do deslocamento atual.')
+
+        upload.recebido += gravados
+        upload.save(update_fields=['recebido', 'atualizado_em'])
+        return upload
+
+
+def concluir_upload(upload_id, sha256=''):
+    """
+    Grava o arquivo montado no armazenamento de laudos.
+
+    O hash é calculado pelo próprio armazenamento durante a cópia (uma
+    única leitura) e comparado com o informado pelo cliente.
+
+    Raises:
+        ValidationError: envio incompleto, PDF truncado ou hash diferente do informado.
+    """
+    with transaction.atomic():
+        upload = UploadLaudo.objects.select_for_update().get(pk=upload_id)
+        if upload.concluido:
+            return upload
+        if upload.recebido != upload.tamanho:
+            raise ValidationError(f'Envio incompleto: {upload.recebido} de {upload.tamanho} bytes recebidos.')
+
+        caminho = caminho_parcial(upload)
+        with open(caminho, 'rb') as parcial:
+            validar_conteudo(upload.nome_arquivo, parcial, upload.tamanho)
+            nome = armazenamento_laudos().save(
+                f'laudos/{upload.nome_arquivo}',
+                File(parcial, name=upload.nome_arquivo)
+            )
+
+        confere = not sha256 or hash_do_nome(nome) == sha256.lower()
+        if confere:
+            upload.arquivo = nome
+            upload.save(update_fields=['arquivo', 'atualizado_em'])
+
+    if not confere:
+        # O arquivo gravado fica sem referência e é removido pelo coletor
+        descartar_upload(upload)
+        raise ValidationError('O hash do arquivo recebido não confere; envie o arquivo novamente.')
+    os.remove(caminho)
+    return upload
+
+
+def descartar_upload(upload):
+    """Remove o envio e o arquivo parcial"""
+    try:
+        os.remove(caminho_parcial(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def descartar_uploads_expirados():
+    """Remove envios sem atividade há mais de EXPIRACAO_UPLOAD"""
+    expirados = UploadLaudo.objects.filter(atualizado_em__lt=timezone.now() - EXPIRACAO_UPLOAD)
+    total = 0
+    for upload in expirados.iterator():
+        descartar_upload(upload)
+        total += 1
+    return total
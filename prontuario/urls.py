@@ -9,17 +9,36 @@ urlpatterns = [
     # Sinais Vitais
     path('atendimento/<int:atendimento_id>/sinais-vitais/', views.SinaisVitaisAtendimentoView.as_view(), name='sinais_vitais_atendimento'),
     path('atendimento/<int:atendimento_id>/sinais-vitais/novo/', views.NovoSinalVitalView.as_view(), name='novo_sinal_vital'),
+    path('atendimento/<int:atendimento_id>/sinais-vitais/serie/<str:parametro>/', views.SerieSinalVitalView.as_view(), name='serie_sinal_vital'),
+    path('sinais-vitais/lote/', views.IngestaoSinaisVitaisView.as_view(), name='ingestao_sinais_vitais'),
+    path('sinais-vitais/alertas/', views.AlertasSinaisVitaisView.as_view(), name='alertas_sinais_vitais'),
+    path('sinais-vitais/news2/', views.PacientesDeteriorandoView.as_view(), name='pacientes_deteriorando'),
 
     # Prescrições Médicas
     path('atendimento/<int:atendimento_id>/prescricoes/', views.PrescricoesAtendimentoView.as_view(), name='prescricoes_atendimento'),
     path('atendimento/<int:atendimento_id>/prescricao/nova/', views.NovaPrescricaoView.as_view(), name='nova_prescricao'),
+    path('atendimento/<int:atendimento_id>/medicacoes-ativas/', views.MedicacoesAtivasView.as_view(), name='medicacoes_ativas'),
 
     # Exames
     path('atendimento/<int:atendimento_id>/exames/', views.SolicitacoesExameAtendimentoView.as_view(), name='solicitacoes_exame_atendimento'),
     path('atendimento/<int:atendimento_id>/exame/solicitar/', views.NovaSolicitacaoExameView.as_view(), name='nova_solicitacao_exame'),
     path('exame/<int:solicitacao_id>/resultado/', views.AdicionarResultadoExameView.as_view(), name='adicionar_resultado_exame'),
     path('exame/<int:solicitacao_id>/cancelar/', views.CancelarExameView.as_view(), name='cancelar_exame'),
+    path('exame/<int:solicitacao_id>/laudo/', views.BaixarLaudoView.as_view(), name='baixar_laudo'),
+    path('exame/<int:solicitacao_id>/laudo/previa/', views.PreviaLaudoView.as_view(), name='previa_laudo'),
+    path('exame/<int:solicitacao_id>/laudo/upload/', views.IniciarUploadLaudoView.as_view(), name='iniciar_upload_laudo'),
+    path('exame/laudo/upload/<uuid:upload_id>/', views.UploadLaudoView.as_view(), name='upload_laudo'),
+    path('exame/laudo/upload/<uuid:upload_id>/concluir/', views.ConcluirUploadLaudoView.as_view(), name='concluir_upload_laudo'),
+    path('exames/fila/', views.FilaExamesView.as_view(), name='fila_exames'),
+    path('exames/fila/atualizacoes/', views.FilaExamesAtualizacoesView.as_view(), name='fila_exames_atualizacoes'),
+    path('exames/fila/coletar/', views.MarcarExamesColetadosView.as_view(), name='marcar_exames_coletados'),
+    path('exames/tempos/', views.TemposExamesView.as_view(), name='tempos_exames'),
 
     # Prontuário Completo (Timeline Unificada)
     path('atendimento/<int:atendimento_id>/prontuario/', views.ProntuarioCompletoView.as_view(), name='prontuario_completo'),
+    path('atendimento/<int:atendimento_id>/prontuario/eventos/', views.ProntuarioEventosView.as_view(), name='prontuario_eventos'),
+    path('atendimento/<int:atendimento_id>/prontuario/exportar/', views.ExportarProntuarioView.as_view(), name='exportar_prontuario'),
+
+    # Timeline Longitudinal do Paciente (todos os atendimentos)
+    path('paciente/<int:paciente_id>/timeline/', views.TimelinePacienteView.as_view(), name='timeline_paciente'),
 ]
@@ -1,13 +1,43 @@
+import os
+from datetime import timedelta
+import orjson
 from django.shortcuts import redirect, get_object_or_404, render
+from django.conf import settings
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import FormView, DetailView, View
+from django.views.generic import FormView, DetailView, ListView, View
 from django.urls import reverse
 from django.db import transaction
+from django.db.models import F, Max, OuterRef, Prefetch, Subquery
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from atendimentos.models import Atendimento
+from pacientes.models import Paciente
 from usuarios.models import Profissional
-from .models import Evolucao, SinalVital, Prescricao, SolicitacaoExame, ResultadoExame
+from .models import (
+    Evolucao, SinalVital, Prescricao, ItemPrescricao, SolicitacaoExame, ResultadoExame, PontuacaoNEWS2, TempoExameConsolidado,
+    UploadLaudo,
+)
+from . import dispositivos, exportacao, laudos, uploads
+from .alergias import verificador_do_paciente
+from .alertas import ALERTA_CHOICES, BITS_ALERTA
+from .fila_exames import (
+    IDADE_CHOICES, atualizacoes_desde, fila_exames, filtros_da_requisicao, marcar_coletados, pagina_fila,
+)
+from .ingestao import MAXIMO_LEITURAS_POR_LOTE, ingerir_leituras
+from .medicacoes import medicacoes_ativas
+from .news2 import RISCO_CHOICES
 from .forms import EvolucaoForm, SinalVitalForm, PrescricaoForm, ItemPrescricaoFormSet, SolicitacaoExameForm, ResultadoExameForm
+from .tempos_exames import AGRUPAMENTO_CHOICES, PERIODO_CHOICES, resumir_tempos
+from .tendencias import PARAMETROS_SERIE, PONTOS_MAXIMO, PONTOS_PADRAO, serie_sinal_vital
+from .timeline import TIPOS_EVENTO_LABELS, iterar_eventos, pagina_eventos, tipos_da_requisicao
 
 
 class NovaEvolucaoView(LoginRequiredMixin, FormView):
@@ -162,6 +192,188 @@ class SinaisVitaisAtendimentoView(LoginRequiredMixin, DetailView):
         return context
 
 
+class SerieSinalVitalView(LoginRequiredMixin, View):
+    """View JSON com a série de tendência de um sinal vital, reduzida com LTTB"""
+
+    def get(self, request, atendimento_id, parametro):
+        """
+        Parâmetros (query string):
+            pontos: quantidade máxima de pontos por série (padrão 300)
+            inicio, fim: janela de tempo em ISO 8601 (opcionais)
+            horas: alternativa a inicio — últimas N horas
+        """
+        atendimento = get_object_or_404(Atendimento, pk=atendimento_id)
+
+        if parametro not in PARAMETROS_SERIE:
+            return JsonResponse({
+                'error': f'Parâmetro inválido. Opções: {", ".join(PARAMETROS_SERIE)}'
+            }, status=400)
+
+        try:
+            pontos = int(request.GET.get('pontos', PONTOS_PADRAO))
+            inicio = self._ler_data(request.GET.get('inicio'))
+            fim = self._ler_data(request.GET.get('fim'))
+            if request.GET.get('horas'):
+                inicio = timezone.now() - timedelta(hours=float(request.GET['horas']))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except OverflowError:
+            # ex: horas=inf ou um valor além do intervalo de datas
+            return JsonResponse({'error': f'Valor de "horas" fora do intervalo: {request.GET["horas"]}'}, status=400)
+
+        pontos = max(3, min(pontos, PONTOS_MAXIMO))
+
+        return JsonResponse(serie_sinal_vital(atendimento.pk, parametro, pontos, inicio, fim))
+
+    @staticmethod
+    def _ler_data(valor):
+        """Converte data ISO 8601 da query string (assume fuso local se ingênua)"""
+        if not valor:
+            return None
+        data = parse_datetime(valor)
+        if data is None:
+            raise ValueError(f'Data inválida: {valor}')
+        if timezone.is_naive(data):
+            data = timezone.make_aware(data)
+        return data
+
+
+class IngestaoSinaisVitaisView(View):
+    """
+    API JSON para ingestão em lote de sinais vitais (monitores de beira-leito).
+
+    Monitores se autenticam com `Authorization: Token <token>`
+    (prontuario.dispositivos), sem sessão nem CSRF. Sem o cabeçalho, vale a
+    sessão do usuário, com a verificação de CSRF.
+    """
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        token = dispositivos.token_da_requisicao(request)
+        if token is None:
+            return self.dispatch_sessao(request, *args, **kwargs)
+
+        dispositivo = dispositivos.autenticar_dispositivo(token)
+        if dispositivo is None:
+            return JsonResponse({'error': 'Token de dispositivo inválido ou inativo.'}, status=401)
+        request.profissional_ingestao = dispositivo.profissional
+        return super().dispatch(request, *args, **kwargs)
+
+    @method_decorator(csrf_protect)
+    def dispatch_sessao(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Autenticação necessária.'}, status=401)
+        try:
+            request.profissional_ingestao = request.user.profissional
+        except Profissional.DoesNotExist:
+            return JsonResponse({'error': 'Usuário não possui perfil de profissional vinculado.'}, status=403)
+        return super().dispatch(request, *args, **kwargs)
+
+    def post(self, request):
+        """
+        Corpo: {"leituras": [{"atendimento": 1, "data_hora": "...", "frequencia_cardiaca": 80, ...}]}
+
+        Leituras válidas são gravadas mesmo que outras do lote sejam rejeitadas;
+        as rejeições são devolvidas com o índice da leitura e os erros encontrados.
+        """
+        try:
+            leituras = orjson.loads(request.body).get('leituras')
+        except (orjson.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'JSON inválido.'}, status=400)
+
+        if not isinstance(leituras, list) or not leituras:
+            return JsonResponse({'error': 'Informe uma lista não vazia em "leituras".'}, status=400)
+        if len(leituras) > MAXIMO_LEITURAS_POR_LOTE:
+            return JsonResponse({
+                'error': f'Máximo de {MAXIMO_LEITURAS_POR_LOTE} leituras por requisição.'
+            }, status=413)
+
+        return JsonResponse(ingerir_leituras(leituras, request.profissional_ingestao))
+
+
+class AlertasSinaisVitaisView(LoginRequiredMixin, ListView):
+    """View com os atendimentos ativos cujo último registro de sinais vitais tem alertas"""
+    template_name = 'prontuario/alertas_sinais_vitais.html'
+    context_object_name = 'atendimentos'
+    paginate_by = 50
+
+    def get_queryset(self):
+        """Filtra e ordena pelo bitmask persistido, sem avaliar leituras em Python"""
+        atendimentos = Atendimento.objects.ativos().filter(
+            ultimo_sinal_vital__total_alertas__gt=0
+        ).select_related(
+            'paciente',
+            'ultimo_sinal_vital__profissional__user'
+        )
+
+        alerta = self.request.GET.get('alerta')
+        if alerta in BITS_ALERTA:
+            atendimentos = atendimentos.alias(
+                alerta_selecionado=F('ultimo_sinal_vital__alertas').bitand(BITS_ALERTA[alerta])
+            ).filter(alerta_selecionado__gt=0)
+
+        return atendimentos.order_by(
+            '-ultimo_sinal_vital__total_alertas',
+            '-ultimo_sinal_vital__data_hora'
+        )
+
+    def get_context_data(self, **kwargs):
+        """Adiciona opções de filtro ao contexto"""
+        context = super().get_context_data(**kwargs)
+        context['alerta_choices'] = ALERTA_CHOICES
+        context['alerta_selecionado'] = self.request.GET.get('alerta', '')
+        return context
+
+
+class PacientesDeteriorandoView(LoginRequiredMixin, ListView):
+    """Painel com a pontuação NEWS2 mais recente de cada atendimento ativo"""
+    template_name = 'prontuario/pacientes_deteriorando.html'
+    context_object_name = 'pontuacoes'
+    paginate_by = 50
+
+    # Variação nula (primeira pontuação do atendimento) fica por último
+    ORDENACOES = {
+        'total': ('-total', F('variacao').desc(nulls_last=True)),
+        'variacao': (F('variacao').desc(nulls_last=True), '-total'),
+        'recente': ('-sinal_vital__data_hora',),
+        'paciente': ('atendimento__paciente__nome',),
+    }
+
+    def get_queryset(self):
+        """Seleciona a última pontuação por atendimento com uma subconsulta indexada"""
+        ultima = PontuacaoNEWS2.objects.filter(
+            atendimento=OuterRef('atendimento')
+        ).order_by('-calculado_em', '-pk').values('pk')[:1]
+
+        pontuacoes = PontuacaoNEWS2.objects.exclude(
+            atendimento__status__in=Atendimento.STATUS_ENCERRADOS
+        ).filter(
+            pk=Subquery(ultima)
+        ).select_related(
+            'atendimento__paciente',
+            'sinal_vital'
+        )
+
+        risco = self.request.GET.get('risco')
+        if risco in dict(RISCO_CHOICES):
+            pontuacoes = pontuacoes.filter(risco=risco)
+
+        return pontuacoes.order_by(*self.ORDENACOES[self._ordem()], 'pk')
+
+    def _ordem(self):
+        """Ordenação solicitada (?ordem=), com padrão pela pontuação total"""
+        ordem = self.request.GET.get('ordem')
+        return ordem if ordem in self.ORDENACOES else 'total'
+
+    def get_context_data(self, **kwargs):
+        """Adiciona opções de filtro e ordenação ao contexto"""
+        context = super().get_context_data(**kwargs)
+        context['risco_choices'] = RISCO_CHOICES
+        context['risco_selecionado'] = self.request.GET.get('risco', '')
+        context['ordem'] = self._ordem()
+        return context
+
+
 class NovaPrescricaoView(LoginRequiredMixin, View):
     """View para criar nova prescrição médica (apenas perfil MEDICO)"""
     template_name = 'prontuario/nova_prescricao.html'
@@ -208,25 +420,32 @@ class NovaPrescricaoView(LoginRequiredMixin, View):
             pk=atendimento_id
         )
 
-        form = PrescricaoForm(request.POST)
-        formset = ItemPrescricaoFormSet(request.POST)
+        # Atendimento e médico definidos antes da validação (Prescricao.clean verifica o perfil)
+        form = PrescricaoForm(
+            request.POST,
+            instance=Prescricao(atendimento=atendimento, profissional=request.user.profissional)
+        )
+        formset = ItemPrescricaoFormSet(
+            request.POST,
+            form_kwargs={
+                'verificador_alergias': verificador_do_paciente(atendimento.paciente),
+                'profissional': request.user.profissional,
+            }
+        )
 
         if form.is_valid() and formset.is_valid():
             try:
                 with transaction.atomic():
                     # Salva prescrição
-                    prescricao = form.save(commit=False)
-                    prescricao.atendimento = atendimento
-                    prescricao.profissional = request.user.profissional
-                    prescricao.save()
+                    prescricao = form.save()
 
                     # Salva itens da prescrição
                     formset.instance = prescricao
-                    formset.save()
+                    itens = formset.save()
 
                     messages.success(
                         request,
-                        f'Prescrição registrada com sucesso com {prescricao.total_itens()} medicamento(s)!'
+                        f'Prescrição registrada com sucesso com {len(itens)} medicamento(s)!'
                     )
 
                     return redirect('prescricoes_atendimento', atendimento_id=atendimento.id)
@@ -252,23 +471,24 @@ class PrescricoesAtendimentoView(LoginRequiredMixin, DetailView):
     context_object_name = 'atendimento'
 
     def get_queryset(self):
-        """Otimiza query com prefetch de prescrições"""
+        """Carrega o cabeçalho; as prescrições são buscadas em get_context_data"""
         return Atendimento.objects.select_related(
             'paciente',
             'profissional_responsavel__user'
-        ).prefetch_related(
-            'prescricoes__profissional__user',
-            'prescricoes__itens'
         )
 
     def get_context_data(self, **kwargs):
         """Adiciona prescrições ao contexto"""
         context = super().get_context_data(**kwargs)
-        context['prescricoes'] = self.object.prescricoes.select_related(
+        # Itens via prefetch: total_itens() usa o cache em vez de um COUNT por prescrição
+        prescricoes = list(self.object.prescricoes.select_related(
             'profissional__user'
-        ).prefetch_related('itens').all()
-        context['total_prescricoes'] = context['prescricoes'].count()
-        context['prescricoes_ativas'] = context['prescricoes'].filter(status='ATIVA').count()
+        ).prefetch_related(
+            Prefetch('itens', queryset=ItemPrescricao.objects.select_related('alergia_confirmada_por__user'))
+        ))
+        context['prescricoes'] = prescricoes
+        context['total_prescricoes'] = len(prescricoes)
+        context['prescricoes_ativas'] = sum(1 for prescricao in prescricoes if prescricao.status == 'ATIVA')
 
         # Verifica se o usuário é médico para mostrar botão de nova prescrição
         try:
@@ -279,6 +499,23 @@ class PrescricoesAtendimentoView(LoginRequiredMixin, DetailView):
         return context
 
 
+class MedicacoesAtivasView(LoginRequiredMixin, DetailView):
+    """View com a lista consolidada de medicações ativas do atendimento"""
+    model = Atendimento
+    template_name = 'prontuario/medicacoes_ativas.html'
+    pk_url_kwarg = 'atendimento_id'
+    context_object_name = 'atendimento'
+
+    def get_queryset(self):
+        return Atendimento.objects.select_related('paciente')
+
+    def get_context_data(self, **kwargs):
+        """Adiciona as medicações ativas (cacheadas) ao contexto"""
+        context = super().get_context_data(**kwargs)
+        context['medicacoes'] = medicacoes_ativas(self.object.pk)
+        return context
+
+
 class NovaSolicitacaoExameView(LoginRequiredMixin, FormView):
     """View para criar nova solicitação de exame (apenas perfil MEDICO)"""
     template_name = 'prontuario/nova_solicitacao_exame.html'
@@ -374,16 +611,41 @@ class SolicitacoesExameAtendimentoView(LoginRequiredMixin, DetailView):
         return context
 
 
+@method_decorator(csrf_exempt, name='dispatch')
 class AdicionarResultadoExameView(LoginRequiredMixin, FormView):
-    """View para adicionar resultado a uma solicitação de exame"""
+    """
+    View para adicionar resultado a uma solicitação de exame.
+
+    O laudo enviado pelo formulário é validado durante a leitura do corpo
+    (uploads.ValidadorUploadLaudo). O handler precisa ser instalado antes de
+    request.POST ser lido, o que o CsrfViewMiddleware faria antes da view:
+    por isso a verificação de CSRF é feita aqui, depois da instalação.
+    """
     template_name = 'prontuario/adicionar_resultado_exame.html'
     form_class = ResultadoExameForm
 
+    def dispatch(self, request, *args, **kwargs):
+        request.upload_handlers.insert(0, uploads.ValidadorUploadLaudo(
+            request, 'arquivo_laudo', uploads.TAMANHO_MAXIMO_FORMULARIO
+        ))
+        return self.dispatch_protegido(request, *args, **kwargs)
+
+    @method_decorator(csrf_protect)
+    def dispatch_protegido(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
     def get_success_url(self):
         """Retorna para a listagem de solicitações do atendimento"""
         solicitacao = get_object_or_404(SolicitacaoExame, pk=self.kwargs['solicitacao_id'])
         return reverse('solicitacoes_exame_atendimento', kwargs={'atendimento_id': solicitacao.atendimento.id})
 
+    def get_form_kwargs(self):
+        """Passa a solicitação (envio em partes) e os arquivos descartados no envio ao formulário"""
+        kwargs = super().get_form_kwargs()
+        kwargs['solicitacao'] = get_object_or_404(SolicitacaoExame, pk=self.kwargs['solicitacao_id'])
+        kwargs['erros_upload'] = getattr(self.request, 'erros_upload', {})
+        return kwargs
+
     def get_context_data(self, **kwargs):
         """Adiciona solicitação e atendimento ao contexto"""
         context = super().get_context_data(**kwargs)
@@ -396,6 +658,8 @@ class AdicionarResultadoExameView(LoginRequiredMixin, FormView):
         )
         context['solicitacao'] = solicitacao
         context['atendimento'] = solicitacao.atendimento
+        context['tamanho_parte_upload'] = uploads.TAMANHO_MAXIMO_PARTE
+        context['tamanho_maximo_upload_mb'] = settings.LAUDOS_UPLOAD_TAMANHO_MAXIMO // (1024 * 1024)
         return context
 
     def form_valid(self, form):
@@ -412,7 +676,12 @@ class AdicionarResultadoExameView(LoginRequiredMixin, FormView):
 
         resultado = form.save(commit=False)
         resultado.solicitacao = solicitacao
+        upload = form.cleaned_data.get('upload_laudo')
+        if upload:
+            resultado.arquivo_laudo = upload.arquivo
         resultado.save()
+        if upload:
+            upload.delete()
 
         # Atualiza status da solicitação
         solicitacao.status = 'RESULTADO_DISPONIVEL'
@@ -426,6 +695,133 @@ class AdicionarResultadoExameView(LoginRequiredMixin, FormView):
         return super().form_valid(form)
 
 
+class IniciarUploadLaudoView(LoginRequiredMixin, View):
+    """Inicia o envio em partes do laudo de uma solicitação (prontuario.uploads)"""
+    raise_exception = True
+
+    def post(self, request, solicitacao_id):
+        solicitacao = get_object_or_404(SolicitacaoExame, pk=solicitacao_id)
+        tamanho = request.POST.get('tamanho', '')
+        if not tamanho.isdigit():
+            return JsonResponse({'erro': 'Tamanho do arquivo inválido.'}, status=400)
+
+        try:
+            upload = uploads.iniciar_upload(
+                solicitacao,
+                getattr(request.user, 'profissional', None),
+                request.POST.get('nome', ''),
+                int(tamanho)
+            )
+        except ValidationError as erro:
+            return JsonResponse({'erro': erro.messages[0]}, status=400)
+
+        return JsonResponse(self.estado(upload), status=201)
+
+    @staticmethod
+    def estado(upload):
+        return {
+            'id': str(upload.pk),
+            'url': reverse('upload_laudo', args=[upload.pk]),
+            'tamanho': upload.tamanho,
+            'recebido': upload.recebido,
+            'concluido': upload.concluido,
+        }
+
+
+class UploadLaudoView(LoginRequiredMixin, View):
+    """
+    Consulta (GET) ou recebe uma parte (PATCH) do envio de laudo.
+
+    A parte vem no corpo bruto da requisição e é copiada em blocos para o
+    arquivo parcial; Upload-Offset deve ser igual ao total já recebido.
+    """
+    raise_exception = True
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(UploadLaudo, pk=upload_id)
+        return JsonResponse(IniciarUploadLaudoView.estado(upload))
+
+    def patch(self, request, upload_id):
+        deslocamento = request.headers.get('Upload-Offset', '')
+        tamanho_parte = request.headers.get('Content-Length', '')
+        if not deslocamento.isdigit() or not tamanho_parte.isdigit():
+            return JsonResponse({'erro': 'Cabeçalhos Upload-Offset e Content-Length são obrigatórios.'}, status=400)
+
+        try:
+            upload = uploads.anexar_parte(upload_id, int(deslocamento), request, int(tamanho_parte))
+        except UploadLaudo.DoesNotExist:
+            raise Http404('Envio não encontrado ou já concluído.')
+        except uploads.DeslocamentoInvalido as erro:
+            return JsonResponse({'erro': str(erro), 'recebido': erro.recebido}, status=409)
+        except ValidationError as erro:
+            return JsonResponse({'erro': erro.messages[0]}, status=400)
+
+        return JsonResponse(IniciarUploadLaudoView.estado(upload))
+
+
+class ConcluirUploadLaudoView(LoginRequiredMixin, View):
+    """Monta o arquivo enviado em partes, confere o SHA-256 e grava no armazenamento de laudos"""
+    raise_exception = True
+
+    def post(self, request, upload_id):
+        try:
+            upload = uploads.concluir_upload(upload_id, request.POST.get('sha256', ''))
+        except UploadLaudo.DoesNotExist:
+            raise Http404('Envio não encontrado.')
+        except ValidationError as erro:
+            return JsonResponse({'erro': erro.messages[0]}, status=400)
+
+        return JsonResponse(IniciarUploadLaudoView.estado(upload))
+
+
+class BaixarLaudoView(LoginRequiredMixin, View):
+    """
+    Entrega o arquivo de laudo de um resultado de exame.
+
+    Responde 304 a requisições condicionais e 206 a requisições de intervalo;
+    o envio do corpo pode ser delegado ao proxy (LAUDOS_ENVIO_ARQUIVO).
+    Laudos comprimidos vão em zstd para os clientes que o aceitam.
+    """
+
+    def get(self, request, solicitacao_id):
+        resultado = get_object_or_404(
+            ResultadoExame.objects.select_related('solicitacao'),
+            solicitacao_id=solicitacao_id
+        )
+        arquivo = resultado.arquivo_laudo
+        if not arquivo or not arquivo.storage.exists(arquivo.name):
+            raise Http404('Laudo não encontrado.')
+
+        codificacao = laudos.codificacao_laudo(request, arquivo)
+        tamanho, etag, modificado = laudos.metadados_laudo(arquivo, codificacao)
+        nao_modificado = get_conditional_response(request, etag=etag, last_modified=int(modificado))
+        if nao_modificado is not None:
+            nao_modificado['ETag'] = etag
+            return nao_modificado
+
+        return laudos.resposta_laudo(
+            request, arquivo, etag, modificado, tamanho, laudos.nome_download(resultado), codificacao
+        )
+
+
+class PreviaLaudoView(LoginRequiredMixin, View):
+    """Entrega a prévia (miniatura) do laudo gerada por prontuario.previas"""
+
+    def get(self, request, solicitacao_id):
+        resultado = get_object_or_404(ResultadoExame, solicitacao_id=solicitacao_id)
+        previa = resultado.previa
+        if not previa or not previa.storage.exists(previa.name):
+            raise Http404('Prévia não disponível.')
+
+        tamanho, etag, modificado = laudos.metadados_laudo(previa)
+        nao_modificado = get_conditional_response(request, etag=etag, last_modified=int(modificado))
+        if nao_modificado is not None:
+            nao_modificado['ETag'] = etag
+            return nao_modificado
+
+        return laudos.resposta_laudo(request, previa, etag, modificado, tamanho, os.path.basename(previa.name))
+
+
 class CancelarExameView(LoginRequiredMixin, View):
     """View para cancelar uma solicitação de exame (apenas médico solicitante)"""
 
@@ -465,6 +861,121 @@ class CancelarExameView(LoginRequiredMixin, View):
         return redirect('solicitacoes_exame_atendimento', atendimento_id=solicitacao.atendimento.id)
 
 
+class FilaExamesView(LoginRequiredMixin, View):
+    """Fila de trabalho com as solicitações de exames em aberto de todos os atendimentos"""
+    template_name = 'prontuario/fila_exames.html'
+
+    def get(self, request):
+        """Lista a página da fila após o cursor, com filtros de tipo e idade"""
+        tipo, idade_horas = filtros_da_requisicao(request)
+        # Marca o instante da leitura antes da consulta: a atualização automática parte dele
+        desde = timezone.now()
+
+        try:
+            solicitacoes, proximo_cursor = pagina_fila(
+                fila_exames(tipo, idade_horas),
+                cursor=request.GET.get('cursor')
+            )
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        return render(request, self.template_name, {
+            'solicitacoes': solicitacoes,
+            'proximo_cursor': proximo_cursor,
+            'desde': desde.isoformat(),
+            'tipo_choices': SolicitacaoExame.TIPO_CHOICES,
+            'idade_choices': IDADE_CHOICES,
+            'tipo_selecionado': tipo or '',
+            'idade_selecionada': idade_horas,
+            'query_filtros': urlencode({
+                chave: valor for chave, valor in [('tipo', tipo), ('idade', idade_horas)] if valor
+            }),
+        })
+
+
+class FilaExamesAtualizacoesView(LoginRequiredMixin, View):
+    """Retorna em JSON as alterações da fila de exames desde o cursor (atualização automática)"""
+    raise_exception = True
+
+    def get(self, request):
+        desde = parse_datetime(request.GET.get('desde', ''))
+        if desde is None:
+            return HttpResponseBadRequest('Parâmetro "desde" inválido.')
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+
+        tipo, idade_horas = filtros_da_requisicao(request)
+        return JsonResponse(atualizacoes_desde(desde, tipo, idade_horas))
+
+
+class MarcarExamesColetadosView(LoginRequiredMixin, View):
+    """Marca em lote as solicitações selecionadas na fila como coletadas"""
+
+    def post(self, request):
+        ids = [int(pk) for pk in request.POST.getlist('solicitacoes') if pk.isdigit()]
+        if not ids:
+            messages.warning(request, 'Nenhuma solicitação selecionada.')
+        else:
+            coletadas = marcar_coletados(ids)
+            messages.success(request, f'{coletadas} solicitação(ões) marcada(s) como coletada(s).')
+
+        url = reverse('fila_exames')
+        if request.POST.get('query_filtros'):
+            url = f"{url}?{request.POST['query_filtros']}"
+        return redirect(url)
+
+
+class TemposExamesView(LoginRequiredMixin, View):
+    """Relatório de tempo de liberação de exames, lido apenas da tabela consolidada"""
+    template_name = 'prontuario/tempos_exames.html'
+
+    def get(self, request):
+        periodo = request.GET.get('periodo', '')
+        periodo = int(periodo) if periodo.isdigit() and int(periodo) in dict(PERIODO_CHOICES) else 30
+        agrupamento = request.GET.get('agrupar')
+        if agrupamento not in dict(AGRUPAMENTO_CHOICES):
+            agrupamento = 'tipo'
+        tipo = request.GET.get('tipo')
+        if tipo not in dict(SolicitacaoExame.TIPO_CHOICES):
+            tipo = None
+
+        linhas = TempoExameConsolidado.objects.filter(
+            dia__gt=timezone.localdate() - timedelta(days=periodo)
+        )
+        if tipo:
+            linhas = linhas.filter(tipo=tipo)
+        linhas = list(linhas.values(agrupamento, 'quantidade', 'soma_minutos', 'histograma'))
+
+        resumo = resumir_tempos(linhas, agrupamento)
+        rotulos_tipo = dict(SolicitacaoExame.TIPO_CHOICES)
+        for grupo in resumo:
+            valor = grupo['valor']
+            if agrupamento == 'tipo':
+                grupo['rotulo'] = rotulos_tipo.get(valor, valor)
+            elif agrupamento == 'hora':
+                grupo['rotulo'] = f'{valor:02d}h'
+            elif agrupamento == 'dia':
+                grupo['rotulo'] = valor.strftime('%d/%m/%Y')
+            else:
+                grupo['rotulo'] = valor
+
+        total = resumir_tempos(linhas)
+
+        return render(request, self.template_name, {
+            'resumo': resumo,
+            'total': total[0] if total else None,
+            'periodo_choices': PERIODO_CHOICES,
+            'agrupamento_choices': AGRUPAMENTO_CHOICES,
+            'tipo_choices': SolicitacaoExame.TIPO_CHOICES,
+            'periodo_selecionado': periodo,
+            'agrupamento_selecionado': agrupamento,
+            'tipo_selecionado': tipo or '',
+            'consolidado_ate': TempoExameConsolidado.objects.aggregate(
+                ultimo=Max('ultimo_resultado')
+            )['ultimo'],
+        })
+
+
 class ProntuarioCompletoView(LoginRequiredMixin, DetailView):
     """View para exibir prontuário completo com timeline cronológica unificada"""
     model = Atendimento
@@ -473,83 +984,159 @@ class ProntuarioCompletoView(LoginRequiredMixin, DetailView):
     context_object_name = 'atendimento'
 
     def get_queryset(self):
-        """Otimiza query com prefetch de todos os registros clínicos"""
+        """Carrega apenas o cabeçalho; os eventos são paginados pela timeline"""
         return Atendimento.objects.select_related(
             'paciente',
             'profissional_responsavel__user'
-        ).prefetch_related(
-            'evolucoes__profissional__user',
-            'sinais_vitais__profissional__user',
-            'prescricoes__profissional__user',
-            'prescricoes__itens',
-            'solicitacoes_exame__profissional__user',
-            'solicitacoes_exame__resultado'
         )
 
     def get_context_data(self, **kwargs):
-        """Consolida todos os eventos em timeline cronológica unificada"""
+        """Renderiza a primeira página da timeline e as estatísticas do atendimento"""
         context = super().get_context_data(**kwargs)
 
-        # Lista unificada de eventos
-        eventos = []
-
-        # Adiciona evoluções
-        for evolucao in self.object.evolucoes.all():
-            eventos.append({
-                'tipo': 'evolucao',
-                'data': evolucao.data_hora,
-                'objeto': evolucao,
-                'icone': 'M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z',
-                'cor_borda': 'blue',
-            })
-
-        # Adiciona sinais vitais
-        for sinal in self.object.sinais_vitais.all():
-            eventos.append({
-                'tipo': 'sinal_vital',
-                'data': sinal.data_hora,
-                'objeto': sinal,
-                'icone': 'M4.318 6.318a4.5 4.5 0 000 6.364L12 20.364l7.682-7.682a4.5 4.5 0 00-6.364-6.364L12 7.636l-1.318-1.318a4.5 4.5 0 00-6.364 0z',
-                'cor_borda': 'purple',
-            })
-
-        # Adiciona prescrições
-        for prescricao in self.object.prescricoes.all():
-            eventos.append({
-                'tipo': 'prescricao',
-                'data': prescricao.data_prescricao,
-                'objeto': prescricao,
-                'icone': 'M9 5H7a2 2 0 00-2 2v12a2 2 0 002 2h10a2 2 0 002-2V7a2 2 0 00-2-2h-2M9 5a2 2 0 002 2h2a2 2 0 002-2M9 5a2 2 0 012-2h2a2 2 0 012 2',
-                'cor_borda': 'indigo',
-            })
-
-        # Adiciona solicitações de exames
-        for solicitacao in self.object.solicitacoes_exame.all():
-            # Usa data do resultado se disponível, senão usa data de solicitação
-            if solicitacao.tem_resultado():
-                data_evento = solicitacao.resultado.data_resultado
-            else:
-                data_evento = solicitacao.data_solicitacao
+        tipos = tipos_da_requisicao(self.request)
+        eventos, proximo_cursor = pagina_eventos(tipos, atendimento_id=self.object.pk)
+
+        # Estatísticas
+        totais = {
+            'evolucao': self.object.evolucoes.count(),
+            'sinal_vital': self.object.sinais_vitais.count(),
+            'prescricao': self.object.prescricoes.count(),
+            'exame': self.object.solicitacoes_exame.count(),
+        }
+        context['total_evolucoes'] = totais['evolucao']
+        context['total_sinais_vitais'] = totais['sinal_vital']
+        context['total_prescricoes'] = totais['prescricao']
+        context['total_exames'] = totais['exame']
+
+        # Timeline (primeira página)
+        context['eventos'] = eventos
+        context['proximo_cursor'] = proximo_cursor
+        context['total_eventos'] = sum(totais[tipo] for tipo in tipos)
+        context['tipos_evento'] = TIPOS_EVENTO_LABELS.items()
+        context['tipos_selecionados'] = tipos
+        context['query_tipos'] = urlencode([('tipo', tipo) for tipo in tipos])
 
-            eventos.append({
-                'tipo': 'exame',
-                'data': data_evento,
-                'objeto': solicitacao,
-                'icone': 'M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z',
-                'cor_borda': 'orange',
-            })
+        return context
 
-        # Ordena eventos por data (mais recente primeiro)
-        eventos.sort(key=lambda x: x['data'], reverse=True)
 
-        # Adiciona ao contexto
-        context['eventos'] = eventos
-        context['total_eventos'] = len(eventos)
+class ExportarProntuarioView(LoginRequiredMixin, View):
+    """
+    Exporta o prontuário completo do atendimento para impressão.
 
-        # Estatísticas
-        context['total_evolucoes'] = self.object.evolucoes.count()
-        context['total_sinais_vitais'] = self.object.sinais_vitais.count()
-        context['total_prescricoes'] = self.object.prescricoes.count()
-        context['total_exames'] = self.object.solicitacoes_exame.count()
+    Serve o documento já gerado quando a versão atual existe em disco; senão
+    gera em streaming (gravando o arquivo ao mesmo tempo) ou, para
+    atendimentos muito longos, agenda a geração em segundo plano.
+    """
 
-        return context
+    def get(self, request, atendimento_id):
+        atendimento = get_object_or_404(
+            Atendimento.objects.select_related('paciente'),
+            pk=atendimento_id
+        )
+        versao, total_eventos = exportacao.versao_atendimento(atendimento)
+        caminho = exportacao.caminho_exportacao(atendimento.pk, versao)
+
+        if os.path.exists(caminho):
+            return FileResponse(open(caminho, 'rb'), content_type='text/html; charset=utf-8')
+
+        if total_eventos <= exportacao.LIMIAR_SEGUNDO_PLANO:
+            blocos = exportacao.gravar_em_arquivo(atendimento, versao, exportacao.gerar_html(atendimento))
+            return StreamingHttpResponse(blocos, content_type='text/html; charset=utf-8')
+
+        exportacao.agendar_exportacao(atendimento, versao)
+        return render(request, 'prontuario/exportacao_preparando.html', {
+            'atendimento': atendimento,
+            'total_eventos': total_eventos,
+        })
+
+
+class ProntuarioEventosView(LoginRequiredMixin, View):
+    """View que retorna fragmento HTML com a próxima página da timeline (scroll infinito)"""
+    template_name = 'prontuario/partials/timeline_eventos.html'
+
+    def get(self, request, atendimento_id):
+        """Renderiza os eventos posteriores ao cursor informado"""
+        atendimento = get_object_or_404(Atendimento, pk=atendimento_id)
+        tipos = tipos_da_requisicao(request)
+
+        try:
+            eventos, proximo_cursor = pagina_eventos(
+                tipos,
+                cursor=request.GET.get('cursor'),
+                atendimento_id=atendimento.pk
+            )
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        return render(request, self.template_name, {
+            'atendimento': atendimento,
+            'eventos': eventos,
+            'proximo_cursor': proximo_cursor,
+            'query_tipos': urlencode([('tipo', tipo) for tipo in tipos]),
+        })
+
+
+class TimelinePacienteView(LoginRequiredMixin, View):
+    """View com a timeline longitudinal do paciente (todos os atendimentos) em streaming"""
+    template_name = 'prontuario/timeline_paciente.html'
+    template_eventos = 'prontuario/partials/timeline_paciente_eventos.html'
+    eventos_por_bloco = 100
+
+    # Marcador no template onde os eventos são inseridos durante o streaming
+    MARCADOR_EVENTOS = '<!-- eventos-streaming -->'
+
+    def get(self, request, paciente_id):
+        """Envia o cabeçalho imediatamente e os eventos em blocos conforme são lidos"""
+        paciente = get_object_or_404(Paciente, pk=paciente_id)
+        tipos = tipos_da_requisicao(request)
+
+        atendimentos = {
+            atendimento.pk: atendimento
+            for atendimento in paciente.atendimentos.all()
+        }
+
+        totais = {
+            'evolucao': Evolucao.objects.filter(atendimento__paciente=paciente).count(),
+            'sinal_vital': SinalVital.objects.filter(atendimento__paciente=paciente).count(),
+            'prescricao': Prescricao.objects.filter(atendimento__paciente=paciente).count(),
+            'exame': SolicitacaoExame.objects.filter(atendimento__paciente=paciente).count(),
+        }
+
+        pagina = render_to_string(self.template_name, {
+            'paciente': paciente,
+            'total_atendimentos': len(atendimentos),
+            'total_eventos': sum(totais[tipo] for tipo in tipos),
+            'tipos_evento': TIPOS_EVENTO_LABELS.items(),
+            'tipos_selecionados': tipos,
+        }, request=request)
+        inicio, fim = pagina.split(self.MARCADOR_EVENTOS, 1)
+
+        eventos = iterar_eventos(tipos, atendimento__paciente_id=paciente.pk)
+
+        return StreamingHttpResponse(
+            self._gerar_html(inicio, fim, eventos, atendimentos),
+            content_type='text/html; charset=utf-8'
+        )
+
+    def _gerar_html(self, inicio, fim, eventos, atendimentos):
+        """Gera o HTML da página renderizando os eventos em blocos de tamanho fixo"""
+        yield inicio
+
+        atendimento_anterior = None
+        bloco = []
+        for evento in eventos:
+            atendimento_id = evento['objeto'].atendimento_id
+            evento['atendimento'] = atendimentos[atendimento_id]
+            evento['novo_atendimento'] = atendimento_id != atendimento_anterior
+            atendimento_anterior = atendimento_id
+
+            bloco.append(evento)
+            if len(bloco) >= self.eventos_por_bloco:
+                yield render_to_string(self.template_eventos, {'eventos': bloco})
+                bloco = []
+
+        if bloco:
+            yield render_to_string(self.template_eventos, {'eventos': bloco})
+
+        yield fim